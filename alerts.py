@@ -0,0 +1,424 @@
+# alerts.py
+# Persistent restock alert scheduling and batched SMTP delivery.
+#
+# Alert dates (stockout date minus the subscriber's threshold, never earlier
+# than today) are kept in SQLite per (email, product), so they survive the
+# Streamlit session. Every time new predictions arrive the schedule is
+# re-evaluated incrementally: only products whose stockout date moved are
+# rewritten, and products that no longer run out are cancelled.
+#
+# A background worker thread wakes up periodically, collects the alerts that
+# are due and sends them grouped per subscriber (one email per batch of
+# products) over a single reusable SMTP connection, with a token-bucket rate
+# limit. An alert is sent once per product and email, and re-armed only when
+# the predicted stockout date moves and the resend cooldown has passed.
+#
+# Delivery is configured through environment variables (RESTOCK_SMTP_*);
+# without RESTOCK_SMTP_HOST alerts are still scheduled but nothing is sent.
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from email.message import EmailMessage
+
+import pandas as pd
+
+import engine
+
+logger = logging.getLogger(__name__)
+
+ALERTS_DB = os.environ.get(
+    'RESTOCK_ALERTS_DB',
+    os.path.join(os.path.expanduser('~'), '.cache', 'restock_predictor', 'alerts.sqlite3')
+)
+
+# Products listed in a single alert email
+BATCH_PRODUCTS = 200
+# Seconds between scheduler runs
+POLL_SECONDS = 60
+# An alert for the same (email, product) is not sent again within this window
+RESEND_COOLDOWN_HOURS = 24
+# Stockout dates closer than this to the stored one don't count as a change
+RESCHEDULE_TOLERANCE_DAYS = 1
+
+STATUS_PENDING = 'pending'
+STATUS_SENT = 'sent'
+STATUS_CANCELLED = 'cancelled'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    email TEXT PRIMARY KEY,
+    threshold_days INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alerts (
+    email TEXT NOT NULL,
+    product TEXT NOT NULL,
+    stockout_date TEXT NOT NULL,
+    alert_date TEXT NOT NULL,
+    days_until_stockout REAL NOT NULL,
+    status TEXT NOT NULL,
+    sent_at REAL,
+    PRIMARY KEY (email, product)
+);
+CREATE INDEX IF NOT EXISTS alerts_due ON alerts (status, alert_date);
+CREATE TABLE IF NOT EXISTS deliveries (
+    email TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    products INTEGER NOT NULL,
+    subject TEXT NOT NULL
+);
+"""
+
+
+# SMTP settings from the environment; None when delivery isn't configured
+def smtp_settings_from_env():
+    host = os.environ.get('RESTOCK_SMTP_HOST')
+    if not host:
+        return None
+    return {
+        'host': host,
+        'port': int(os.environ.get('RESTOCK_SMTP_PORT', 25)),
+        'user': os.environ.get('RESTOCK_SMTP_USER'),
+        'password': os.environ.get('RESTOCK_SMTP_PASSWORD'),
+        'sender': os.environ.get('RESTOCK_SMTP_FROM', 'restock-alerts@localhost'),
+        'starttls': os.environ.get('RESTOCK_SMTP_STARTTLS', '0') == '1',
+        'rate_per_second': float(os.environ.get('RESTOCK_SMTP_RATE', 5)),
+    }
+
+
+# Token bucket: at most `rate_per_second` messages on average, bursts up to `burst`
+class RateLimiter:
+    def __init__(self, rate_per_second, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1.0, rate_per_second)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            self._sleep((1 - self.tokens) / self.rate)
+
+
+# One SMTP connection reused across messages and scheduler runs; reconnects
+# when the server has dropped it
+class SMTPPool:
+    def __init__(self, host, port=25, user=None, password=None, starttls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._smtp = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password)
+        self.connections_opened += 1
+        return smtp
+
+    def send(self, message):
+        with self._lock:
+            for attempt in range(2):
+                if self._smtp is None:
+                    self._smtp = self._connect()
+                try:
+                    self._smtp.send_message(message)
+                    return
+                except smtplib.SMTPServerDisconnected:
+                    # Idle connection closed by the server: reconnect once
+                    self._smtp = None
+                    if attempt:
+                        raise
+
+    def close(self):
+        with self._lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except smtplib.SMTPException:
+                    pass
+                self._smtp = None
+
+
+# Alert email for one subscriber and one batch of due alerts, built with a
+# single join
+def build_message(sender, email, batch):
+    lines = (
+        batch['product'].astype(str) + ': '
+        + batch['days_until_stockout'].map('{:.1f}'.format) + ' days until stockout (est. '
+        + batch['stockout_date'].astype(str) + ')'
+    )
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = email
+    message['Subject'] = f"Restock alert: {len(batch)} product(s) running low"
+    message.set_content(
+        f"Stock alerts for {email}:\n\n- " + "\n- ".join(lines.tolist()) + "\n"
+    )
+    return message
+
+
+# SQLite-backed schedule of alert dates per (email, product)
+class AlertStore:
+    def __init__(self, path=ALERTS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def subscribe(self, email, threshold_days):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO subscriptions (email, threshold_days, created) VALUES (?, ?, ?) "
+                "ON CONFLICT(email) DO UPDATE SET threshold_days = excluded.threshold_days",
+                (email, int(threshold_days), time.time())
+            )
+
+    def unsubscribe(self, email):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM subscriptions WHERE email = ?", (email,))
+            conn.execute("DELETE FROM alerts WHERE email = ? AND status = ?", (email, STATUS_PENDING))
+
+    # Alert threshold of a subscriber, or None when not subscribed
+    def subscription(self, email):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT threshold_days FROM subscriptions WHERE email = ?", (email,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    # Re-evaluate the alerts of one subscriber against new predictions (a
+    # predictions table with product, stockout_date and days_until_stockout).
+    # Only products whose stockout date moved are written; pending alerts of
+    # products that no longer run out (or, with cancel_missing, are missing
+    # from the table) are cancelled. Returns the number of (scheduled or
+    # updated, cancelled) alerts. `now` is a Unix timestamp.
+    def schedule(self, email, predictions, threshold_days, now=None, cancel_missing=True):
+        today = pd.Timestamp.fromtimestamp(now or time.time()).normalize()
+        stockout = pd.to_datetime(predictions['stockout_date']).dt.normalize()
+        runs_out = stockout.notna().to_numpy()
+
+        new = pd.DataFrame({
+            'product': predictions['product'].astype(str).to_numpy()[runs_out],
+            'stockout_date': stockout.to_numpy()[runs_out],
+            'days_until_stockout': predictions['days_until_stockout'].to_numpy(dtype=float)[runs_out],
+        })
+        new['alert_date'] = engine.alert_dates(new['stockout_date'], threshold_days, today)
+
+        with closing(self._connect()) as conn, conn:
+            old = pd.read_sql_query(
+                "SELECT product, stockout_date, status FROM alerts WHERE email = ?",
+                conn, params=(email,)
+            )
+            old['stockout_date'] = pd.to_datetime(old['stockout_date'])
+
+            merged = new.merge(old, on='product', how='left', suffixes=('', '_old'))
+            moved = (merged['stockout_date'] - merged['stockout_date_old']).abs()
+            changed = merged['stockout_date_old'].isna() | (
+                moved >= pd.Timedelta(days=RESCHEDULE_TOLERANCE_DAYS)
+            )
+            # A cancelled alert comes back as soon as the product runs out again
+            changed |= merged['status'].eq(STATUS_CANCELLED)
+            upserts = merged[changed.to_numpy()]
+
+            conn.executemany(
+                "INSERT INTO alerts (email, product, stockout_date, alert_date, days_until_stockout, status) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(email, product) DO UPDATE SET stockout_date = excluded.stockout_date, "
+                "alert_date = excluded.alert_date, days_until_stockout = excluded.days_until_stockout, "
+                "status = excluded.status",
+                zip(
+                    [email] * len(upserts),
+                    upserts['product'],
+                    upserts['stockout_date'].dt.strftime('%Y-%m-%d'),
+                    upserts['alert_date'].dt.strftime('%Y-%m-%d'),
+                    upserts['days_until_stockout'].astype(float),
+                    [STATUS_PENDING] * len(upserts),
+                )
+            )
+
+            # Products in the table that no longer run out, plus (for a full
+            # catalog) products that disappeared from it
+            never = predictions['product'].astype(str)[~runs_out]
+            stale = old['product'].isin(never)
+            if cancel_missing:
+                stale |= ~old['product'].isin(new['product'])
+            gone = old.loc[stale & old['status'].eq(STATUS_PENDING), 'product']
+            conn.executemany(
+                "UPDATE alerts SET status = ? WHERE email = ? AND product = ?",
+                ((STATUS_CANCELLED, email, product) for product in gone)
+            )
+        return len(upserts), len(gone)
+
+    # Pending alerts whose alert date has come and that are outside the
+    # resend cooldown, ordered by email and urgency
+    def due(self, now=None, limit=None):
+        now = now or time.time()
+        today = pd.Timestamp.fromtimestamp(now).strftime('%Y-%m-%d')
+        cooldown_start = now - RESEND_COOLDOWN_HOURS * 3600
+        query = (
+            "SELECT email, product, stockout_date, days_until_stockout FROM alerts "
+            "WHERE status = ? AND alert_date <= ? AND (sent_at IS NULL OR sent_at <= ?) "
+            "ORDER BY email, days_until_stockout"
+        )
+        params = [STATUS_PENDING, today, cooldown_start]
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def mark_sent(self, email, products, subject, now=None):
+        now = now or time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "UPDATE alerts SET status = ?, sent_at = ? WHERE email = ? AND product = ?",
+                ((STATUS_SENT, now, email, product) for product in products)
+            )
+            conn.execute(
+                "INSERT INTO deliveries (email, sent_at, products, subject) VALUES (?, ?, ?, ?)",
+                (email, now, len(products), subject)
+            )
+
+    # Scheduled alerts of one subscriber, soonest first
+    def alerts(self, email):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                "SELECT product, stockout_date, alert_date, days_until_stockout, status, sent_at "
+                "FROM alerts WHERE email = ? ORDER BY alert_date, days_until_stockout",
+                conn, params=(email,)
+            )
+
+    # Emails sent to one subscriber, most recent first
+    def deliveries(self, email, limit=50):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                "SELECT sent_at, products, subject FROM deliveries WHERE email = ? "
+                "ORDER BY sent_at DESC LIMIT ?",
+                conn, params=(email, int(limit))
+            )
+
+
+# Background worker that sends due alerts in batches
+class AlertScheduler:
+    def __init__(self, store, pool, sender, rate_per_second=5, poll_seconds=POLL_SECONDS,
+                 batch_products=BATCH_PRODUCTS):
+        self.store = store
+        self.pool = pool
+        self.sender = sender
+        self.limiter = RateLimiter(rate_per_second)
+        self.poll_seconds = poll_seconds
+        self.batch_products = batch_products
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Send every due alert once; returns (messages sent, alerts delivered)
+    def run_once(self, now=None):
+        due = self.store.due(now=now)
+        messages = alerts_sent = 0
+        for email, group in due.groupby('email', sort=False):
+            for start in range(0, len(group), self.batch_products):
+                batch = group.iloc[start:start + self.batch_products]
+                message = build_message(self.sender, email, batch)
+                self.limiter.acquire()
+                try:
+                    self.pool.send(message)
+                except (smtplib.SMTPException, OSError):
+                    # Left pending, retried on the next run
+                    logger.exception("Sending alerts to %s failed", email)
+                    continue
+                self.store.mark_sent(email, batch['product'].tolist(), message['Subject'], now=now)
+                messages += 1
+                alerts_sent += len(batch)
+        return messages, alerts_sent
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # keep the worker alive across unexpected errors
+                logger.exception("Alert scheduler run failed")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+        self.pool.close()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='alert-scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    # Run as soon as possible instead of waiting for the next poll
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+# Process-wide scheduler (Streamlit reruns and sessions share it), started on
+# first call. None when SMTP delivery isn't configured.
+def get_scheduler(store):
+    global _scheduler
+    settings = smtp_settings_from_env()
+    if settings is None:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            pool = SMTPPool(settings['host'], settings['port'], settings['user'],
+                            settings['password'], settings['starttls'])
+            _scheduler = AlertScheduler(store, pool, settings['sender'],
+                                        rate_per_second=settings['rate_per_second'])
+        return _scheduler.start()
+
+
+# Send due alerts without the app running, e.g. as a service next to it:
+#   RESTOCK_SMTP_HOST=mail.example.com python alerts.py
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    scheduler = get_scheduler(AlertStore())
+    if scheduler is None:
+        raise SystemExit("Set RESTOCK_SMTP_HOST to send alerts")
+    try:
+        while scheduler.running:
+            time.sleep(POLL_SECONDS)
+    except KeyboardInterrupt:
+        scheduler.stop()
@@ -0,0 +1,300 @@
+# api.py
+# Headless HTTP prediction service for other systems (ERP, scripts), using
+# the same engine as the Streamlit app without re-running a UI script.
+#
+# Clients post sales data once and then query predictions for any list of
+# products. Every dataset's predictions are computed once and kept in memory
+# as JSON-ready records, so a query is an index lookup plus serialization;
+# processing posted files runs in worker threads and never blocks the event
+# loop. The server is Tornado (installed with Streamlit).
+#
+# Usage:
+#   python api.py --port 8600
+#   python api.py --port 8600 --preload sales.csv --stock-col stock --receipts-col receipts
+#
+# Endpoints:
+#   GET  /health
+#   GET  /datasets                  loaded datasets
+#   POST /datasets                  CSV body (Content-Type: text/csv) with the column
+#                                   mapping as query arguments (date_col, product_col,
+#                                   quantity_col, stock_col, receipts_col, location_col,
+#                                   category_col), or JSON {"mapping": {...}, "rows": [{...}, ...]}
+#                                   -> {"dataset": "<key>", "products": n, "rows": n}
+#   POST /predict                   JSON {"dataset": "<key>", "products": ["A", "B", ...]}
+#                                   (omit "products" for every product)
+#   GET  /predict?dataset=<key>&product=A&product=B
+#
+# Datasets saved in the shared inventory database are queried as "db:<id>".
+import argparse
+import asyncio
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import tornado.web
+
+import engine
+import inventory_db
+from batch_predict import read_sales_file
+from cache import LRUCache, content_hash
+from store import store_key
+
+DEFAULT_PORT = 8600
+# Prediction tables kept in memory
+MAX_DATASETS = 16
+# Threads processing posted sales data
+WORKERS = 2
+# Largest accepted request body
+MAX_BODY_MB = 512
+
+MAPPING_COLUMNS = [
+    'date_col', 'product_col', 'quantity_col', 'stock_col', 'receipts_col', 'location_col', 'category_col'
+]
+DEFAULT_MAPPING = {'date_col': 'date', 'product_col': 'product', 'quantity_col': 'quantity'}
+
+DATABASE_PREFIX = 'db:'
+
+
+# Predictions of one dataset as JSON-ready records with a product index, so
+# a batch of products is answered without touching the frame
+class PredictionTable:
+    def __init__(self, predictions, rows):
+        days = predictions['days_until_stockout'].to_numpy(dtype=float)
+        finite = np.isfinite(days)
+        suggested = np.where(
+            days < engine.RESTOCK_WITHIN_DAYS, engine.restock_quantity(predictions['avg_daily_sales']), 0
+        ).astype(np.int64)
+        stockout = pd.to_datetime(predictions['stockout_date']).dt.strftime('%Y-%m-%d')
+
+        self.products = pd.Index(predictions['product'].astype(str))
+        self.records = [
+            {
+                'product': product,
+                'days_until_stockout': round(day, 2) if is_finite else None,
+                'stockout_date': date if isinstance(date, str) else None,
+                'status': status,
+                'suggested_restock': restock,
+            }
+            for product, day, is_finite, date, status, restock in zip(
+                self.products, days.tolist(), finite.tolist(), stockout.tolist(),
+                predictions['status'].tolist(), suggested.tolist()
+            )
+        ]
+        self.rows = rows
+        self.created = time.time()
+
+    # Records for `products` (all products when None) and the unknown names
+    def lookup(self, products=None):
+        if products is None:
+            return self.records, []
+        positions = self.products.get_indexer(products)
+        found = [self.records[position] for position in positions.tolist() if position >= 0]
+        missing = [product for product, position in zip(products, positions.tolist()) if position < 0]
+        return found, missing
+
+    def summary(self, key):
+        return {
+            'dataset': key, 'products': len(self.records), 'rows': self.rows,
+            'created': pd.Timestamp(self.created, unit='s').isoformat(timespec='seconds'),
+        }
+
+
+# Predictions table for a raw sales frame and column mapping
+def predict_frame(raw, mapping):
+    df, _ = engine.process_frame(raw, **mapping)
+    if df.empty:
+        raise ValueError("No valid rows found in the data")
+    daily = engine.aggregate_daily(df)
+    predictions = engine.predict_from_velocity(engine.sales_velocity(daily), engine.latest_stock(df))
+    return PredictionTable(predictions, len(df))
+
+
+# Predictions table for a dataset in the shared inventory database
+def predict_database(dataset_id):
+    database = inventory_db.get_database()
+    datasets = database.datasets().set_index('id')
+    if dataset_id not in datasets.index:
+        raise KeyError(f"Unknown dataset: {DATABASE_PREFIX}{dataset_id}")
+    predictions = engine.predict_from_velocity(
+        engine.velocity_from_totals(database.product_totals(dataset_id)), database.latest_stock(dataset_id)
+    )
+    return PredictionTable(predictions, int(datasets.at[dataset_id, 'rows']))
+
+
+# Column mapping from request arguments; unknown names and empty values are ignored
+def parse_mapping(values):
+    mapping = dict(DEFAULT_MAPPING)
+    mapping.update({name: values[name] for name in MAPPING_COLUMNS if values.get(name)})
+    return mapping
+
+
+# Loaded prediction tables by dataset key. Only used from the event loop;
+# computations run in the executor and are shared by concurrent requests.
+class PredictionService:
+    def __init__(self, max_datasets=MAX_DATASETS, workers=WORKERS):
+        self.tables = LRUCache(max_entries=max_datasets)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self._pending = {}
+
+    async def _compute(self, key, compute, *args):
+        table = self.tables.get(key)
+        if table is not None:
+            return table
+        if key not in self._pending:
+            self._pending[key] = asyncio.get_running_loop().run_in_executor(self.executor, compute, *args)
+        try:
+            table = await self._pending[key]
+        finally:
+            self._pending.pop(key, None)
+        self.tables.put(key, table)
+        return table
+
+    # Dataset key for posted sales data (same data and mapping, same key)
+    async def add(self, raw_hash, mapping, read):
+        key = store_key(raw_hash, mapping)
+        await self._compute(key, lambda: predict_frame(read(), mapping))
+        return key
+
+    async def table(self, key):
+        table = self.tables.get(key)
+        if table is not None:
+            return table
+        if key.startswith(DATABASE_PREFIX):
+            try:
+                dataset_id = int(key[len(DATABASE_PREFIX):])
+            except ValueError:
+                raise KeyError(f"Unknown dataset: {key}") from None
+            return await self._compute(key, predict_database, dataset_id)
+        raise KeyError(f"Unknown dataset: {key}")
+
+    def datasets(self):
+        return [self.tables.get(key).summary(key) for key in self.tables.keys()]
+
+
+class JSONHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def send_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(payload))
+
+    # Errors as JSON; the status (and its reason) is already set
+    def write_error(self, status_code, **kwargs):
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps({'error': self._reason}))
+
+    def json_body(self):
+        try:
+            return json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Request body is not valid JSON") from None
+
+
+class HealthHandler(JSONHandler):
+    def get(self):
+        self.send_json({'status': 'ok', 'datasets': len(self.service.tables)})
+
+
+class DatasetsHandler(JSONHandler):
+    def get(self):
+        self.send_json({'datasets': self.service.datasets()})
+
+    async def post(self):
+        content_type = self.request.headers.get('Content-Type', '')
+        if content_type.startswith('application/json'):
+            body = self.json_body()
+            mapping = parse_mapping(body.get('mapping') or {})
+            rows = body.get('rows')
+            if not isinstance(rows, list):
+                raise tornado.web.HTTPError(400, reason="Expected a list of rows")
+            raw_hash = content_hash(self.request.body)
+            read = lambda: pd.DataFrame.from_records(rows)  # noqa: E731
+        else:
+            mapping = parse_mapping({name: self.get_argument(name, None) for name in MAPPING_COLUMNS})
+            data = self.request.body
+            raw_hash = content_hash(data)
+            read = lambda: pd.read_csv(io.BytesIO(data))  # noqa: E731
+
+        try:
+            key = await self.service.add(raw_hash, mapping, read)
+        except (KeyError, ValueError) as error:
+            raise tornado.web.HTTPError(400, reason=f"Could not process the data: {error}") from None
+        self.send_json(self.service.tables.get(key).summary(key), status=201)
+
+
+class PredictHandler(JSONHandler):
+    async def respond(self, key, products):
+        if not key:
+            raise tornado.web.HTTPError(400, reason="Missing dataset")
+        try:
+            table = await self.service.table(key)
+        except KeyError as error:
+            raise tornado.web.HTTPError(404, reason=str(error.args[0])) from None
+        predictions, missing = table.lookup(products)
+        self.send_json({'dataset': key, 'predictions': predictions, 'missing': missing})
+
+    async def get(self):
+        products = self.get_arguments('product')
+        await self.respond(self.get_argument('dataset', None), products or None)
+
+    async def post(self):
+        body = self.json_body()
+        products = body.get('products')
+        if products is not None and not isinstance(products, list):
+            raise tornado.web.HTTPError(400, reason="Expected a list of products")
+        await self.respond(body.get('dataset'), None if products is None else [str(product) for product in products])
+
+
+def make_app(service=None):
+    service = service or PredictionService()
+    handlers = [
+        (r'/health', HealthHandler),
+        (r'/datasets', DatasetsHandler),
+        (r'/predict', PredictHandler),
+    ]
+    return tornado.web.Application([(path, handler, {'service': service}) for path, handler in handlers])
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Serve stockout predictions over HTTP.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument("--preload", default=None, help="CSV or Excel file to load at startup")
+    arg_parser.add_argument("--date-col", default="date")
+    arg_parser.add_argument("--product-col", default="product")
+    arg_parser.add_argument("--quantity-col", default="quantity")
+    arg_parser.add_argument("--stock-col", default=None)
+    arg_parser.add_argument("--receipts-col", default=None)
+    arg_parser.add_argument("--location-col", default=None)
+    return arg_parser
+
+
+async def serve(args):
+    service = PredictionService()
+    if args.preload:
+        mapping = parse_mapping(vars(args))
+        columns = list(dict.fromkeys(mapping.values()))
+        with open(args.preload, 'rb') as fh:
+            raw_hash = content_hash(fh.read())
+        key = await service.add(raw_hash, mapping, lambda: read_sales_file(args.preload, columns))
+        print(f"Loaded {args.preload} as dataset {key}")
+
+    app = make_app(service)
+    app.listen(args.port, address=args.host, max_body_size=MAX_BODY_MB * 1024 * 1024)
+    print(f"Serving predictions on http://{args.host}:{args.port}")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(serve(build_arg_parser().parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
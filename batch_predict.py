@@ -0,0 +1,132 @@
+# batch_predict.py
+# Command-line batch mode: reads a sales file and writes the predictions table
+# without a browser session, using the same engine as the Streamlit app.
+#
+# Usage:
+#   python batch_predict.py sales.csv -o stock_predictions.csv \
+#       --date-col date --product-col product --quantity-col quantity \
+#       --stock-col stock --receipts-col receipts
+#   python batch_predict.py sales.csv -o store_predictions.csv --location-col store \
+#       --category-col category --level series
+#   python batch_predict.py sales.csv -o risk.csv --simulate 10000 --service-level 0.95
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+import engine
+import excel
+import simulation
+from rollup import LEVELS, LocationRollup
+
+
+# Read a CSV or Excel file, only loading the columns we need
+def read_sales_file(path, columns, sheet_name=None):
+    if path.lower().endswith('.xlsx'):
+        with open(path, 'rb') as fh:
+            return excel.read_columns(fh, columns, sheet_name)
+    if path.lower().endswith('.xls'):
+        return pd.read_excel(path, sheet_name=sheet_name or 0, usecols=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+# Write predictions as CSV (default) or Parquet, based on the extension
+def write_predictions(predictions, path):
+    if path.lower().endswith('.parquet'):
+        predictions.to_parquet(path, index=False)
+    else:
+        predictions.to_csv(path, index=False)
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(
+        description="Compute stockout predictions for every product in a sales file."
+    )
+    arg_parser.add_argument("input", help="CSV or Excel file with sales data")
+    arg_parser.add_argument("-o", "--output", default="stock_predictions.csv",
+                            help="Output file (.csv or .parquet)")
+    arg_parser.add_argument("--date-col", default="date")
+    arg_parser.add_argument("--product-col", default="product")
+    arg_parser.add_argument("--quantity-col", default="quantity")
+    arg_parser.add_argument("--stock-col", default=None,
+                            help=f"Current stock column (default: assume {engine.DEFAULT_STOCK} units)")
+    arg_parser.add_argument("--receipts-col", default=None,
+                            help="Stock receipts column (default: assume 0 units)")
+    arg_parser.add_argument("--sheet", default=None,
+                            help="Excel sheet to read (default: the first sheet)")
+    arg_parser.add_argument("--location-col", default=None,
+                            help="Location column; stock is then summed over each product's locations")
+    arg_parser.add_argument("--category-col", default=None,
+                            help="Product category column (used with --location-col)")
+    arg_parser.add_argument("--level", default="product", choices=["series"] + list(LEVELS),
+                            help="With --location-col: write predictions per product x location "
+                                 "(series) or rolled up to product (default), location or category")
+    arg_parser.add_argument("--simulate", type=int, default=0, metavar="PATHS",
+                            help="Add Monte Carlo stockout probability and reorder quantity "
+                                 "columns from PATHS demand paths per product (product level only)")
+    arg_parser.add_argument("--threshold-days", type=int, default=7,
+                            help="Days ahead for the simulated stockout probability")
+    arg_parser.add_argument("--service-level", type=float, default=simulation.SERVICE_LEVEL)
+    arg_parser.add_argument("--seed", type=int, default=None, help="Random seed for --simulate")
+    return arg_parser
+
+
+def main(argv=None):
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    # Checked before reading, so a mistyped option doesn't cost a full read
+    if args.level != "product" and args.location_col is None:
+        arg_parser.error("--level needs --location-col")
+    if args.simulate and args.level != "product":
+        arg_parser.error("--simulate works at the product level only")
+    if args.simulate < 0:
+        arg_parser.error("--simulate needs a number of paths (0 = off)")
+    if not 0 < args.service_level < 1:
+        arg_parser.error("--service-level must be between 0 and 1")
+    if args.threshold_days < 1:
+        arg_parser.error("--threshold-days must be at least 1")
+
+    columns = [args.date_col, args.product_col, args.quantity_col]
+    columns += [col for col in (args.stock_col, args.receipts_col, args.location_col, args.category_col)
+                if col is not None]
+    # Keep the order, drop duplicates (the same column may be mapped twice)
+    columns = list(dict.fromkeys(columns))
+
+    start = time.perf_counter()
+    raw = read_sales_file(args.input, columns, args.sheet)
+    df, invalid_dates = engine.process_frame(
+        raw,
+        args.date_col,
+        args.product_col,
+        args.quantity_col,
+        stock_col=args.stock_col,
+        receipts_col=args.receipts_col,
+        location_col=args.location_col,
+        category_col=args.category_col if args.location_col else None
+    )
+    if len(invalid_dates):
+        print(f"Warning: could not parse some date values: "
+              f"{', '.join(map(str, invalid_dates[:5]))}...", file=sys.stderr)
+
+    if args.level == "product":
+        daily = engine.aggregate_daily(df)
+        predictions = engine.predict(daily, engine.latest_stock(df))
+        if args.simulate:
+            predictions = simulation.simulate(
+                daily, predictions, args.threshold_days, paths=args.simulate,
+                service_level=args.service_level, seed=args.seed
+            )
+    else:
+        locations = LocationRollup.from_frame(df)
+        predictions = locations.series if args.level == "series" else locations.level(args.level)
+    write_predictions(predictions, args.output)
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(predictions):,} predictions from {len(df):,} rows "
+          f"to {args.output} in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
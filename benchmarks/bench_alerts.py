@@ -0,0 +1,106 @@
+# bench_alerts.py
+# Schedules and delivers alerts for a synthetic catalog against a local SMTP
+# stand-in (aiosmtpd), and reports messages, connections and timings.
+#
+# Usage: pip install aiosmtpd
+#        python benchmarks/bench_alerts.py --products 5000 --subscribers 3
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from aiosmtpd.controller import Controller
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import alerts
+import engine
+
+
+# Counts messages and SMTP sessions seen by the stand-in server
+class CountingHandler:
+    def __init__(self):
+        self.messages = 0
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.sessions.add(id(session))
+        return '250 OK'
+
+
+# Predictions table with stockout dates spread over the next `max_days` days
+def make_predictions(products, max_days, seed=0):
+    rng = np.random.default_rng(seed)
+    days = rng.uniform(0.5, max_days, size=products)
+    table = pd.DataFrame({
+        'product': [f"SKU{i:07d}" for i in range(products)],
+        'avg_daily_sales': rng.uniform(1, 20, size=products),
+    })
+    table['adjusted_stock'] = table['avg_daily_sales'] * days
+    return engine.add_stockout_predictions(table, days=days)
+
+
+def time_call(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark alert scheduling and delivery")
+    arg_parser.add_argument("--products", type=int, default=5_000)
+    arg_parser.add_argument("--subscribers", type=int, default=3)
+    arg_parser.add_argument("--threshold", type=int, default=7)
+    arg_parser.add_argument("--max-days", type=float, default=60)
+    arg_parser.add_argument("--rate", type=float, default=0,
+                            help="Messages per second (0 = unlimited)")
+    arg_parser.add_argument("--port", type=int, default=8025)
+    args = arg_parser.parse_args()
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    try:
+        store = alerts.AlertStore(os.path.join(tempfile.mkdtemp(), "alerts.sqlite3"))
+        predictions = make_predictions(args.products, args.max_days)
+        emails = [f"buyer{i}@example.com" for i in range(args.subscribers)]
+
+        seconds = 0.0
+        for email in emails:
+            elapsed, _ = time_call(store.schedule, email, predictions, args.threshold)
+            seconds += elapsed
+        print(f"products={args.products:,} subscribers={args.subscribers} threshold={args.threshold}")
+        print(f"schedule:            {seconds:8.3f}s")
+
+        # Re-evaluating with a few changed predictions only rewrites those
+        updated = predictions.copy()
+        moved = updated.sample(frac=0.01, random_state=0).index
+        updated.loc[moved, 'stockout_date'] += pd.Timedelta(days=3)
+        elapsed, (changed, cancelled) = time_call(store.schedule, emails[0], updated, args.threshold)
+        print(f"re-evaluate (1%):    {elapsed:8.3f}s  rewritten: {changed:,}")
+
+        pool = alerts.SMTPPool("127.0.0.1", args.port)
+        scheduler = alerts.AlertScheduler(store, pool, "alerts@example.com", rate_per_second=args.rate)
+
+        # Deliver everything due today, then everything due within max_days
+        elapsed, (messages, delivered) = time_call(scheduler.run_once)
+        print(f"deliver due today:   {elapsed:8.3f}s  alerts: {delivered:,} in {messages:,} messages")
+        later = time.time() + args.max_days * 86_400
+        elapsed, (messages, delivered) = time_call(scheduler.run_once, now=later)
+        print(f"deliver remaining:   {elapsed:8.3f}s  alerts: {delivered:,} in {messages:,} messages")
+        _, (messages, delivered) = time_call(scheduler.run_once, now=later)
+        print(f"repeat run (dedup):  alerts: {delivered:,} in {messages:,} messages")
+        pool.close()
+
+        print(f"server received:     {handler.messages:,} messages over "
+              f"{len(handler.sessions)} connection(s)")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
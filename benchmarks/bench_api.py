@@ -0,0 +1,111 @@
+# bench_api.py
+# Load test for the prediction API (api.py): starts the server in a separate
+# process, posts a synthetic sales file once, then keeps `--concurrency`
+# clients sending batched /predict requests and reports throughput and
+# latency percentiles.
+#
+# Usage: python benchmarks/bench_api.py --products 50000 --batch 100 --concurrency 32 --seconds 10
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import make_sales_data, mapping_for
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_up(client, base_url, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            await client.fetch(f"{base_url}/health")
+            return
+        except (ConnectionError, HTTPClientError, OSError):
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def load(client, base_url, dataset, products, batch, concurrency, seconds, seed):
+    rng = np.random.default_rng(seed)
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            names = products[rng.integers(0, len(products), size=batch)].tolist()
+            body = json.dumps({"dataset": dataset, "products": names})
+            start = time.perf_counter()
+            await client.fetch(f"{base_url}/predict", method="POST", body=body,
+                               headers={"Content-Type": "application/json"})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+async def run(args):
+    df = make_sales_data(args.products, args.days, args.rows_per_day)
+    mapping = {name: column for name, column in mapping_for(df).items() if column is not None}
+    payload = df.to_csv(index=False).encode("utf-8")
+    products = df["Product"].unique()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "api.py"), "--port", str(port)], cwd=ROOT)
+    client = AsyncHTTPClient(max_clients=args.concurrency)
+    try:
+        await wait_until_up(client, base_url)
+
+        start = time.perf_counter()
+        response = await client.fetch(f"{base_url}/datasets?{urllib.parse.urlencode(mapping)}", method="POST",
+                                      body=payload, headers={"Content-Type": "text/csv"},
+                                      request_timeout=600)
+        dataset = json.loads(response.body)["dataset"]
+        print(f"rows={len(df):,} products={len(products):,} upload={len(payload) / 1e6:.1f} MB "
+              f"processed in {time.perf_counter() - start:.2f}s")
+
+        latencies, elapsed = await load(client, base_url, dataset, products, args.batch,
+                                        args.concurrency, args.seconds, args.seed)
+        p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+        print(f"batch={args.batch} concurrency={args.concurrency}: {len(latencies):,} requests in "
+              f"{elapsed:.1f}s = {len(latencies) / elapsed:,.0f} req/s "
+              f"({len(latencies) * args.batch / elapsed:,.0f} products/s)")
+        print(f"latency p50 {p50:.1f} ms  p95 {p95:.1f} ms  p99 {p99:.1f} ms")
+    finally:
+        client.close()
+        server.terminate()
+        server.wait()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Load test the prediction API")
+    arg_parser.add_argument("--products", type=int, default=10_000)
+    arg_parser.add_argument("--days", type=int, default=90)
+    arg_parser.add_argument("--rows-per-day", type=int, default=2_000)
+    arg_parser.add_argument("--batch", type=int, default=100, help="Products per request")
+    arg_parser.add_argument("--concurrency", type=int, default=32)
+    arg_parser.add_argument("--seconds", type=float, default=10)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_excel.py
+# Compares the original Excel path (pd.read_excel of the whole sheet) with
+# excel.py: header-only reads and streaming of just the mapped columns
+# (and the calamine engine when python-calamine is installed).
+#
+# Usage: python benchmarks/bench_excel.py --rows 300000 --extra-columns 10
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel
+from synthetic import make_sales_data, mapping_for
+
+
+def measure(func, *args, trace_memory=True, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def report(label, seconds, peak, baseline=None):
+    memory = "" if peak is None else f"  peak {peak / 1e6:8.1f} MB"
+    speedup = "" if baseline is None else f"  {baseline / seconds:6.1f}x"
+    print(f"{label:<34} {seconds:8.3f}s{memory}{speedup}")
+
+
+def read_path(path, func, *args, **kwargs):
+    with open(path, "rb") as fh:
+        return func(fh, *args, **kwargs)
+
+
+# All chunks of the XML stream as one frame
+def stream_columns(fh, columns):
+    return pd.concat(list(excel.iter_columns(fh, columns)), ignore_index=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark Excel ingestion")
+    arg_parser.add_argument("--rows", type=int, default=100_000)
+    arg_parser.add_argument("--products", type=int, default=1_000)
+    arg_parser.add_argument("--days", type=int, default=365)
+    arg_parser.add_argument("--extra-columns", type=int, default=5,
+                            help="Unmapped columns added to the sheet (notes, prices, ...)")
+    arg_parser.add_argument("--no-memory", action="store_true",
+                            help="Skip the traced second run used for peak memory")
+    args = arg_parser.parse_args()
+    trace = not args.no_memory
+
+    rows_per_day = max(1, -(-args.rows // args.days))
+    df = make_sales_data(args.products, args.days, rows_per_day)
+    rng = np.random.default_rng(1)
+    for index in range(args.extra_columns):
+        df[f"Extra {index}"] = rng.random(len(df)) if index % 2 else "free text note"
+    columns = [col for col in mapping_for(df).values() if col is not None]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "sales.xlsx")
+        df.to_excel(path, index=False)
+        print(f"rows={len(df):,} columns={len(df.columns)} (mapped {len(columns)}) "
+              f"file={os.path.getsize(path) / 1e6:.1f} MB calamine={excel.calamine_available()}")
+
+        seconds, peak, _ = measure(pd.read_excel, path, nrows=0, trace_memory=trace)
+        report("header: pd.read_excel(nrows=0)", seconds, peak)
+        seconds, peak, _ = measure(read_path, path, excel.read_header, trace_memory=trace)
+        report("header: excel.read_header", seconds, peak)
+
+        baseline, peak, expected = measure(pd.read_excel, path, trace_memory=trace)
+        report("data: pd.read_excel (all columns)", baseline, peak)
+        seconds, peak, _ = measure(pd.read_excel, path, usecols=columns, trace_memory=trace)
+        report("data: pd.read_excel(usecols)", seconds, peak, baseline)
+
+        seconds, peak, streamed = measure(read_path, path, stream_columns, columns, trace_memory=trace)
+        report("data: excel.iter_columns (XML)", seconds, peak, baseline)
+        if excel.calamine_available():
+            seconds, peak, _ = measure(read_path, path, excel.read_columns, columns, trace_memory=trace)
+            report("data: excel.read_columns (calamine)", seconds, peak, baseline)
+
+        same = expected[columns].equals(streamed)
+        print(f"streamed frame matches pd.read_excel: {same}")
+
+
+if __name__ == "__main__":
+    main()
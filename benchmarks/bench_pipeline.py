@@ -0,0 +1,248 @@
+# bench_pipeline.py
+# Times and memory-profiles every stage of the app's flow on synthetic data:
+# file read (CSV / XLSX), date parsing, numeric coercion, processing,
+# aggregation, velocity, predictions, status, a one-day delta append, each
+# chart and the CSV export.
+#
+# Results are written as JSON (one record per size and stage) so runs from
+# different versions can be compared with --compare.
+#
+# Usage: python benchmarks/bench_pipeline.py --sizes 10k,100k,1M -o results.json
+#        python benchmarks/bench_pipeline.py --sizes 10M --no-xlsx -o big.json
+#        python benchmarks/bench_pipeline.py --sizes 100k -o new.json --compare old.json
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import charts
+import delta
+import engine
+import excel
+import ingest
+from date_parsing import parse_dates
+from synthetic import make_sales_data, mapping_for, parse_size
+
+# Writing the test workbook with openpyxl is slow (~0.5s per 1,000 rows);
+# larger sizes skip the XLSX stages
+XLSX_MAX_ROWS = 100_000
+
+
+# Runs stages and records wall time, peak traced memory and output rows.
+# tracemalloc slows down allocation-heavy code (matplotlib, openpyxl) a lot,
+# so the time comes from an untraced run and the memory from a second,
+# traced run of the same stage.
+class StageRecorder:
+    def __init__(self, rows, trace_memory=True):
+        self.rows = rows
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def run(self, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+
+        peak = None
+        if self.trace_memory:
+            tracemalloc.start()
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        self.records.append({
+            "rows": self.rows,
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "peak_mb": None if peak is None else round(peak / 1e6, 3),
+            "output_rows": output_rows(result),
+        })
+        print(f"{self.rows:>12,} {stage:<24} {seconds:9.3f}s "
+              f"{'' if peak is None else f'{peak / 1e6:10.1f} MB'}")
+        return result
+
+
+def output_rows(result):
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, (pd.DataFrame, pd.Series, np.ndarray)):
+        return int(len(result))
+    return None
+
+
+# The app's Excel readers: the mapped columns at once, and in chunks as the
+# streaming ingest reads them (returns the row count)
+def read_xlsx(path, columns):
+    with open(path, 'rb') as fh:
+        return excel.read_columns(fh, columns)
+
+
+def stream_xlsx(path, columns):
+    with open(path, 'rb') as fh:
+        return sum(len(chunk) for chunk in excel.iter_chunks(fh, columns))
+
+
+# The numeric coercion done by process_frame, on its own
+def coerce_numeric(df, mapping):
+    columns = [mapping[key] for key in ("quantity_col", "stock_col", "receipts_col") if mapping[key]]
+    return pd.DataFrame({col: pd.to_numeric(df[col], errors="coerce") for col in columns})
+
+
+def bench_size(rows, args, workdir):
+    rows_per_day = max(1, math.ceil(rows / args.days))
+    raw = make_sales_data(
+        args.products, args.days, rows_per_day, args.date_formats.split(","),
+        stock=not args.no_stock, receipts=not args.no_receipts,
+        invalid_share=args.invalid_share, seed=args.seed
+    )
+    mapping = mapping_for(raw)
+    recorder = StageRecorder(len(raw), trace_memory=not args.no_memory)
+
+    # File read
+    csv_path = os.path.join(workdir, f"sales_{rows}.csv")
+    raw.to_csv(csv_path, index=False)
+    df = recorder.run("read_csv", pd.read_csv, csv_path)
+    if not args.no_xlsx and len(raw) <= args.xlsx_max_rows:
+        xlsx_path = os.path.join(workdir, f"sales_{rows}.xlsx")
+        raw.to_excel(xlsx_path, index=False)
+        columns = ingest.mapped_columns(**mapping)
+        recorder.run("read_xlsx", read_xlsx, xlsx_path, columns)
+        recorder.run("stream_xlsx", stream_xlsx, xlsx_path, columns)
+    del raw
+
+    # Processing
+    recorder.run("parse_dates", parse_dates, df[mapping["date_col"]])
+    recorder.run("coerce_numeric", coerce_numeric, df, mapping)
+    processed, _ = recorder.run("process_frame", engine.process_frame, df, **mapping)
+    del df
+    processed = recorder.run(
+        "compact_frame", engine.compact_frame, processed,
+        mapping["stock_col"] is not None, mapping["receipts_col"] is not None
+    )
+
+    # Aggregation and predictions
+    daily = recorder.run("aggregate_daily", engine.aggregate_daily, processed)
+    stock = recorder.run("latest_stock", engine.latest_stock, processed)
+    velocity = recorder.run("sales_velocity", engine.sales_velocity, daily)
+    predictions = recorder.run("predict_from_velocity", engine.predict_from_velocity, velocity, stock)
+    days = predictions["days_until_stockout"].to_numpy()
+    recorder.run("stockout_status", engine.stockout_status, days)
+
+    # Daily delta: the last day of data appended to the rest of the history
+    last_day = processed["date"] == processed["date"].max()
+    base, appended = processed[~last_day], processed[last_day]
+    base_daily = engine.aggregate_daily(base)
+    base_stock = engine.latest_stock(base)
+    base_totals = engine.product_totals(base_daily)
+    base_predictions = engine.predict_from_velocity(engine.velocity_from_totals(base_totals), base_stock)
+    recorder.run("apply_delta", delta.apply_delta,
+                 base_daily, base_stock, base_totals, base_predictions, appended)
+    del base, appended, base_daily
+
+    # Charts, rendered to PNG like the dashboard
+    recorder.run("chart_timeline", lambda: charts.figure_png(charts.stockout_timeline_figure(predictions)))
+    recorder.run(
+        "chart_health",
+        lambda: charts.figure_png(charts.inventory_health_figure(predictions["status"].value_counts()))
+    )
+    top_product = velocity.loc[velocity["avg_daily_sales"].idxmax(), "product"]
+    product_data = daily[daily["product"] == top_product]
+    recorder.run(
+        "chart_product_trend",
+        lambda: charts.figure_png(charts.product_trend_figure(product_data, top_product))
+    )
+    recorder.run("trend_lines", charts.trend_lines, daily, "quantity")
+
+    # Export
+    recorder.run("export_csv", predictions.to_csv, index=False)
+    return recorder.records
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# Print per-stage time ratios against an earlier results file
+def compare(records, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    before = {(r["rows"], r["stage"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    for record in records:
+        old = before.get((record["rows"], record["stage"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = record["seconds"] / old["seconds"]
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"{record['rows']:>12,} {record['stage']:<24} {old['seconds']:9.3f}s -> "
+              f"{record['seconds']:9.3f}s ({ratio:5.2f}x){flag}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark every pipeline stage")
+    arg_parser.add_argument("--sizes", default="10k,100k,1M",
+                            help="Comma-separated row counts, e.g. 10k,100k,1M,10M")
+    arg_parser.add_argument("--products", type=int, default=1_000)
+    arg_parser.add_argument("--days", type=int, default=365)
+    arg_parser.add_argument("--date-formats", default="%Y-%m-%d",
+                            help="Comma-separated strftime formats mixed across rows")
+    arg_parser.add_argument("--no-stock", action="store_true")
+    arg_parser.add_argument("--no-receipts", action="store_true")
+    arg_parser.add_argument("--invalid-share", type=float, default=0.0)
+    arg_parser.add_argument("--no-xlsx", action="store_true", help="Skip the XLSX read stage")
+    arg_parser.add_argument("--xlsx-max-rows", type=int, default=XLSX_MAX_ROWS)
+    arg_parser.add_argument("--no-memory", action="store_true",
+                            help="Skip the traced second run of each stage (halves the runtime)")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("-o", "--output", default="pipeline_results.json")
+    arg_parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = arg_parser.parse_args()
+
+    records = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes.split(","):
+            records.extend(bench_size(parse_size(size), args, workdir))
+
+    results = {
+        "environment": environment(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": records,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"\nWrote {len(records)} results to {args.output}")
+
+    if args.compare:
+        compare(records, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# bench_rollup.py
+# Times the multi-location path on synthetic data: per product x location
+# totals and latest stock, the series predictions, the one-pass rollup of
+# products, locations and categories, and drill-downs into each level.
+#
+# Usage: python benchmarks/bench_rollup.py --products 10000 --locations 1000 --days 14 --rows-per-day 1000000
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import rollup
+from synthetic import make_sales_data, mapping_for
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<32} {time.perf_counter() - start:9.3f}s")
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark multi-location rollups")
+    arg_parser.add_argument("--products", type=int, default=10_000)
+    arg_parser.add_argument("--locations", type=int, default=1_000)
+    arg_parser.add_argument("--categories", type=int, default=50)
+    arg_parser.add_argument("--days", type=int, default=14)
+    arg_parser.add_argument("--rows-per-day", type=int, default=200_000)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    raw = make_sales_data(args.products, args.days, args.rows_per_day, receipts=False, seed=args.seed,
+                          locations=args.locations, categories=args.categories)
+    processed, _ = timed("process_frame", engine.process_frame, raw, **mapping_for(raw))
+    del raw
+    processed = timed("compact_frame", engine.compact_frame, processed, receipts_mapped=False)
+    print(f"rows={len(processed):,} products={args.products:,} locations={args.locations:,}")
+
+    totals = timed("series_totals", rollup.series_totals, processed)
+    stock = timed("latest_stock (per location)", engine.latest_stock, processed)
+    locations = timed("rollup (series + all levels)", rollup.LocationRollup, totals, stock)
+    print(f"series={len(locations.series):,} memory={locations.nbytes / 1e6:,.1f} MB")
+
+    daily = engine.aggregate_daily(processed)
+    timed("product predictions", engine.predict, daily, stock)
+
+    for level in rollup.LEVELS:
+        table = timed(f"level: {level}", locations.level, level)
+        member = table.loc[table["series"].idxmax(), "name"]
+        rows = timed(f"drill down: {level}", locations.drill, level, member)
+        print(f"{'':<32} {len(table):,} members, {len(rows):,} series in '{member}'")
+
+
+if __name__ == "__main__":
+    main()
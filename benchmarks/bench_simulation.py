@@ -0,0 +1,62 @@
+# bench_simulation.py
+# Times the Monte Carlo stockout simulation (simulation.py) for a synthetic
+# catalog: products x paths x days of bootstrapped demand, per thread count,
+# with peak memory and a check that results don't depend on the threads.
+#
+# Usage: python benchmarks/bench_simulation.py --products 50000 --paths 10000 --jobs 1,4,8
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import simulation
+from synthetic import make_sales_data, mapping_for
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the Monte Carlo stockout simulation")
+    arg_parser.add_argument("--products", type=int, default=5_000)
+    arg_parser.add_argument("--days", type=int, default=180)
+    arg_parser.add_argument("--rows-per-day", type=int, default=5_000)
+    arg_parser.add_argument("--paths", type=int, default=10_000)
+    arg_parser.add_argument("--threshold-days", type=int, default=7)
+    arg_parser.add_argument("--jobs", default=str(os.cpu_count() or 1),
+                            help="Comma-separated thread counts to time")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    df = make_sales_data(args.products, args.days, args.rows_per_day)
+    processed, _ = engine.process_frame(df, **mapping_for(df))
+    daily = engine.aggregate_daily(processed)
+    predictions = engine.predict(daily, engine.latest_stock(processed))
+    horizon = max(args.threshold_days, engine.RESTOCK_COVER_DAYS)
+    samples = len(predictions) * args.paths * horizon
+    print(f"products={len(predictions):,} paths={args.paths:,} days={horizon} "
+          f"samples={samples / 1e9:.2f}B cpus={os.cpu_count()}")
+
+    reference = None
+    for jobs in [int(value) for value in args.jobs.split(",")]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = simulation.simulate(daily, predictions, args.threshold_days, paths=args.paths,
+                                     seed=args.seed, n_jobs=jobs)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        columns = result[simulation.SIMULATION_COLUMNS]
+        same = "" if reference is None else f"  same as first run: {columns.equals(reference)}"
+        reference = columns if reference is None else reference
+        print(f"jobs={jobs:<3} {seconds:8.2f}s  {seconds / samples * 1e9:5.1f} ns/sample  "
+              f"peak {peak / 1e6:7.1f} MB{same}")
+
+    print(f"mean stockout probability {result['stockout_probability'].mean():.3f}, "
+          f"reorder units {result['reorder_quantity'].sum():,}")
+
+
+if __name__ == "__main__":
+    main()
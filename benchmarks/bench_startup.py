@@ -0,0 +1,91 @@
+# bench_startup.py
+# Cold-start and rerun latency of the Streamlit app (main.py), measured with
+# Streamlit's AppTest in fresh processes: the first script run without data
+# (module imports included), the first run with a synthetic dataset loaded,
+# and reruns after typical widget changes.
+#
+# Usage: python benchmarks/bench_startup.py --products 5000 --repeat 3
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# One measurement in this (fresh) process; prints the timings as JSON
+def measure(products, days):
+    sys.path[:0] = [ROOT, BENCH_DIR]
+    from streamlit.testing.v1 import AppTest
+
+    timings = {}
+    app_path = os.path.join(ROOT, "main.py")
+
+    def timed_run(name, action):
+        start = time.perf_counter()
+        action()
+        timings[name] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].value}")
+
+    at = AppTest.from_file(app_path, default_timeout=600)
+    timed_run("cold start (no data)", at.run)
+    timed_run("rerun (no data)", at.run)
+
+    import engine
+    from synthetic import make_sales_data, mapping_for
+    df = make_sales_data(products, days, max(1, products // 2))
+    processed, _ = engine.process_frame(df, **mapping_for(df))
+
+    at = AppTest.from_file(app_path, default_timeout=600)
+    at.session_state["daily"] = engine.aggregate_daily(processed)
+    at.session_state["stock"] = engine.latest_stock(processed)
+    at.session_state["data_key"] = ("bench",)
+    timed_run("first run with data", at.run)
+    timed_run("rerun: same widgets", at.run)
+    timed_run("rerun: alert threshold", lambda: at.sidebar.slider[0].set_value(3).run())
+    view = next(radio for radio in at.radio if "Sales Trends" in radio.options)
+    timed_run("rerun: Sales Trends view", lambda: view.set_value("Sales Trends").run())
+    view = next(radio for radio in at.radio if "Inventory Health" in radio.options)
+    timed_run("rerun: Inventory Health view", lambda: view.set_value("Inventory Health").run())
+    product = next(box for box in at.selectbox if box.label == "Select Product")
+    timed_run("rerun: select a product", lambda: product.set_value(product.options[1]).run())
+    print(json.dumps(timings))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark app cold start and rerun latency")
+    arg_parser.add_argument("--products", type=int, default=5_000)
+    arg_parser.add_argument("--days", type=int, default=90)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per measurement")
+    arg_parser.add_argument("-o", "--output", default=None, help="Write the median timings as JSON")
+    arg_parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        measure(args.products, args.days)
+        return
+
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--products", str(args.products), "--days", str(args.days)],
+            capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    medians = {name: sorted(run[name] for run in runs)[len(runs) // 2] for name in runs[0]}
+    print(f"products={args.products:,} days={args.days} median of {args.repeat} fresh processes")
+    for name, seconds in medians.items():
+        print(f"{name:<30} {seconds * 1000:8.0f} ms")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(medians, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
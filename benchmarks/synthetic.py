@@ -0,0 +1,125 @@
+# synthetic.py
+# Synthetic sales exports for benchmarks: one row per sale line, dates in
+# order, a configurable mix of date formats and optional stock / receipts,
+# location and category columns, like the uploads the app receives.
+#
+# Usage: python benchmarks/synthetic.py sales.csv --products 1000 --days 365 --rows-per-day 500
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Column names of the generated files (map these in the app)
+DATE_COLUMN = "Date"
+PRODUCT_COLUMN = "Product"
+QUANTITY_COLUMN = "Quantity Sold"
+STOCK_COLUMN = "Current Stock"
+RECEIPTS_COLUMN = "Stock Received"
+LOCATION_COLUMN = "Location"
+CATEGORY_COLUMN = "Category"
+
+
+# Parse "10k", "2.5M" or "10000" into a row count
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+# Sales data with `days * rows_per_day` rows. Each row's date string uses one
+# of `date_formats`, picked with `format_weights` (uniform by default).
+# `invalid_share` of the dates are replaced by unparseable text. With
+# `locations`, rows are spread uniformly over that many stores; with
+# `categories`, every product belongs to one category.
+def make_sales_data(products=1_000, days=365, rows_per_day=100, date_formats=("%Y-%m-%d",),
+                    format_weights=None, stock=True, receipts=True, invalid_share=0.0,
+                    start="2023-01-01", seed=0, locations=0, categories=0):
+    rng = np.random.default_rng(seed)
+    rows = days * rows_per_day
+    day_index = np.repeat(np.arange(days), rows_per_day)
+
+    # Format each distinct date once per format, then index into them
+    calendar = pd.date_range(start, periods=days, freq="D")
+    formatted = np.stack([calendar.strftime(fmt).to_numpy(dtype=object) for fmt in date_formats])
+    if len(date_formats) > 1:
+        weights = np.asarray(format_weights or [1] * len(date_formats), dtype=float)
+        format_index = rng.choice(len(date_formats), size=rows, p=weights / weights.sum())
+    else:
+        format_index = np.zeros(rows, dtype=int)
+    dates = formatted[format_index, day_index]
+    if invalid_share > 0:
+        dates[rng.random(rows) < invalid_share] = "not a date"
+
+    # A long-tailed catalog: a few products sell far more often than the rest
+    popularity = rng.pareto(1.5, size=products) + 1
+    product_codes = rng.choice(products, size=rows, p=popularity / popularity.sum())
+    names = np.char.add("SKU", np.char.zfill(np.arange(products).astype(str), 7)).astype(object)
+
+    data = {
+        DATE_COLUMN: dates,
+        PRODUCT_COLUMN: names[product_codes],
+        QUANTITY_COLUMN: rng.poisson(rng.uniform(1, 10, size=products)[product_codes]),
+    }
+    if stock:
+        data[STOCK_COLUMN] = rng.integers(0, 500, size=rows)
+    if receipts:
+        # Most rows have no receipts; a few carry a delivery
+        delivered = rng.random(rows) < 0.02
+        data[RECEIPTS_COLUMN] = np.where(delivered, rng.integers(20, 200, size=rows), 0)
+    if locations:
+        stores = np.char.add("Store ", np.char.zfill(np.arange(locations).astype(str), 4)).astype(object)
+        data[LOCATION_COLUMN] = stores[rng.integers(0, locations, size=rows)]
+    if categories:
+        groups = np.char.add("Category ", np.arange(categories).astype(str)).astype(object)
+        data[CATEGORY_COLUMN] = groups[rng.integers(0, categories, size=products)][product_codes]
+    return pd.DataFrame(data)
+
+
+# Column mapping for a generated frame, in process_frame's argument order
+def mapping_for(df):
+    mapping = {
+        "date_col": DATE_COLUMN,
+        "product_col": PRODUCT_COLUMN,
+        "quantity_col": QUANTITY_COLUMN,
+        "stock_col": STOCK_COLUMN if STOCK_COLUMN in df.columns else None,
+        "receipts_col": RECEIPTS_COLUMN if RECEIPTS_COLUMN in df.columns else None,
+    }
+    # Hierarchy columns only when generated, like the app's mapping
+    if LOCATION_COLUMN in df.columns:
+        mapping["location_col"] = LOCATION_COLUMN
+        if CATEGORY_COLUMN in df.columns:
+            mapping["category_col"] = CATEGORY_COLUMN
+    return mapping
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic sales file (.csv or .xlsx)")
+    arg_parser.add_argument("output")
+    arg_parser.add_argument("--products", type=int, default=1_000)
+    arg_parser.add_argument("--days", type=int, default=365)
+    arg_parser.add_argument("--rows-per-day", type=int, default=100)
+    arg_parser.add_argument("--date-formats", default="%Y-%m-%d",
+                            help="Comma-separated strftime formats mixed across rows")
+    arg_parser.add_argument("--no-stock", action="store_true")
+    arg_parser.add_argument("--no-receipts", action="store_true")
+    arg_parser.add_argument("--invalid-share", type=float, default=0.0)
+    arg_parser.add_argument("--locations", type=int, default=0, help="Add a Location column")
+    arg_parser.add_argument("--categories", type=int, default=0, help="Add a Category column")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    df = make_sales_data(
+        args.products, args.days, args.rows_per_day, args.date_formats.split(","),
+        stock=not args.no_stock, receipts=not args.no_receipts,
+        invalid_share=args.invalid_share, seed=args.seed,
+        locations=args.locations, categories=args.categories
+    )
+    if args.output.endswith(".xlsx"):
+        df.to_excel(args.output, index=False)
+    else:
+        df.to_csv(args.output, index=False)
+    print(f"Wrote {len(df):,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
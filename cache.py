@@ -0,0 +1,105 @@
+# cache.py
+# Size-bounded memo cache used to skip recomputation across Streamlit reruns.
+#
+# Keys are built from a content hash of the uploaded file plus the column
+# mapping, so a rerun triggered by an unrelated widget (threshold slider,
+# product selectbox) reuses the parsed frame, daily aggregates, predictions
+# and figures instead of recomputing them.
+import hashlib
+import sys
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+# Content hash of an uploaded file (or any bytes-like payload)
+def content_hash(data):
+    if hasattr(data, 'getbuffer'):
+        data = data.getbuffer()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Approximate in-memory size of a cached value. Object columns (product
+# names, statuses, formatted dates) are measured deep, not as 8 B pointers.
+def estimate_size(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+# Least-recently-used cache bounded by entry count and approximate bytes
+class LRUCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+
+        size = estimate_size(value)
+        # Values bigger than the whole budget are not cached at all
+        if size > self.max_bytes:
+            return value
+
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        self._evict()
+        return value
+
+    # Return the cached value for `key`, computing and storing it on a miss
+    def get_or_compute(self, key, compute):
+        if key in self._entries:
+            return self.get(key)
+        self.misses += 1
+        return self.put(key, compute())
+
+    # Keys from least to most recently used
+    def keys(self):
+        return list(self._entries)
+
+    # Drop every entry whose key starts with `prefix` (a tuple)
+    def invalidate(self, prefix):
+        stale = [key for key in self._entries if key[:len(prefix)] == prefix]
+        for key in stale:
+            self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.nbytes -= size
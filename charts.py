@@ -0,0 +1,255 @@
+# charts.py
+# Chart rendering for the dashboard, built to scale to large catalogs.
+#
+# - The stockout timeline draws the top-N at-risk products as bars and
+#   summarises every other product in a histogram, instead of one bar and
+#   one text label per product.
+# - Long daily series are downsampled with LTTB (largest triangle three
+#   buckets) before plotting.
+# - Figures are rendered once to PNG bytes; callers cache them under a hash
+#   of the plotted data, so identical data is never drawn twice.
+# - matplotlib is only imported when the first figure is drawn (importing it
+#   takes about half a second), so startup and reruns that show cached
+#   figures don't pay for it.
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+
+import engine
+import perf
+
+# Bars drawn in the stockout timeline before switching to top-N + histogram
+DEFAULT_TOP_N = 30
+# Maximum points per plotted time series
+MAX_SERIES_POINTS = 500
+# Products shown individually in the all-products sales chart
+TOP_TREND_PRODUCTS = 10
+
+# Widest PNG Streamlit shows without resizing (and re-encoding) it on every
+# rerun: its maximum content width, minus a margin for the tight bounding box
+MAX_IMAGE_WIDTH = 1400
+FIGURE_DPI = 140
+
+STATUS_COLORS = {engine.STATUS_SAFE: 'green', engine.STATUS_LOW: 'orange', engine.STATUS_CRITICAL: 'red'}
+
+
+# Stable hash of the data behind a chart, used as its cache key
+def frame_hash(*frames):
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        labels = frame.columns if isinstance(frame, pd.DataFrame) else [frame.name]
+        digest.update(str(list(labels)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+# pyplot, imported on first use
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# Render a figure to PNG bytes so the cached result can be shown with
+# st.image without re-drawing on every rerun. Wide figures get a lower dpi so
+# the image stays under MAX_IMAGE_WIDTH and Streamlit doesn't resize it either.
+def figure_png(fig):
+    buffer = io.BytesIO()
+    dpi = min(FIGURE_DPI, MAX_IMAGE_WIDTH / fig.get_size_inches()[0])
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    _pyplot().close(fig)
+    return buffer.getvalue()
+
+
+# Indices of the points kept by LTTB downsampling of (x, y) to `threshold`
+# points. Keeps the first and last point and, per bucket, the point forming
+# the largest triangle with the previously kept point and the next bucket's
+# average.
+def lttb_indices(x, y, threshold=MAX_SERIES_POINTS):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+# Numeric x values for dates (LTTB needs distances along x)
+def _date_positions(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+# Stockout timeline: days until stockout per product, colour-coded by status.
+# Catalogs larger than `top_n` show the top-N at-risk products plus a
+# histogram of everything else.
+def stockout_timeline_figure(sales_velocity, top_n=DEFAULT_TOP_N):
+    # Sort by days until stockout for better visualization
+    sorted_data = sales_velocity.sort_values('days_until_stockout', ascending=True)
+    top = sorted_data.head(top_n)
+    rest = sorted_data.iloc[top_n:]
+
+    if rest.empty:
+        fig, ax = _pyplot().subplots(figsize=(10, 6))
+    else:
+        fig, (ax, hist_ax) = _pyplot().subplots(
+            1, 2, figsize=(14, 6), gridspec_kw={'width_ratios': [3, 2]}
+        )
+
+    # Bars for the most urgent products
+    days = top['days_until_stockout'].to_numpy(dtype=float)
+    bars = ax.bar(range(len(top)), days, color=engine.status_colors(days))
+    # Value labels only while they stay readable
+    if len(top) <= 40:
+        ax.bar_label(bars, labels=[f'{d:.1f}' for d in days], fontweight='bold')
+
+    # Add threshold lines
+    ax.axhline(y=engine.LOW_DAYS, color='orange', linestyle='--', alpha=0.7, label='Low Stock Threshold')
+    ax.axhline(y=engine.SAFE_DAYS, color='green', linestyle='--', alpha=0.7, label='Safe Stock Threshold')
+
+    # Customize the chart
+    title = 'Days Until Stockout by Product' if rest.empty else f'Top {len(top)} At-Risk Products'
+    ax.set_title(title, fontsize=16, fontweight='bold')
+    ax.set_xlabel('Product')
+    ax.set_ylabel('Days Until Stockout')
+    ax.set_xticks(range(len(top)))
+    ax.set_xticklabels(top['product'], rotation=45, ha='right')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+
+    # Distribution of the remaining products
+    if not rest.empty:
+        rest_days = rest['days_until_stockout'].to_numpy(dtype=float)
+        finite = rest_days[np.isfinite(rest_days)]
+        never = int(np.isposinf(rest_days).sum())
+        # NaN: no sales and no stock, or no stock readings (shown as Critical)
+        unknown = int(np.isnan(rest_days).sum())
+        if len(finite):
+            # Clip the long tail so the bulk of the catalog stays visible
+            upper = max(np.percentile(finite, 99), engine.SAFE_DAYS * 2)
+            hist_ax.hist(np.clip(finite, None, upper), bins=40, color='steelblue', alpha=0.8)
+        hist_ax.axvline(x=engine.LOW_DAYS, color='orange', linestyle='--', alpha=0.7)
+        hist_ax.axvline(x=engine.SAFE_DAYS, color='green', linestyle='--', alpha=0.7)
+        subtitle = f'Other {len(rest):,} Products'
+        notes = []
+        if never:
+            notes.append(f'{never:,} never run out')
+        if unknown:
+            notes.append(f'{unknown:,} unknown')
+        if notes:
+            subtitle += f" ({', '.join(notes)})"
+        hist_ax.set_title(subtitle, fontsize=14, fontweight='bold')
+        hist_ax.set_xlabel('Days Until Stockout')
+        hist_ax.set_ylabel('Products')
+        hist_ax.grid(axis='y', alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+# Daily sales, receipts and 7-day moving average for a single product, with
+# long histories downsampled before plotting
+def product_trend_figure(product_data, selected_product, max_points=MAX_SERIES_POINTS):
+    dates = product_data['date'].to_numpy()
+    quantity = product_data['quantity'].to_numpy(dtype=float)
+    receipts = product_data['stock_receipts'].to_numpy(dtype=float)
+    # The moving average is computed on the full series, then sampled
+    moving_avg = product_data['quantity'].rolling(window=7, min_periods=1).mean().to_numpy()
+
+    keep = lttb_indices(_date_positions(dates), quantity, max_points)
+    dates, quantity, moving_avg = dates[keep], quantity[keep], moving_avg[keep]
+
+    # Create a line chart with area
+    fig, ax = _pyplot().subplots(figsize=(10, 6))
+
+    # Plot the sales data
+    ax.plot(dates, quantity, marker='o' if len(dates) <= 120 else None,
+            linewidth=2, markersize=4, label='Daily Sales')
+
+    # Plot stock receipts if available (only the days with receipts)
+    if (receipts > 0).any():
+        has_receipts = receipts > 0
+        ax.bar(product_data['date'].to_numpy()[has_receipts], receipts[has_receipts],
+               alpha=0.5, label='Stock Receipts', color='green')
+
+    # Add a 7-day moving average
+    ax.plot(dates, moving_avg, color='red', linewidth=2, label='7-Day Moving Average')
+
+    # Fill area under the curve
+    ax.fill_between(dates, quantity, alpha=0.3)
+
+    # Customize the chart
+    ax.set_title(f'Sales Trend for {selected_product}', fontsize=16, fontweight='bold')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Quantity')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis='x', labelrotation=45)
+
+    fig.tight_layout()
+    return fig
+
+
+# Pie chart of products per stock health status
+def inventory_health_figure(status_counts):
+    fig, ax = _pyplot().subplots(figsize=(8, 8))
+
+    pie_colors = [STATUS_COLORS[status] for status in status_counts.index]
+
+    # Create the pie chart
+    wedges, texts, autotexts = ax.pie(
+        status_counts.values,
+        labels=status_counts.index,
+        autopct='%1.1f%%',
+        colors=pie_colors,
+        startangle=90
+    )
+
+    # Style the text
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+
+    ax.set_title('Inventory Health Distribution', fontsize=16, fontweight='bold')
+    return fig
+
+
+# Date x product frame for st.line_chart: the top products by total value
+# plus one "All other products" column, downsampled with LTTB on the total
+@perf.timed('trend_lines')
+def trend_lines(daily_data, value_column, top_k=TOP_TREND_PRODUCTS, max_points=MAX_SERIES_POINTS):
+    totals = daily_data.groupby('product', observed=True)[value_column].sum()
+    top_products = totals.nlargest(top_k).index
+
+    is_top = daily_data['product'].isin(top_products).to_numpy()
+    lines = daily_data[is_top].pivot_table(
+        index='date', columns='product', values=value_column, aggfunc='sum', observed=True
+    )
+    lines.columns = lines.columns.astype(str)
+    if (~is_top).any():
+        others = daily_data[~is_top].groupby('date')[value_column].sum()
+        lines = lines.join(others.rename('All other products'), how='outer')
+    lines = lines.sort_index().fillna(0)
+
+    # One set of dates for every line, picked from the shape of the total
+    keep = lttb_indices(_date_positions(lines.index), lines.sum(axis=1), max_points)
+    return lines.iloc[keep]
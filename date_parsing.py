@@ -0,0 +1,164 @@
+# date_parsing.py
+# Vectorized date parsing engine for the "Process Data" step.
+#
+# Sales exports repeat the same few hundred dates across millions of rows, so
+# every distinct string is parsed exactly once. The format is inferred from a
+# sample of the distinct values and applied with a single vectorized
+# pd.to_datetime call; dateutil is only used for the values that don't match.
+#
+# Timestamps with a UTC offset keep their local wall time on every path (the
+# offset is dropped, not converted to UTC), so a sale at 23:30+05:00 stays on
+# its own day and mixed offsets can share one column.
+import re
+
+import numpy as np
+import pandas as pd
+from dateutil import parser
+
+# Formats tried against the sample, in order of preference. Month-first
+# formats come before day-first ones so that ambiguous values such as
+# "01/02/2024" resolve the same way dateutil does by default.
+CANDIDATE_FORMATS = [
+    "ISO8601",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%Y/%m/%d",
+    "%m/%d/%y",
+    "%d/%m/%y",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+    "%b %d %Y",
+    "%B %d %Y",
+    "%Y%m%d",
+]
+
+# Number of distinct values used to infer the format
+SAMPLE_SIZE = 200
+
+# Timezone designator after a time of day ("T23:30:00+05:00", "10:00 Z")
+TIMEZONE_SUFFIX = re.compile(r'(\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?)\s*(?:Z|UTC|GMT|[+-]\d{2}(?::?\d{2})?)$')
+
+
+# Distinct values with their timezone designators removed (local wall time)
+def strip_timezones(values):
+    values = np.asarray(values, dtype=object)
+    if len(values) == 0:
+        return values
+    stripped = pd.Series(values).str.replace(TIMEZONE_SUFFIX, r'\1', regex=True)
+    # Non-string values come back as NaN and are kept as they were
+    return np.where(stripped.isna().to_numpy(), values, stripped.to_numpy(dtype=object))
+
+
+# Sample of distinct values, spread over the whole set
+def _sample(values, sample_size=SAMPLE_SIZE):
+    values = np.asarray(values, dtype=object)
+    if len(values) > sample_size:
+        positions = np.linspace(0, len(values) - 1, sample_size).astype(int)
+        values = values[positions]
+    return strip_timezones(values)
+
+
+# Pick the candidate format that parses the largest share of the sample
+def infer_date_format(values, sample_size=SAMPLE_SIZE):
+    values = _sample(values, sample_size)
+    if len(values) == 0:
+        return None
+
+    best_format, best_hits = None, 0
+    for fmt in CANDIDATE_FORMATS:
+        try:
+            parsed = pd.to_datetime(pd.Series(values), format=fmt, errors='coerce')
+        except (ValueError, TypeError):
+            continue
+        hits = int(parsed.notna().sum())
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+            if hits == len(values):
+                break
+
+    return best_format
+
+
+# Whether another candidate format parses the same sample values into
+# different dates, e.g. "03/04/2024" read month-first and day-first. Only more
+# distinct values (a day above 12) can settle such a format.
+def is_ambiguous_format(values, date_format, sample_size=SAMPLE_SIZE):
+    if date_format is None:
+        return False
+    sample = pd.Series(_sample(values, sample_size))
+    parsed = pd.to_datetime(sample, format=date_format, errors='coerce')
+    hits = parsed.notna()
+    for fmt in CANDIDATE_FORMATS:
+        if fmt == date_format:
+            continue
+        try:
+            other = pd.to_datetime(sample, format=fmt, errors='coerce')
+        except (ValueError, TypeError):
+            continue
+        if other[hits].notna().all() and (other[hits] != parsed[hits]).any():
+            return True
+    return False
+
+
+# Parse a single value with dateutil, returning NaT on failure
+def _parse_with_dateutil(value):
+    try:
+        parsed = parser.parse(value)
+    except (ValueError, TypeError, OverflowError):
+        return pd.NaT
+    # Keep the local wall time, as the vectorized path does
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None)
+    return parsed
+
+
+# Parse an array of distinct strings: vectorized first, dateutil for the rest
+def parse_unique_dates(values, date_format=None):
+    values = strip_timezones(values)
+    if date_format is None:
+        date_format = infer_date_format(values)
+
+    if date_format is not None:
+        parsed = pd.to_datetime(pd.Series(values), format=date_format, errors='coerce')
+        # Offsets the suffix pattern doesn't cover
+        if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+            parsed = parsed.dt.tz_localize(None)
+    else:
+        parsed = pd.Series(pd.NaT, index=range(len(values)), dtype='datetime64[ns]')
+
+    # Fall back to dateutil only for the values the inferred format missed
+    missing = np.flatnonzero(parsed.isna().to_numpy())
+    if len(missing):
+        fallback = pd.to_datetime(
+            pd.Series([_parse_with_dateutil(values[i]) for i in missing]),
+            errors='coerce'
+        )
+        parsed = parsed.astype('datetime64[ns]')
+        parsed.iloc[missing] = fallback.to_numpy(dtype='datetime64[ns]')
+
+    return parsed.to_numpy(dtype='datetime64[ns]')
+
+
+# Parse a date column, returning the parsed series and the distinct values
+# that could not be parsed (for the "Could not parse" warning)
+def parse_dates(date_series, date_format=None):
+    if pd.api.types.is_datetime64_any_dtype(date_series):
+        parsed = date_series
+        if getattr(parsed.dt, 'tz', None) is not None:
+            parsed = parsed.dt.tz_localize(None)
+        return parsed.astype('datetime64[ns]'), np.array([], dtype=object)
+
+    # Parse each distinct string once, then broadcast back to every row
+    codes, uniques = pd.factorize(date_series.astype(str))
+    parsed_uniques = parse_unique_dates(np.asarray(uniques, dtype=object), date_format)
+    parsed = pd.Series(parsed_uniques.take(codes), index=date_series.index)
+
+    invalid = np.asarray(uniques, dtype=object)[np.isnat(parsed_uniques)]
+    return parsed, invalid
@@ -0,0 +1,118 @@
+# delta.py
+# Incremental updates when new days of sales are appended ("append delta").
+#
+# A delta file is processed on its own and merged into the state kept for
+# the current dataset instead of reprocessing the whole history:
+# - daily aggregates are ordered by date, so only the existing rows on or
+#   after the delta's first date (the tail, normally empty or one day) are
+#   re-aggregated with the delta; earlier rows are kept as they are
+# - per-product totals (engine.product_totals) change by the difference
+#   between the new and old tail, for the products in the delta only
+# - the stock table keeps the latest reading per product by date
+# - predictions are recomputed for the delta's products and spliced into
+#   the previous predictions table
+#
+# Apart from copying the kept arrays, the cost is proportional to the delta
+# and the number of products, not to the length of the history.
+import numpy as np
+import pandas as pd
+
+import engine
+import perf
+
+
+# Replace the rows of `table` whose product appears in `rows`, append rows for
+# new products and keep the table ordered by product like sales_velocity
+def splice_products(table, rows):
+    rows = rows[list(table.columns)].reset_index(drop=True)
+    positions = pd.Index(table['product']).get_indexer(rows['product'])
+    existing = positions >= 0
+
+    table = table.copy()
+    for column in table.columns.drop('product'):
+        values = table[column].to_numpy(copy=True)
+        values[positions[existing]] = rows[column].to_numpy()[existing]
+        table[column] = values
+
+    if not existing.all():
+        table = pd.concat([table, rows[~existing]], ignore_index=True)
+        order = np.argsort(table['product'].to_numpy().astype(str), kind='stable')
+        table = table.iloc[order].reset_index(drop=True)
+    return table
+
+
+# Categorical product column over `categories`, recoding from its own
+def _recode_products(frame, categories):
+    products = frame['product']
+    if not isinstance(products.dtype, pd.CategoricalDtype):
+        products = products.astype('category')
+    if products.cat.categories.equals(categories):
+        return frame
+    mapping = categories.get_indexer(products.cat.categories)
+    codes = mapping[products.cat.codes.to_numpy()]
+    return frame.assign(product=pd.Categorical.from_codes(codes, categories=categories))
+
+
+# Merge the daily aggregates of a delta into the existing ones. Returns the
+# merged aggregates plus the old and new rows of the re-aggregated tail.
+@perf.timed('merge_daily')
+def merge_daily(daily, delta_daily):
+    split = int(daily['date'].searchsorted(delta_daily['date'].iloc[0], side='left'))
+    head, old_tail = daily.iloc[:split], daily.iloc[split:]
+    if old_tail.empty:
+        new_tail = delta_daily
+    else:
+        # Rows for the same (date, product) in the old tail and the delta are summed
+        new_tail = engine.aggregate_daily(pd.concat([old_tail, delta_daily], ignore_index=True))
+
+    # Product categories of the merged frame, sorted like aggregate_daily's
+    _, categories = engine.factorize_products(pd.Series(np.concatenate([
+        head['product'].cat.categories.to_numpy(dtype=object),
+        new_tail['product'].cat.categories.to_numpy(dtype=object)
+    ])).drop_duplicates())
+    categories = pd.Index(categories)
+
+    merged = pd.concat(
+        [_recode_products(head, categories), _recode_products(new_tail, categories)],
+        ignore_index=True
+    )
+    return merged, old_tail, new_tail
+
+
+# Per-product totals after replacing `old_tail` rows with `new_tail` rows
+def update_totals(totals, old_tail, new_tail):
+    new = engine.product_totals(new_tail).set_index('product')
+    old = engine.product_totals(old_tail).set_index('product').reindex(new.index, fill_value=0)
+    previous = totals.set_index('product').reindex(new.index, fill_value=0)
+    changed = (previous + new - old).reset_index()
+    return splice_products(totals, changed), changed['product']
+
+
+# Stock table after a delta. Without a mapped stock column the delta only
+# adds the assumed stock for products that had no stock level yet.
+def update_stock(stock, delta):
+    delta_stock = engine.latest_stock(delta)
+    if 'current_stock' not in delta.columns:
+        delta_stock = delta_stock[~delta_stock['product'].isin(stock['product'])]
+    return engine.combine_stock(stock, delta_stock)
+
+
+# Apply a processed delta frame (see engine.process_frame / compact_frame) to
+# the current daily aggregates, stock table, per-product totals and
+# predictions (None to build them from the totals). Returns the new
+# (daily, stock, totals, predictions, touched products).
+@perf.timed('apply_delta')
+def apply_delta(daily, stock, totals, predictions, delta, now=None):
+    delta_daily = engine.aggregate_daily(delta)
+    daily, old_tail, new_tail = merge_daily(daily, delta_daily)
+    totals, touched = update_totals(totals, old_tail, new_tail)
+    stock = update_stock(stock, delta)
+
+    if predictions is None:
+        predictions = engine.predict_from_velocity(engine.velocity_from_totals(totals), stock, now=now)
+    else:
+        # Only the products in the delta can have new velocity or stock
+        touched_totals = totals[totals['product'].isin(touched)]
+        updated = engine.predict_from_velocity(engine.velocity_from_totals(touched_totals), stock, now=now)
+        predictions = splice_products(predictions, updated)
+    return daily, stock, totals, predictions, touched
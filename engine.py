@@ -0,0 +1,396 @@
+# engine.py
+# Headless prediction engine shared by the Streamlit app and the batch CLI.
+#
+# Takes a processed frame (date, product, quantity, current_stock,
+# stock_receipts and optionally location / category) and returns the
+# predictions table. Status and stockout
+# dates are computed with NumPy so a full catalog is handled in one pass.
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import perf
+from date_parsing import parse_dates
+
+# Traffic light thresholds (days of stock left)
+SAFE_DAYS = 14
+LOW_DAYS = 7
+
+STATUS_SAFE = "🟢 Safe"
+STATUS_LOW = "🟡 Low"
+STATUS_CRITICAL = "🔴 Critical"
+
+# Assumed values when no stock / receipts column is mapped
+DEFAULT_STOCK = 100
+DEFAULT_RECEIPTS = 0
+
+# Restock suggestions: products running out within RESTOCK_WITHIN_DAYS get
+# RESTOCK_COVER_DAYS of sales, at least MIN_RESTOCK_UNITS
+RESTOCK_WITHIN_DAYS = 14
+RESTOCK_COVER_DAYS = 30
+MIN_RESTOCK_UNITS = 50
+
+# Category of rows with an empty category cell
+UNCATEGORIZED = "Uncategorized"
+
+NS_PER_DAY = 86_400 * 10**9
+# Offsets beyond ~250 years overflow datetime64[ns]; treat them as "never"
+MAX_OFFSET_NS = 250 * 365 * NS_PER_DAY
+
+PREDICTION_COLUMNS = [
+    'product', 'avg_daily_sales', 'total_receipts', 'current_stock',
+    'adjusted_stock', 'days_until_stockout', 'stockout_date', 'status'
+]
+
+
+# Turn a raw upload into the processed frame used everywhere else.
+# Returns the processed frame and the distinct date values that failed to parse.
+@perf.timed('process_frame')
+def process_frame(df, date_col, product_col, quantity_col, stock_col=None, receipts_col=None,
+                  location_col=None, category_col=None, date_format=None):
+    df_processed = df.copy()
+
+    # Parse date column with flexible format handling (the format is inferred
+    # unless given, e.g. once for all chunks of a streamed file)
+    with perf.stage('parse_dates', rows=len(df_processed)):
+        df_processed['date'], invalid_dates = parse_dates(df_processed[date_col], date_format)
+    # Remove rows with invalid dates
+    df_processed = df_processed.dropna(subset=['date'])
+
+    with perf.stage('coerce_numeric', rows=len(df_processed)):
+        df_processed['product'] = df_processed[product_col].astype(str)
+        df_processed['quantity'] = pd.to_numeric(df_processed[quantity_col], errors='coerce')
+
+        # Handle stock data
+        if stock_col is not None:
+            df_processed['current_stock'] = pd.to_numeric(df_processed[stock_col], errors='coerce')
+        else:
+            df_processed['current_stock'] = DEFAULT_STOCK
+
+        # Handle stock receipts data (missing values mean no receipts)
+        if receipts_col is not None:
+            df_processed['stock_receipts'] = pd.to_numeric(
+                df_processed[receipts_col], errors='coerce'
+            ).fillna(0)
+        else:
+            df_processed['stock_receipts'] = DEFAULT_RECEIPTS
+
+        # Optional hierarchy: stock is tracked per product x location
+        if location_col is not None:
+            df_processed['location'] = df_processed[location_col].astype(str)
+        if category_col is not None:
+            df_processed['category'] = df_processed[category_col].fillna(UNCATEGORIZED).astype(str)
+
+    # Remove rows with invalid quantities
+    df_processed = df_processed.dropna(subset=['quantity'])
+
+    return df_processed, invalid_dates
+
+
+# Smallest dtype that represents a numeric column exactly
+def downcast_numeric(series):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast='integer')
+    if not pd.api.types.is_float_dtype(series.dtype):
+        return series
+
+    values = series.to_numpy()
+    if np.isfinite(values).all() and np.array_equal(values, np.round(values)):
+        return pd.to_numeric(series, downcast='integer')
+
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(as_float32.astype(values.dtype), values, equal_nan=True):
+        return series.astype(np.float32)
+    return series
+
+
+# Shrink a processed frame for long-lived session storage: keep only the
+# derived columns, store product as a categorical, downcast the numbers and
+# drop assumed stock / receipts columns (their absence means the
+# DEFAULT_STOCK / DEFAULT_RECEIPTS scalars, see column_values).
+@perf.timed('compact_frame')
+def compact_frame(df, stock_mapped=True, receipts_mapped=True):
+    columns = ['date', 'product', 'quantity']
+    if stock_mapped:
+        columns.append('current_stock')
+    if receipts_mapped:
+        columns.append('stock_receipts')
+    labels = [name for name in ('location', 'category') if name in df.columns]
+
+    compact = df[columns + labels].reset_index(drop=True)
+    for name in ['product'] + labels:
+        compact[name] = compact[name].astype('category')
+    for name in columns[2:]:
+        compact[name] = downcast_numeric(compact[name])
+    return compact
+
+
+# Values of a processed column, falling back to the assumed scalar for
+# compacted frames where the column was dropped
+def column_values(df, name):
+    if name in df.columns:
+        return df[name].to_numpy(dtype=float)
+    default = DEFAULT_STOCK if name == 'current_stock' else DEFAULT_RECEIPTS
+    return np.full(len(df), default, dtype=float)
+
+
+# Integer codes and sorted uniques for a column of product names.
+# pd.factorize(sort=True) sorts Python string objects, which dominates the
+# runtime for large catalogs; sorting the uniques as a NumPy unicode array
+# and remapping the codes is several times faster.
+def factorize_products(products):
+    if isinstance(products.dtype, pd.CategoricalDtype):
+        codes = products.cat.codes.to_numpy()
+        uniques = products.cat.categories.to_numpy(dtype=object)
+    else:
+        codes, uniques = pd.factorize(products)
+        uniques = np.asarray(uniques, dtype=object)
+
+    order = np.argsort(uniques.astype(str), kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[codes], uniques[order]
+
+
+# Total sales and receipts per (date, product), ordered by date then product.
+# Grouping is done on integer codes with np.unique / np.bincount, which is
+# much faster than a groupby on string keys. The product column comes back
+# as a categorical so sales_velocity can reuse the codes.
+@perf.timed('aggregate_daily')
+def aggregate_daily(df):
+    date_codes, dates = pd.factorize(df['date'], sort=True)
+    product_codes, products = factorize_products(df['product'])
+
+    keys = date_codes.astype(np.int64) * len(products) + product_codes
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+    return pd.DataFrame({
+        'date': dates.take(unique_keys // len(products)),
+        'product': pd.Categorical.from_codes(unique_keys % len(products), categories=products),
+        'quantity': np.bincount(inverse, weights=df['quantity'].to_numpy(dtype=float)),
+        'stock_receipts': np.bincount(inverse, weights=column_values(df, 'stock_receipts'))
+    })
+
+
+# Latest available stock level per product by date, plus the date of that
+# reading (rows without a stock value are skipped). Rows on the same date
+# keep file order, so the last one wins like groupby().last(). With a
+# location column the latest level is kept per product x location (see
+# product_stock for the per-product sum).
+@perf.timed('latest_stock')
+def latest_stock(df):
+    labels = ['product', 'location'] if 'location' in df.columns else ['product']
+    if 'current_stock' not in df.columns:
+        stock = df[['date'] + labels].assign(current_stock=DEFAULT_STOCK)
+    else:
+        stock = df[['date'] + labels + ['current_stock']].dropna(subset=['current_stock'])
+    product_codes, products = factorize_products(stock['product'])
+    keys = product_codes
+    if 'location' in labels:
+        location_codes, locations = factorize_products(stock['location'])
+        keys = product_codes.astype(np.int64) * len(locations) + location_codes
+
+    # Stable sort by (key, date); the last row of each key is its latest
+    # reading. NaT (unknown dates in older stock tables) sorts first as int64.
+    dates = stock['date'].to_numpy(dtype='datetime64[ns]')
+    order = np.lexsort((dates.view(np.int64), keys))
+    sorted_keys = keys[order]
+    last_rows = order[np.flatnonzero(np.append(sorted_keys[1:] != sorted_keys[:-1], True))]
+
+    # Undo any downcasting from compact_frame so later arithmetic can't overflow
+    values = np.asarray(stock['current_stock'].to_numpy())[last_rows]
+    values = values.astype(np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64)
+    table = {'product': products[product_codes[last_rows]]}
+    if 'location' in labels:
+        table['location'] = locations[location_codes[last_rows]]
+    table.update({'current_stock': values, 'stock_date': dates[last_rows]})
+    return pd.DataFrame(table)
+
+
+# Merge stock tables (product, [location,] current_stock, stock_date) into
+# the latest reading per product (x location); on equal dates later tables win
+def combine_stock(*tables):
+    frames = [
+        table.rename(columns={'stock_date': 'date'}) if 'stock_date' in table.columns
+        else table.assign(date=pd.NaT)
+        for table in tables
+    ]
+    return latest_stock(pd.concat(frames, ignore_index=True))
+
+
+# Stock per product: per-location stock tables are summed over locations
+def product_stock(current_stock):
+    if 'location' not in current_stock.columns:
+        return current_stock
+    product_codes, products = factorize_products(current_stock['product'])
+    values = current_stock['current_stock'].to_numpy()
+    totals = np.bincount(product_codes, weights=values.astype(float), minlength=len(products))
+    if np.issubdtype(values.dtype, np.integer):
+        totals = totals.astype(np.int64)
+    return pd.DataFrame({'product': products, 'current_stock': totals})
+
+
+# Per-product totals of the daily aggregates: total sales, days with sales
+# rows and total receipts. Sales velocity is derived from these, so they can
+# be updated by difference when rows are appended.
+def product_totals(daily_data):
+    product_codes, products = factorize_products(daily_data['product'])
+    days_seen = np.bincount(product_codes, minlength=len(products))
+    total_sales = np.bincount(product_codes, weights=daily_data['quantity'].to_numpy(dtype=float),
+                              minlength=len(products))
+    total_receipts = np.bincount(product_codes, weights=daily_data['stock_receipts'].to_numpy(dtype=float),
+                                 minlength=len(products))
+    # Products with no rows left (e.g. filtered out) are dropped
+    seen = days_seen > 0
+    return pd.DataFrame({
+        'product': products[seen],
+        'total_sales': total_sales[seen],
+        'days_with_sales': days_seen[seen],
+        'total_receipts': total_receipts[seen]
+    })
+
+
+# Velocity table (product, avg_daily_sales, total_receipts) from product_totals
+def velocity_from_totals(totals):
+    return pd.DataFrame({
+        'product': totals['product'].to_numpy(),
+        'avg_daily_sales': totals['total_sales'].to_numpy(dtype=float) / totals['days_with_sales'].to_numpy(),
+        'total_receipts': totals['total_receipts'].to_numpy(dtype=float)
+    })
+
+
+# Average daily sales and total receipts per product
+@perf.timed('sales_velocity')
+def sales_velocity(daily_data):
+    return velocity_from_totals(product_totals(daily_data))
+
+
+# Integer day offset of each date from the first one; returns (offsets, first date)
+def day_offsets(dates):
+    dates = pd.to_datetime(dates)
+    start = dates.min()
+    return ((dates - start) // pd.Timedelta(days=1)).to_numpy(), start
+
+
+# Traffic light status for an array of days until stockout
+def stockout_status(days):
+    days = np.asarray(days, dtype=float)
+    return np.select(
+        [days > SAFE_DAYS, days > LOW_DAYS],
+        [STATUS_SAFE, STATUS_LOW],
+        default=STATUS_CRITICAL
+    )
+
+
+# Chart colours matching stockout_status
+def status_colors(days):
+    days = np.asarray(days, dtype=float)
+    return np.select(
+        [days > SAFE_DAYS, days > LOW_DAYS],
+        ['green', 'orange'],
+        default='red'
+    )
+
+
+# Days of stock left; no sales means the stock never runs out (inf)
+def days_until_stockout(adjusted_stock, avg_daily_sales):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.asarray(adjusted_stock, dtype=float) / np.asarray(avg_daily_sales, dtype=float)
+
+
+# Calendar date of the stockout; NaT when it never happens (or can't be
+# represented)
+def stockout_dates(days, now=None):
+    now = np.datetime64(now or datetime.now(), 'ns')
+    offsets = np.asarray(days, dtype=float) * NS_PER_DAY
+    valid = np.isfinite(offsets) & (np.abs(offsets) < MAX_OFFSET_NS)
+    dates = now + np.where(valid, offsets, 0).astype('int64').astype('timedelta64[ns]')
+    dates[~valid] = np.datetime64('NaT')
+    return dates
+
+
+# Fill days_until_stockout, stockout_date and status on a table that already
+# has adjusted_stock and avg_daily_sales. `days` overrides the simple
+# stock / velocity estimate (e.g. with a forecast).
+def add_stockout_predictions(table, days=None, now=None):
+    if days is None:
+        days = days_until_stockout(table['adjusted_stock'], table['avg_daily_sales'])
+    days = np.asarray(days, dtype=float)
+    table['days_until_stockout'] = days
+    table['stockout_date'] = stockout_dates(days, now)
+    table['status'] = stockout_status(days)
+    return table
+
+
+# Products that need restocking with a suggested quantity, most urgent first
+def restock_suggestions(predictions, within_days=RESTOCK_WITHIN_DAYS):
+    days = predictions['days_until_stockout'].to_numpy(dtype=float)
+    table = predictions.loc[days < within_days, [
+        'product', 'status', 'days_until_stockout', 'stockout_date',
+        'avg_daily_sales', 'total_receipts', 'adjusted_stock'
+    ]]
+    table = table.sort_values('days_until_stockout', kind='stable').reset_index(drop=True)
+    table['suggested_restock'] = restock_quantity(table['avg_daily_sales'])
+    return table
+
+
+# Restock quantity for a daily sales rate: RESTOCK_COVER_DAYS of sales, at
+# least MIN_RESTOCK_UNITS
+def restock_quantity(avg_daily_sales):
+    return np.maximum(MIN_RESTOCK_UNITS, np.round(np.asarray(avg_daily_sales, dtype=float) * RESTOCK_COVER_DAYS))
+
+
+# Day to send an alert: `threshold_days` before the stockout, or `today` once
+# that has passed (NaT when the product never runs out)
+def alert_dates(stockout_dates, threshold_days, today):
+    stockout = pd.to_datetime(pd.Series(stockout_dates)).dt.normalize()
+    return (stockout - pd.Timedelta(days=int(threshold_days))).clip(lower=pd.Timestamp(today).normalize())
+
+
+# Products running out within `threshold_days` with the day their alert is due
+def alert_schedule(predictions, threshold_days, today=None):
+    days = predictions['days_until_stockout'].to_numpy(dtype=float)
+    table = predictions.loc[days <= threshold_days, [
+        'product', 'status', 'days_until_stockout', 'adjusted_stock', 'avg_daily_sales', 'stockout_date'
+    ]]
+    table = table.sort_values('days_until_stockout', kind='stable').reset_index(drop=True)
+    table['alert_date'] = alert_dates(table['stockout_date'], threshold_days, today or datetime.now()).to_numpy()
+    return table
+
+
+# Build the predictions table from daily aggregates and latest stock levels
+def predict(daily_data, current_stock, now=None):
+    return predict_from_velocity(sales_velocity(daily_data), current_stock, now=now)
+
+
+# Build the predictions table from a per-product velocity table
+# (product, avg_daily_sales, total_receipts) and latest stock levels
+@perf.timed('predict_from_velocity')
+def predict_from_velocity(velocity, current_stock, now=None):
+    table = velocity[['product', 'avg_daily_sales', 'total_receipts']]
+    current_stock = product_stock(current_stock)
+
+    # Attach the stock level (left join: products without stock data keep
+    # NaN stock, so their stockout days are unknown and they show as Critical)
+    with perf.stage('merge_current_stock', rows=len(table)):
+        stock_index = pd.Index(current_stock['product']).get_indexer(table['product'])
+        table = table.reset_index(drop=True)
+        stock = current_stock['current_stock'].to_numpy()
+        if (stock_index < 0).any():
+            stock = np.where(stock_index >= 0, stock[stock_index].astype(float), np.nan)
+        else:
+            stock = stock[stock_index]
+        table['current_stock'] = stock
+
+    # Adjust current stock with receipts (if any)
+    table['adjusted_stock'] = table['current_stock'] + table['total_receipts']
+
+    with perf.stage('stockout_status', rows=len(table)):
+        table = add_stockout_predictions(table, now=now)
+    return table[PREDICTION_COLUMNS]
+
+
+# Convenience wrapper: processed frame in, predictions table out
+def predict_from_frame(df, now=None):
+    return predict(aggregate_daily(df), latest_stock(df), now=now)
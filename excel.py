@@ -0,0 +1,260 @@
+# excel.py
+# Fast .xlsx ingestion: header-only reads for the column mapping and
+# streaming of just the mapped columns.
+#
+# pd.read_excel on openpyxl builds and converts a cell object for every cell
+# of the sheet before the frame exists. Here the header comes from the first
+# row only (openpyxl, read-only), and the data rows are streamed straight
+# from the sheet XML with ElementTree.iterparse: only cells of the mapped
+# columns are converted, and the frame is built one chunk at a time. When
+# python-calamine (a Rust reader) is installed, it is used instead for
+# whole-sheet reads, which is faster still. openpyxl is imported on first
+# use, so CSV-only sessions never load it.
+import posixpath
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+
+try:
+    import python_calamine  # noqa: F401 - only needed by pandas' calamine engine
+except ImportError:  # pragma: no cover - optional dependency
+    python_calamine = None
+
+# Rows per chunk when streaming a sheet
+CHUNK_ROWS = 250_000
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def calamine_available():
+    return python_calamine is not None
+
+
+def _rewind(file):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return file
+
+
+def _open_workbook(file):
+    import openpyxl
+    return openpyxl.load_workbook(_rewind(file), read_only=True, data_only=True)
+
+
+# Sheet names of a workbook, in workbook order
+def sheet_names(file):
+    workbook = _open_workbook(file)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+# Column names from a header row; blank cells are named like pandas does
+# ("Unnamed: <index>")
+def _column_names(header):
+    return [
+        f"Unnamed: {index}" if value is None else value if isinstance(value, str) else str(value)
+        for index, value in enumerate(header)
+    ]
+
+
+def _sheet(workbook, sheet_name):
+    return workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+
+
+# Empty frame with the sheet's header row as columns (for the column mapping)
+def read_header(file, sheet_name=None):
+    workbook = _open_workbook(file)
+    try:
+        header = next(_sheet(workbook, sheet_name).iter_rows(max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+    return pd.DataFrame(columns=_column_names(header))
+
+
+# Path of a sheet's XML part inside the package, whether the workbook uses
+# the 1904 date system, and the style indexes that format numbers as dates
+def _workbook_parts(archive, sheet_name):
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheets = workbook.find(f'{MAIN_NS}sheets')
+    sheet = next(
+        (node for node in sheets if sheet_name is None or node.get('name') == sheet_name), None
+    )
+    if sheet is None:
+        raise ValueError(f"Sheet not found: {sheet_name}")
+
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    target = next(
+        rel.get('Target') for rel in rels.iter(f'{PACKAGE_REL_NS}Relationship')
+        if rel.get('Id') == sheet.get(f'{REL_NS}id')
+    )
+    path = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+    properties = workbook.find(f'{MAIN_NS}workbookPr')
+    date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+
+    date_styles = set()
+    if 'xl/styles.xml' in archive.namelist():
+        styles = ElementTree.fromstring(archive.read('xl/styles.xml'))
+        formats = dict(BUILTIN_FORMATS)
+        for fmt in styles.iter(f'{MAIN_NS}numFmt'):
+            formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode')
+        cell_formats = styles.find(f'{MAIN_NS}cellXfs')
+        for index, xf in enumerate(cell_formats if cell_formats is not None else ()):
+            code = formats.get(int(xf.get('numFmtId', 0)))
+            if code and is_date_format(code):
+                date_styles.add(str(index))
+    return path, date1904, date_styles
+
+
+# Completed `tag` elements of an XML stream, each detached from its parent
+# once the caller is done with it: clear() alone leaves an empty element per
+# row in the tree, so memory would still grow with the sheet length
+def _iter_elements(source, tag):
+    ancestors = []
+    for event, node in ElementTree.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            ancestors.append(node)
+            continue
+        ancestors.pop()
+        if node.tag == tag:
+            yield node
+            if ancestors:
+                ancestors[-1].remove(node)
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as source:
+        for node in _iter_elements(source, f'{MAIN_NS}si'):
+            strings.append(''.join(text.text or '' for text in node.iter(f'{MAIN_NS}t')))
+    return strings
+
+
+# Frame for one chunk of raw cell values; date-formatted serial numbers are
+# converted to timestamps column by column
+def _chunk_frame(columns, values, date_cells, date1904):
+    frame = pd.DataFrame(dict(zip(columns, values)), columns=columns)
+    origin = '1904-01-01' if date1904 else '1899-12-30'
+    for column, positions in zip(columns, date_cells):
+        if not positions:
+            continue
+        serials = pd.to_numeric(frame[column].iloc[positions])
+        dates = pd.to_datetime(serials, unit='D', origin=origin).dt.round('ms')
+        if len(positions) == len(frame):
+            frame[column] = dates
+        else:
+            converted = frame[column].astype(object)
+            converted.iloc[positions] = dates.dt.to_pydatetime()
+            frame[column] = converted
+    return frame
+
+
+# Yield frames of at most `chunk_rows` rows holding only `columns`, streamed
+# from the sheet XML. Rows where every mapped cell is empty (e.g. formatting
+# past the end of the data) are skipped.
+def iter_columns(file, columns, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    from openpyxl.utils import get_column_letter
+
+    header = list(read_header(file, sheet_name).columns)
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f"Columns not found in sheet: {', '.join(map(str, missing))}")
+    # Column letter -> position in `columns`
+    wanted = {get_column_letter(header.index(col) + 1): index for index, col in enumerate(columns)}
+
+    with zipfile.ZipFile(_rewind(file)) as archive:
+        path, date1904, date_styles = _workbook_parts(archive, sheet_name)
+        shared = _shared_strings(archive)
+
+        row_tag, cell_tag = f'{MAIN_NS}row', f'{MAIN_NS}c'
+        value_tag, inline_tag, text_tag = f'{MAIN_NS}v', f'{MAIN_NS}is', f'{MAIN_NS}t'
+        values = [[] for _ in columns]
+        date_cells = [[] for _ in columns]
+        yielded = False
+        header_seen = False
+
+        with archive.open(path) as source:
+            for row in _iter_elements(source, row_tag):
+                if not header_seen:
+                    header_seen = True
+                    continue
+
+                picked = [None] * len(columns)
+                dated = None
+                column_number = 0
+                for cell in row.iter(cell_tag):
+                    column_number += 1
+                    ref = cell.get('r')
+                    index = wanted.get(
+                        ref.rstrip('0123456789') if ref else get_column_letter(column_number)
+                    )
+                    if index is None:
+                        continue
+
+                    kind = cell.get('t', 'n')
+                    if kind == 'inlineStr':
+                        inline = cell.find(inline_tag)
+                        if inline is not None:
+                            picked[index] = ''.join(text.text or '' for text in inline.iter(text_tag))
+                        continue
+                    node = cell.find(value_tag)
+                    text = None if node is None else node.text
+                    if text is None:
+                        continue
+                    if kind == 'n':
+                        # Whole numbers stay int (also negative ones), like pd.read_excel
+                        picked[index] = int(text) if text.lstrip('-').isdigit() else float(text)
+                        if cell.get('s') in date_styles:
+                            dated = (dated or []) + [index]
+                    elif kind == 's':
+                        picked[index] = shared[int(text)]
+                    elif kind == 'b':
+                        picked[index] = text == '1'
+                    elif kind != 'e':
+                        picked[index] = text
+
+                if all(value is None for value in picked):
+                    continue
+                position = len(values[0])
+                for column_values, value in zip(values, picked):
+                    column_values.append(value)
+                for index in dated or ():
+                    date_cells[index].append(position)
+
+                if len(values[0]) >= chunk_rows:
+                    yield _chunk_frame(columns, values, date_cells, date1904)
+                    values = [[] for _ in columns]
+                    date_cells = [[] for _ in columns]
+                    yielded = True
+
+        # The last partial chunk (or an empty frame for an empty sheet)
+        if values[0] or not yielded:
+            yield _chunk_frame(columns, values, date_cells, date1904)
+
+
+# The mapped columns of a sheet as one frame: calamine when installed,
+# otherwise the read-only openpyxl stream
+def read_columns(file, columns, sheet_name=None):
+    if calamine_available():
+        return pd.read_excel(_rewind(file), sheet_name=sheet_name or 0, usecols=columns, engine='calamine')
+    chunks = list(iter_columns(file, columns, sheet_name))
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+# Chunks of the mapped columns for streaming ingestion
+def iter_chunks(file, columns, sheet_name=None, chunk_rows=CHUNK_ROWS):
+    if calamine_available():
+        frame = read_columns(file, columns, sheet_name)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    else:
+        yield from iter_columns(file, columns, sheet_name, chunk_rows)
@@ -0,0 +1,247 @@
+# forecast.py
+# Batch statistical demand forecasting for stockout prediction.
+#
+# Daily sales are stacked into a products x days matrix and every model is
+# run for all products at once, looping only over days. Regular sellers get
+# a damped additive Holt-Winters model (weekly seasonality), intermittent
+# sellers get TSB (Teunter-Syntetos-Babai, a Croston variant that also
+# decays the demand probability). Smoothing parameters are picked per
+# product from a small grid by one-step-ahead squared error. Large catalogs
+# are split into product chunks that run in a process pool.
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import engine
+import perf
+
+# Weekly seasonality for daily sales
+SEASON_LENGTH = 7
+# Damping factor for the Holt-Winters trend, keeps long horizons sane
+TREND_DAMPING = 0.98
+# Average inter-demand interval above which a product counts as intermittent
+INTERMITTENT_ADI = 1.32
+# Days forecast explicitly; beyond that the last season's rate is extrapolated
+HORIZON_DAYS = 365
+
+HW_ALPHAS = (0.1, 0.3, 0.5)
+HW_BETAS = (0.0, 0.1)
+HW_GAMMAS = (0.0, 0.2)
+TSB_ALPHAS = (0.1, 0.3)
+TSB_BETAS = (0.05, 0.2)
+
+# Products per chunk, and the catalog size from which chunks go to a pool
+CHUNK_PRODUCTS = 20_000
+PARALLEL_MIN_PRODUCTS = 40_000
+
+MODEL_HOLT_WINTERS = "Holt-Winters"
+MODEL_TSB = "TSB"
+
+
+# Dense demand matrix from (row, day, quantity) triplets; missing days are
+# zero sales
+def _matrix(rows, days, quantity, num_rows, num_days):
+    matrix = np.zeros((num_rows, num_days))
+    np.add.at(matrix, (rows, days), quantity)
+    return matrix
+
+
+# Dense products x days demand matrix for the whole catalog.
+# Returns (products, dates, matrix); products are sorted like the engine's.
+def demand_matrix(daily_data):
+    product_codes, products = engine.factorize_products(daily_data['product'])
+    days, start = engine.day_offsets(daily_data['date'])
+    num_days = int(days.max()) + 1 if len(days) else 0
+    matrix = _matrix(product_codes, days, daily_data['quantity'].to_numpy(dtype=float),
+                     len(products), num_days)
+    return products, pd.date_range(start, periods=num_days, freq='D'), matrix
+
+
+# Run damped additive Holt-Winters for every row of Y with fixed parameters.
+# Returns the final (level, trend, seasonal) state and the one-step SSE.
+def _holt_winters_filter(Y, alpha, beta, gamma, season):
+    num_products, num_days = Y.shape
+    level = Y[:, :season].mean(axis=1)
+    if num_days >= 2 * season:
+        trend = (Y[:, season:2 * season].mean(axis=1) - level) / season
+    else:
+        trend = np.zeros(num_products)
+    seasonal = Y[:, :season] - level[:, None] if season > 1 else np.zeros((num_products, 1))
+    sse = np.zeros(num_products)
+
+    for t in range(season, num_days):
+        observed = Y[:, t]
+        s = seasonal[:, t % season]
+        predicted = level + TREND_DAMPING * trend + s
+        sse += (observed - predicted) ** 2
+
+        new_level = alpha * (observed - s) + (1 - alpha) * (level + TREND_DAMPING * trend)
+        trend = beta * (new_level - level) + (1 - beta) * TREND_DAMPING * trend
+        seasonal[:, t % season] = gamma * (observed - new_level) + (1 - gamma) * s
+        level = new_level
+
+    return level, trend, seasonal, sse
+
+
+# Holt-Winters forecast paths (products x horizon), parameters picked per
+# product from the grid
+def holt_winters_forecast(Y, horizon=HORIZON_DAYS, season=SEASON_LENGTH):
+    num_products, num_days = Y.shape
+    # Not enough history for seasonality: fall back to damped Holt
+    if num_days < 2 * season:
+        season = 1
+    gammas = HW_GAMMAS if season > 1 else (0.0,)
+
+    best_sse = np.full(num_products, np.inf)
+    best_level = np.zeros(num_products)
+    best_trend = np.zeros(num_products)
+    best_seasonal = np.zeros((num_products, season))
+    for alpha, beta, gamma in itertools.product(HW_ALPHAS, HW_BETAS, gammas):
+        level, trend, seasonal, sse = _holt_winters_filter(Y, alpha, beta, gamma, season)
+        better = sse < best_sse
+        best_sse[better] = sse[better]
+        best_level[better] = level[better]
+        best_trend[better] = trend[better]
+        best_seasonal[better] = seasonal[better]
+
+    steps = np.arange(1, horizon + 1)
+    damped_steps = np.cumsum(TREND_DAMPING ** steps)
+    season_index = (num_days - 1 + steps) % season
+    paths = best_level[:, None] + best_trend[:, None] * damped_steps + best_seasonal[:, season_index]
+    return np.clip(paths, 0, None)
+
+
+# TSB forecast paths (flat: demand probability x demand size), parameters
+# picked per product from the grid
+def tsb_forecast(Y, horizon=HORIZON_DAYS):
+    num_products, num_days = Y.shape
+    occurred = Y > 0
+    first_size = Y.sum(axis=1) / np.maximum(occurred.sum(axis=1), 1)
+    first_probability = occurred.mean(axis=1)
+
+    best_sse = np.full(num_products, np.inf)
+    best_rate = np.zeros(num_products)
+    for alpha, beta in itertools.product(TSB_ALPHAS, TSB_BETAS):
+        probability = first_probability.copy()
+        size = first_size.copy()
+        sse = np.zeros(num_products)
+        for t in range(num_days):
+            sse += (Y[:, t] - probability * size) ** 2
+            probability += beta * (occurred[:, t] - probability)
+            size = np.where(occurred[:, t], size + alpha * (Y[:, t] - size), size)
+        better = sse < best_sse
+        best_sse[better] = sse[better]
+        best_rate[better] = (probability * size)[better]
+
+    return np.repeat(best_rate[:, None], horizon, axis=1)
+
+
+# Days until cumulative forecast demand exhausts the stock, interpolated
+# within the day it happens. Past the horizon the average rate of the last
+# season is extrapolated; zero demand means the stock never runs out (inf).
+def days_until_exhausted(paths, stock, season=SEASON_LENGTH):
+    num_products, horizon = paths.shape
+    cumulative = np.cumsum(paths, axis=1)
+    hit = cumulative >= stock[:, None]
+    found = hit.any(axis=1)
+    first = hit.argmax(axis=1)
+
+    rows = np.arange(num_products)
+    before = np.where(first > 0, cumulative[rows, np.maximum(first - 1, 0)], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        within = first + (stock - before) / paths[rows, first]
+        tail_rate = paths[:, -season:].mean(axis=1)
+        beyond = horizon + (stock - cumulative[:, -1]) / tail_rate
+
+    days = np.where(found, within, beyond)
+    # No stock left (or negative): same answer as the simple method
+    empty = stock <= 0
+    days[empty] = engine.days_until_stockout(stock[empty], paths[empty, 0])
+    return days
+
+
+# Forecast one chunk of products from its sparse daily sales: pick a model
+# per product and return (days until stockout, mean forecast daily sales over
+# the next 30 days, model name per product). The dense matrix is only built
+# here, one chunk at a time, so memory stays bounded for large catalogs.
+def _forecast_chunk(rows, days, quantity, num_days, stock, horizon=HORIZON_DAYS):
+    Y = _matrix(rows, days, quantity, len(stock), num_days)
+
+    days_with_sales = (Y > 0).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        adi = num_days / days_with_sales
+    intermittent = adi > INTERMITTENT_ADI
+
+    paths = np.zeros((len(Y), horizon))
+    if (~intermittent).any():
+        paths[~intermittent] = holt_winters_forecast(Y[~intermittent], horizon)
+    if intermittent.any():
+        paths[intermittent] = tsb_forecast(Y[intermittent], horizon)
+
+    stockout_days = days_until_exhausted(paths, stock)
+    models = np.where(intermittent, MODEL_TSB, MODEL_HOLT_WINTERS)
+    return stockout_days, paths[:, :30].mean(axis=1), models
+
+
+# Forecast every row of the predictions table. `rows`, `days` and `quantity`
+# are the daily sales triplets (table row, day offset, quantity). Chunks of
+# products run in a process pool for large catalogs.
+def forecast_stockouts(rows, days, quantity, num_days, stock, n_jobs=None, horizon=HORIZON_DAYS):
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    order = np.argsort(rows, kind='stable')
+    rows, days, quantity = rows[order], days[order], quantity[order]
+    starts = np.arange(0, len(stock), CHUNK_PRODUCTS)
+    bounds = np.searchsorted(rows, np.append(starts, len(stock)))
+
+    chunks = []
+    for index, start in enumerate(starts):
+        lo, hi = bounds[index], bounds[index + 1]
+        chunks.append((
+            rows[lo:hi] - start, days[lo:hi], quantity[lo:hi], num_days,
+            stock[start:start + CHUNK_PRODUCTS], horizon
+        ))
+
+    if n_jobs > 1 and len(stock) >= PARALLEL_MIN_PRODUCTS:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_forecast_chunk, *zip(*chunks)))
+    else:
+        results = [_forecast_chunk(*chunk) for chunk in chunks]
+
+    if not results:
+        return np.array([]), np.array([]), np.array([], dtype=object)
+    stockout_days, rates, models = zip(*results)
+    return np.concatenate(stockout_days), np.concatenate(rates), np.concatenate(models)
+
+
+# Predictions table like engine.predict, with days_until_stockout and
+# stockout_date driven by the forecast. Adds the forecast daily sales and
+# the model used for each product.
+@perf.timed('forecast')
+def predict(daily_data, current_stock, now=None, n_jobs=None):
+    table = engine.predict(daily_data, current_stock, now=now)
+    if table.empty:
+        table['forecast_daily_sales'] = pd.Series(dtype=float)
+        table['forecast_model'] = pd.Series(dtype=object)
+        return table
+
+    # Map each daily row to its row in the predictions table
+    product_codes, products = engine.factorize_products(daily_data['product'])
+    table_row_of_product = pd.Index(table['product']).get_indexer(products)
+    rows = table_row_of_product[product_codes]
+    days, _ = engine.day_offsets(daily_data['date'])
+    quantity = daily_data['quantity'].to_numpy(dtype=float)
+    keep = rows >= 0
+
+    stock = table['adjusted_stock'].to_numpy(dtype=float)
+    stockout_days, rates, models = forecast_stockouts(
+        rows[keep], days[keep], quantity[keep], int(days.max()) + 1, stock, n_jobs=n_jobs
+    )
+
+    table = engine.add_stockout_predictions(table, days=stockout_days, now=now)
+    table['forecast_daily_sales'] = rates
+    table['forecast_model'] = models
+    return table
@@ -0,0 +1,157 @@
+# ingest.py
+# Streaming ingestion for files that don't fit in memory.
+#
+# The file is read in chunks using only the mapped columns; each chunk is
+# processed and folded into running per-(date, product) totals of quantity
+# and stock_receipts plus the latest stock per product. Peak memory is
+# bounded by the size of those aggregates, not by the raw row count.
+#
+# All chunks are parsed with one date format. It is inferred from the first
+# chunks; while they only fit several formats (a date-sorted day-first file
+# starts with days <= 12), chunks are held back until a later date settles it.
+import numpy as np
+import pandas as pd
+
+import engine
+import excel
+import perf
+from date_parsing import infer_date_format, is_ambiguous_format
+
+# Rows read per chunk
+CHUNK_ROWS = 250_000
+
+# Fold pending chunk aggregates into the running totals once they hold this
+# many rows, so memory stays close to the size of the final aggregates
+FOLD_ROWS = 1_000_000
+
+# Distinct unparseable date values kept for the warning message
+MAX_INVALID_DATES = 20
+
+# Rows held back at most while the date format is ambiguous; past that the
+# preferred (month-first) format is used, as for a whole file
+MAX_PENDING_DATE_ROWS = 2_000_000
+
+
+# Running per-(date, product) totals and latest stock levels
+class DailyAccumulator:
+    def __init__(self):
+        self.daily = None
+        self.stock = None
+        self.rows_read = 0
+        self.rows_used = 0
+        self.invalid_dates = []
+        self._pending = []
+        self._pending_stock = []
+        self._pending_rows = 0
+
+    # Fold one processed chunk (date, product, quantity, current_stock, stock_receipts)
+    def add(self, chunk, invalid_dates=()):
+        for value in invalid_dates:
+            if len(self.invalid_dates) >= MAX_INVALID_DATES:
+                break
+            if value not in self.invalid_dates:
+                self.invalid_dates.append(value)
+
+        self.rows_used += len(chunk)
+        if chunk.empty:
+            return
+
+        part = engine.aggregate_daily(chunk)
+        self._pending.append(part)
+        self._pending_rows += len(part)
+
+        self._pending_stock.append(engine.latest_stock(chunk))
+
+        if self._pending_rows >= FOLD_ROWS:
+            self._fold()
+
+    def _fold(self):
+        if not self._pending:
+            return
+        parts = self._pending if self.daily is None else [self.daily] + self._pending
+        # Re-aggregating sums rows with the same (date, product) across chunks
+        self.daily = engine.aggregate_daily(pd.concat(parts, ignore_index=True))
+
+        # Latest reading by date; on equal dates later chunks win, matching
+        # latest_stock over the whole file
+        stocks = self._pending_stock if self.stock is None else [self.stock] + self._pending_stock
+        self.stock = engine.combine_stock(*stocks)
+
+        self._pending = []
+        self._pending_stock = []
+        self._pending_rows = 0
+
+    # Final daily aggregates and latest stock (both None if nothing was read)
+    def result(self):
+        self._fold()
+        return self.daily, self.stock
+
+
+# Columns to read for a given mapping (optional columns may be None)
+def mapped_columns(date_col, product_col, quantity_col, stock_col=None, receipts_col=None,
+                   location_col=None, category_col=None):
+    columns = [date_col, product_col, quantity_col, stock_col, receipts_col, location_col, category_col]
+    return list(dict.fromkeys(col for col in columns if col is not None))
+
+
+# Yield raw chunks of the mapped columns from a CSV or Excel file
+def iter_chunks(file, name, columns, chunk_rows=CHUNK_ROWS, sheet_name=None):
+    if name.endswith('.csv'):
+        yield from pd.read_csv(file, usecols=columns, chunksize=chunk_rows)
+    else:
+        yield from excel.iter_chunks(file, columns, sheet_name, chunk_rows)
+
+
+# Pair every chunk with the date format of the whole stream (None for
+# columns the reader already returns as datetimes)
+def with_date_format(chunks, date_col, max_pending_rows=MAX_PENDING_DATE_ROWS):
+    pending, values, pending_rows = [], [], 0
+    date_format = None
+    for chunk in chunks:
+        if pending is None:
+            yield chunk, date_format
+            continue
+        pending.append(chunk)
+        pending_rows += len(chunk)
+        dates = chunk[date_col]
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            settled = True
+        else:
+            values.append(pd.unique(dates.astype(str)))
+            distinct = pd.unique(np.concatenate(values))
+            values = [distinct]
+            date_format = infer_date_format(distinct)
+            settled = pending_rows >= max_pending_rows or not is_ambiguous_format(distinct, date_format)
+        if settled:
+            for held in pending:
+                yield held, date_format
+            pending = None
+
+    for held in pending or []:
+        yield held, date_format
+
+
+# Stream a file into daily aggregates. Returns the accumulator so callers can
+# report row counts and unparseable dates. With a location column, stock is
+# kept per product x location; the category only matters for location
+# rollups, which need the full processed frame, so it isn't read.
+@perf.timed('stream_ingest')
+def stream_daily_aggregates(file, name, date_col, product_col, quantity_col,
+                            stock_col=None, receipts_col=None, chunk_rows=CHUNK_ROWS,
+                            progress=None, sheet_name=None, location_col=None, category_col=None):
+    columns = mapped_columns(date_col, product_col, quantity_col, stock_col, receipts_col, location_col)
+    accumulator = DailyAccumulator()
+
+    chunks = iter_chunks(file, name, columns, chunk_rows, sheet_name)
+    for chunk, date_format in with_date_format(chunks, date_col):
+        accumulator.rows_read += len(chunk)
+        processed, invalid_dates = engine.process_frame(
+            chunk, date_col, product_col, quantity_col,
+            stock_col=stock_col, receipts_col=receipts_col, location_col=location_col,
+            date_format=date_format
+        )
+        accumulator.add(processed, invalid_dates)
+        if progress is not None:
+            progress(accumulator.rows_read)
+
+    return accumulator
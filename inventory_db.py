@@ -0,0 +1,394 @@
+# inventory_db.py
+# Shared SQLite database of processed sales, stock and receipts.
+#
+# A processed upload is imported once as a dataset: one row per sales line
+# (product and location as integer ids) with an index on (product, date).
+# Per-(product, date) totals and the latest stock per product (x location)
+# are computed by SQLite at import and kept as tables, so:
+# - a per-product view reads only that product's rows through the index
+# - daily aggregates and per-product totals are GROUP BY queries, not a
+#   pandas pass over every row
+# - any number of Streamlit sessions open the same dataset; the daily
+#   aggregates they show are loaded once per process and shared read-only
+#
+# Connections come from a small pool (WAL mode, so readers don't block each
+# other or the importer).
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import engine
+import perf
+from cache import LRUCache
+
+INVENTORY_DB = os.environ.get(
+    'RESTOCK_INVENTORY_DB',
+    os.path.join(os.path.expanduser('~'), '.cache', 'restock_predictor', 'inventory.sqlite3')
+)
+
+# Connections kept open per database
+POOL_SIZE = 4
+# Rows per executemany call when importing
+INSERT_ROWS = 100_000
+# Loaded daily aggregates kept in memory for all sessions
+SHARED_FRAMES = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT,
+    created REAL NOT NULL,
+    rows INTEGER,
+    products INTEGER,
+    first_date INTEGER,
+    last_date INTEGER,
+    complete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS products (
+    dataset_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (dataset_id, product_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS products_name ON products (dataset_id, name);
+CREATE TABLE IF NOT EXISTS locations (
+    dataset_id INTEGER NOT NULL,
+    location_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (dataset_id, location_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sales (
+    dataset_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    location_id INTEGER,
+    date INTEGER NOT NULL,
+    quantity REAL NOT NULL,
+    current_stock REAL,
+    stock_receipts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sales_product_date ON sales (dataset_id, product_id, date);
+CREATE TABLE IF NOT EXISTS daily (
+    dataset_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    quantity REAL NOT NULL,
+    stock_receipts REAL NOT NULL,
+    PRIMARY KEY (dataset_id, product_id, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stock (
+    dataset_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    location_id INTEGER,
+    current_stock REAL NOT NULL,
+    stock_date INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stock_dataset ON stock (dataset_id, product_id);
+"""
+
+# Latest stock reading per product (x location): last by date, then by row
+# order, like engine.latest_stock
+LATEST_STOCK_SQL = """
+INSERT INTO stock (dataset_id, product_id, location_id, current_stock, stock_date)
+SELECT dataset_id, product_id, location_id, current_stock, date FROM (
+    SELECT dataset_id, product_id, location_id, current_stock, date,
+           ROW_NUMBER() OVER (
+               PARTITION BY product_id, location_id ORDER BY date DESC, rowid DESC
+           ) AS position
+    FROM sales WHERE dataset_id = ? AND current_stock IS NOT NULL
+) WHERE position = 1
+"""
+
+
+# Nanoseconds since the epoch for a date column (how dates are stored)
+def _date_ns(dates):
+    return pd.to_datetime(dates).to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def _to_dates(values):
+    return pd.to_datetime(np.asarray(values, dtype=np.int64), unit='ns')
+
+
+# Stock values read back as floats; whole numbers become integers again
+def _stock_values(values):
+    values = np.asarray(values, dtype=float)
+    if len(values) and np.isfinite(values).all() and np.array_equal(values, np.round(values)):
+        return values.astype(np.int64)
+    return values
+
+
+# Fixed-size pool of SQLite connections shared by threads
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    # Borrow a connection; waits for one to be returned once `size` are open
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                conn = None
+                if self.opened < self.size:
+                    conn = self._open()
+                    self.opened += 1
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self.opened = 0
+
+
+class InventoryDB:
+    def __init__(self, path=INVENTORY_DB, pool_size=POOL_SIZE):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+        # Frames shared by every session, keyed by (dataset id, kind)
+        self._frames = LRUCache(max_entries=SHARED_FRAMES)
+        self._frames_lock = threading.Lock()
+
+    def _shared(self, key, compute):
+        with self._frames_lock:
+            return self._frames.get_or_compute(key, compute)
+
+    # Id of the complete dataset stored under `key`, or None
+    def find(self, key):
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT id FROM datasets WHERE key = ? AND complete = 1", (key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    # Import a processed frame (see engine.process_frame / compact_frame) as
+    # the dataset `key`; an existing complete dataset with that key is reused.
+    # Returns the dataset id.
+    @perf.timed('db_import')
+    def import_frame(self, key, name, df):
+        existing = self.find(key)
+        if existing is not None:
+            return existing
+
+        product_codes, products = engine.factorize_products(df['product'])
+        dates = _date_ns(df['date'])
+        # Rows go in by (product, date), so the index is appended to in order;
+        # the sort is stable, so rows of the same day keep file order
+        order = np.lexsort((dates, product_codes))
+        product_codes, dates = product_codes[order], dates[order]
+        if 'location' in df.columns:
+            location_codes, locations = engine.factorize_products(df['location'])
+            location_ids = location_codes[order].tolist()
+        else:
+            locations = []
+            location_ids = [None] * len(df)
+
+        with self.pool.connection() as conn, conn:
+            # A previous import of the same key that didn't finish
+            stale = conn.execute("SELECT id FROM datasets WHERE key = ?", (key,)).fetchone()
+            if stale is not None:
+                self._delete(conn, stale[0])
+            dataset_id = conn.execute(
+                "INSERT INTO datasets (key, name, created) VALUES (?, ?, ?)", (key, name, time.time())
+            ).lastrowid
+
+            conn.executemany(
+                "INSERT INTO products (dataset_id, product_id, name) VALUES (?, ?, ?)",
+                ((dataset_id, index, str(product)) for index, product in enumerate(products))
+            )
+            conn.executemany(
+                "INSERT INTO locations (dataset_id, location_id, name) VALUES (?, ?, ?)",
+                ((dataset_id, index, str(location)) for index, location in enumerate(locations))
+            )
+
+            quantity = df['quantity'].to_numpy(dtype=float)[order]
+            # Rows without a stock reading are stored as NULL
+            stock = engine.column_values(df, 'current_stock')[order]
+            stock = np.where(np.isnan(stock), None, stock)
+            receipts = engine.column_values(df, 'stock_receipts')[order]
+            for start in range(0, len(df), INSERT_ROWS):
+                end = start + INSERT_ROWS
+                conn.executemany(
+                    "INSERT INTO sales (dataset_id, product_id, location_id, date, quantity, "
+                    "current_stock, stock_receipts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    zip(
+                        itertools.repeat(dataset_id),
+                        product_codes[start:end].tolist(),
+                        location_ids[start:end],
+                        dates[start:end].tolist(),
+                        quantity[start:end].tolist(),
+                        stock[start:end].tolist(),
+                        receipts[start:end].tolist(),
+                    )
+                )
+
+            # Aggregates computed by SQLite (the index gives the grouping order)
+            conn.execute(
+                "INSERT INTO daily (dataset_id, product_id, date, quantity, stock_receipts) "
+                "SELECT dataset_id, product_id, date, SUM(quantity), SUM(stock_receipts) "
+                "FROM sales WHERE dataset_id = ? GROUP BY product_id, date",
+                (dataset_id,)
+            )
+            conn.execute(LATEST_STOCK_SQL, (dataset_id,))
+            conn.execute(
+                "UPDATE datasets SET rows = ?, products = ?, first_date = ?, last_date = ?, complete = 1 "
+                "WHERE id = ?",
+                (len(df), len(products), int(dates.min()) if len(dates) else None,
+                 int(dates.max()) if len(dates) else None, dataset_id)
+            )
+        return dataset_id
+
+    # Complete datasets, newest first
+    def datasets(self):
+        with self.pool.connection() as conn:
+            frame = pd.read_sql_query(
+                "SELECT id, key, name, created, rows, products, first_date, last_date "
+                "FROM datasets WHERE complete = 1 ORDER BY created DESC",
+                conn
+            )
+        frame['created'] = pd.to_datetime(frame['created'], unit='s')
+        for column in ('first_date', 'last_date'):
+            frame[column] = pd.to_datetime(frame[column], unit='ns')
+        return frame
+
+    def _product_names(self, conn, dataset_id):
+        rows = conn.execute(
+            "SELECT name FROM products WHERE dataset_id = ? ORDER BY product_id", (dataset_id,)
+        ).fetchall()
+        return np.array([row[0] for row in rows], dtype=object)
+
+    # Daily aggregates like engine.aggregate_daily (ordered by date, then
+    # product; product as a categorical). Loaded once and shared by every
+    # session, so callers must not modify the frame.
+    def daily(self, dataset_id):
+        return self._shared((dataset_id, 'daily'), lambda: self._load_daily(dataset_id))
+
+    @perf.timed('db_daily')
+    def _load_daily(self, dataset_id):
+        with self.pool.connection() as conn:
+            products = self._product_names(conn, dataset_id)
+            rows = conn.execute(
+                "SELECT product_id, date, quantity, stock_receipts FROM daily WHERE dataset_id = ?",
+                (dataset_id,)
+            ).fetchall()
+        product_ids, dates, quantity, receipts = (
+            np.array(column) for column in zip(*rows)
+        ) if rows else (np.zeros(0, dtype=np.int64),) * 4
+
+        # Product ids follow the sorted product names, so this matches
+        # aggregate_daily's (date, product) order
+        order = np.lexsort((product_ids, dates))
+        return pd.DataFrame({
+            'date': _to_dates(dates[order]),
+            'product': pd.Categorical.from_codes(product_ids[order].astype(np.int64), categories=products),
+            'quantity': np.asarray(quantity, dtype=float)[order],
+            'stock_receipts': np.asarray(receipts, dtype=float)[order],
+        })
+
+    # Daily aggregates of one product, read through the (product, date) key
+    @perf.timed('db_product_daily')
+    def product_daily(self, dataset_id, product):
+        with self.pool.connection() as conn:
+            # Two key lookups; as a join SQLite may scan the dataset's daily rows
+            row = conn.execute(
+                "SELECT product_id FROM products WHERE dataset_id = ? AND name = ?",
+                (dataset_id, str(product))
+            ).fetchone()
+            frame = pd.read_sql_query(
+                "SELECT date, quantity, stock_receipts FROM daily "
+                "WHERE dataset_id = ? AND product_id = ? ORDER BY date",
+                conn, params=(dataset_id, -1 if row is None else row[0])
+            )
+        frame['date'] = _to_dates(frame['date'])
+        frame.insert(1, 'product', str(product))
+        return frame
+
+    # Per-product totals like engine.product_totals, as one GROUP BY
+    @perf.timed('db_product_totals')
+    def product_totals(self, dataset_id):
+        with self.pool.connection() as conn:
+            products = self._product_names(conn, dataset_id)
+            frame = pd.read_sql_query(
+                "SELECT product_id, SUM(quantity) AS total_sales, COUNT(*) AS days_with_sales, "
+                "SUM(stock_receipts) AS total_receipts FROM daily WHERE dataset_id = ? "
+                "GROUP BY product_id ORDER BY product_id",
+                conn, params=(dataset_id,)
+            )
+        frame.insert(0, 'product', products[frame.pop('product_id').to_numpy(dtype=np.int64)])
+        return frame
+
+    # Latest stock table like engine.latest_stock (per product x location when
+    # the dataset has locations)
+    def latest_stock(self, dataset_id):
+        return self._shared((dataset_id, 'stock'), lambda: self._load_stock(dataset_id))
+
+    def _load_stock(self, dataset_id):
+        with self.pool.connection() as conn:
+            products = self._product_names(conn, dataset_id)
+            locations = np.array([row[0] for row in conn.execute(
+                "SELECT name FROM locations WHERE dataset_id = ? ORDER BY location_id", (dataset_id,)
+            )], dtype=object)
+            frame = pd.read_sql_query(
+                "SELECT product_id, location_id, current_stock, stock_date FROM stock "
+                "WHERE dataset_id = ? ORDER BY product_id, location_id",
+                conn, params=(dataset_id,)
+            )
+        table = {'product': products[frame['product_id'].to_numpy()]}
+        if len(locations):
+            table['location'] = locations[frame['location_id'].to_numpy(dtype=np.int64)]
+        table['current_stock'] = _stock_values(frame['current_stock'])
+        table['stock_date'] = _to_dates(frame['stock_date']).to_numpy()
+        return pd.DataFrame(table)
+
+    def _delete(self, conn, dataset_id):
+        for table in ('sales', 'daily', 'stock', 'products', 'locations'):
+            conn.execute(f"DELETE FROM {table} WHERE dataset_id = ?", (dataset_id,))
+        conn.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+
+    def delete(self, dataset_id):
+        with self.pool.connection() as conn, conn:
+            self._delete(conn, dataset_id)
+        with self._frames_lock:
+            self._frames.invalidate((dataset_id,))
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+# Process-wide database (every Streamlit session shares it and its pool)
+def get_database():
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = InventoryDB()
+        return _database
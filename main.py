@@ -2,10 +2,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime, timedelta
-import io
-from dateutil import parser
+from datetime import date, datetime
+import time
+
+import engine
+import charts
+import forecast
+import simulation
+from velocity_index import VelocityIndex, window_stats
+from rollup import LocationRollup
+import ingest
+import delta
+import inventory_db
+import excel
+from cache import LRUCache, content_hash
+from store import ProcessedStore, store_available, store_key
+import alerts
+import perf
 
 # Set page configuration
 st.set_page_config(
@@ -25,6 +38,20 @@ Upload your sales data, and the system will calculate stockout predictions using
 # Initialize session state for data persistence
 if 'df' not in st.session_state:
     st.session_state.df = None
+if 'daily' not in st.session_state:
+    st.session_state.daily = None
+# Prefix-sum velocity index of the daily aggregates, built with them (None
+# when too large; velocity windows then use a groupby)
+if 'velocity_index' not in st.session_state:
+    st.session_state.velocity_index = None
+if 'stock' not in st.session_state:
+    st.session_state.stock = None
+# Per-location predictions and rollups (None without a location column)
+if 'locations' not in st.session_state:
+    st.session_state.locations = None
+# Id of the shared database dataset on the dashboard (None for session data)
+if 'dataset_id' not in st.session_state:
+    st.session_state.dataset_id = None
 if 'notifications_sent' not in st.session_state:
     st.session_state.notifications_sent = []
 if 'product_col' not in st.session_state:
@@ -35,20 +62,90 @@ if 'receipts_col' not in st.session_state:
     st.session_state.receipts_col = None
 if 'user_email' not in st.session_state:
     st.session_state.user_email = ""
+# Memo cache for parsed data, aggregates, predictions and figures, and the
+# key (file hash + column mapping) of the data currently on the dashboard
+if 'cache' not in st.session_state:
+    st.session_state.cache = LRUCache()
+if 'data_key' not in st.session_state:
+    st.session_state.data_key = None
+# Bytes used by the session frame before / after compaction
+if 'memory_report' not in st.session_state:
+    st.session_state.memory_report = None
+# Stage timings for the Performance panel (None while the panel is off)
+if 'perf' not in st.session_state:
+    st.session_state.perf = None
+
+memo = st.session_state.cache
+
+# Local store of processed uploads (needs pyarrow)
+processed_store = ProcessedStore() if store_available() else None
+
+# Persistent alert schedule, shared by every session; due alerts are sent by
+# a background scheduler when SMTP is configured (RESTOCK_SMTP_HOST). It is
+# started here, not on subscribe, so alerts saved before a restart go out
+# without anyone pressing the button again.
+alert_store = alerts.AlertStore()
+alert_scheduler = alerts.get_scheduler(alert_store)
+
+# Shared SQLite inventory database: datasets saved there are opened by any
+# session without each one holding a copy of the rows
+shared_db = inventory_db.get_database()
 
-# Function to parse dates with multiple format support
-def parse_date_column(date_series):
-    parsed_dates = []
-    for date_str in date_series.astype(str):
-        try:
-            # Try to parse with dateutil parser (handles most formats)
-            parsed_date = parser.parse(date_str)
-            parsed_dates.append(parsed_date)
-        except (ValueError, TypeError):
-            # If parsing fails, keep the original value (will be handled later)
-            parsed_dates.append(pd.NaT)
-    
-    return pd.Series(parsed_dates, index=date_series.index)
+# Velocity index of new daily aggregates. Kept in the session state, not in
+# the size-bounded memo, so it is built once per dataset and never evicted.
+def build_velocity_index(daily):
+    with perf.stage('velocity_index', rows=len(daily)):
+        return VelocityIndex.from_daily(daily)
+
+# Human-readable byte count
+def format_bytes(num_bytes):
+    for unit in ['B', 'KB', 'MB']:
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+# Rows per page of the restock and alert tables, and products named in the
+# notification history
+PAGE_SIZES = [25, 50, 100, 250]
+MAX_LISTED_PRODUCTS = 10
+
+# Filterable, sortable, paginated view of a large table. Filtering and
+# sorting run on the whole table; only the current page is rendered.
+# `sort_columns` maps option labels to (column, ascending).
+def show_table_page(table, key, sort_columns, product_column='product', status_column='status'):
+    filter_col1, filter_col2, filter_col3, filter_col4 = st.columns([3, 3, 2, 1])
+    with filter_col1:
+        search = st.text_input("Filter products", key=f"{key}_search", placeholder="Name contains...")
+    with filter_col2:
+        statuses = st.multiselect(
+            "Status", options=[engine.STATUS_CRITICAL, engine.STATUS_LOW, engine.STATUS_SAFE],
+            key=f"{key}_status"
+        )
+    with filter_col3:
+        sort_label = st.selectbox("Sort by", options=list(sort_columns), key=f"{key}_sort")
+    with filter_col4:
+        page_size = st.selectbox("Rows", options=PAGE_SIZES, index=1, key=f"{key}_rows")
+    
+    view = table
+    if search:
+        view = view[view[product_column].astype(str).str.contains(search, case=False, regex=False).to_numpy()]
+    if statuses:
+        view = view[view[status_column].isin(statuses).to_numpy()]
+    sort_column, ascending = sort_columns[sort_label]
+    view = view.sort_values(sort_column, ascending=ascending, kind='stable')
+    
+    pages = max(1, -(-len(view) // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    st.dataframe(view.iloc[start:start + page_size], hide_index=True)
+    if len(view):
+        st.caption(f"Showing {start + 1:,}-{min(start + page_size, len(view)):,} of {len(view):,} "
+                   f"({len(table):,} before filters)")
+    else:
+        st.caption(f"No rows match the filters ({len(table):,} before filters)")
 
 # Sidebar for navigation and settings
 with st.sidebar:
@@ -73,13 +170,121 @@ with st.sidebar:
     
     # Data management
     st.subheader("Data Management")
+    if st.session_state.memory_report:
+        before = st.session_state.memory_report['before']
+        after = st.session_state.memory_report['after']
+        st.caption(
+            f"Session data: {format_bytes(after)} "
+            f"(compacted from {format_bytes(before)}, saved {format_bytes(before - after)})"
+        )
     if st.button("Clear All Data"):
         st.session_state.df = None
+        st.session_state.daily = None
+        st.session_state.velocity_index = None
+        st.session_state.stock = None
+        st.session_state.locations = None
+        st.session_state.dataset_id = None
         st.session_state.notifications_sent = []
         st.session_state.product_col = None
         st.session_state.stock_col = None
         st.session_state.receipts_col = None
+        st.session_state.data_key = None
+        st.session_state.memory_report = None
+        memo.clear()
         st.success("Data cleared successfully!")
+    
+    # Optional per-stage timings; when off, instrumented code paths are no-ops
+    if st.checkbox("Performance panel", help="Record wall time, peak memory and rows of each "
+                                             "processing and dashboard stage"):
+        trace_memory = st.checkbox("Trace peak memory", value=True,
+                                   help="Uses tracemalloc, which slows down Python-heavy stages")
+        if st.session_state.perf is None or st.session_state.perf.trace_memory != trace_memory:
+            if st.session_state.perf is not None:
+                perf.release(st.session_state.perf)
+            st.session_state.perf = perf.PerfRecorder(trace_memory=trace_memory)
+        st.session_state.perf.next_run()
+        perf.activate(st.session_state.perf)
+    else:
+        # tracemalloc keeps running while other sessions trace memory
+        if st.session_state.perf is not None:
+            perf.release(st.session_state.perf)
+        st.session_state.perf = None
+    
+    # Processed uploads kept on disk, keyed by file content and column mapping
+    use_store = False
+    if processed_store is not None:
+        use_store = st.checkbox(
+            "Keep processed uploads in local store",
+            value=True,
+            help="Re-uploading the same file with the same mapping loads the stored "
+                 "result instead of processing it again."
+        )
+        with st.expander("Stored Datasets"):
+            stored_entries = processed_store.entries()
+            if stored_entries.empty:
+                st.caption("No stored datasets yet.")
+            else:
+                st.dataframe(stored_entries.drop(columns=['key']), hide_index=True)
+                st.caption(f"{len(stored_entries)} entries, {stored_entries['size_mb'].sum():.1f} MB")
+                
+                # Open a stored dataset without uploading the file again
+                entry_labels = {
+                    f"{row.file_name} ({row.last_used:%Y-%m-%d %H:%M})": row.key
+                    for row in stored_entries.itertuples()
+                }
+                entry_label = st.selectbox("Stored dataset", options=list(entry_labels))
+                if st.button("Load Stored Dataset"):
+                    stored_key = entry_labels[entry_label]
+                    stored_df, stored_daily, stored_stock, stored_meta = processed_store.load(stored_key)
+                    st.session_state.df = stored_df
+                    st.session_state.daily = stored_daily
+                    st.session_state.velocity_index = build_velocity_index(stored_daily)
+                    st.session_state.stock = stored_stock
+                    st.session_state.locations = (
+                        LocationRollup.from_frame(stored_df)
+                        if stored_df is not None and 'location' in stored_df.columns else None
+                    )
+                    st.session_state.data_key = ('stored', stored_key)
+                    st.session_state.dataset_id = None
+                    st.session_state.memory_report = stored_meta.get('memory')
+                    st.success(f"Loaded {entry_label}")
+                
+                # Expire entries that haven't been used for a while
+                max_age_days = st.number_input("Expire entries unused for (days)", min_value=0, value=7)
+                if st.button("Expire Old Entries"):
+                    removed = processed_store.expire(max_age_days)
+                    st.success(f"Removed {removed} stored dataset(s)")
+    
+    # Datasets in the shared inventory database; opening one loads the daily
+    # totals and stock computed by SQLite (shared with other sessions)
+    with st.expander("Shared Database"):
+        shared_datasets = shared_db.datasets()
+        if shared_datasets.empty:
+            st.caption("No shared datasets yet. Tick \"Save to shared database\" when processing a file.")
+        else:
+            st.dataframe(shared_datasets.drop(columns=['key']), hide_index=True)
+            dataset_labels = {
+                f"{row.name} ({row.created:%Y-%m-%d %H:%M}, {row.rows:,} rows)": row.id
+                for row in shared_datasets.itertuples()
+            }
+            dataset_label = st.selectbox("Shared dataset", options=list(dataset_labels))
+            open_col, delete_col = st.columns(2)
+            with open_col:
+                if st.button("Open Shared Dataset"):
+                    dataset_id = dataset_labels[dataset_label]
+                    st.session_state.df = None
+                    st.session_state.daily = shared_db.daily(dataset_id)
+                    st.session_state.velocity_index = build_velocity_index(st.session_state.daily)
+                    st.session_state.stock = shared_db.latest_stock(dataset_id)
+                    st.session_state.locations = None
+                    st.session_state.data_key = ('db', dataset_id)
+                    st.session_state.dataset_id = dataset_id
+                    st.session_state.memory_report = None
+                    st.success(f"Opened {dataset_label}")
+            with delete_col:
+                if st.button("Delete Shared Dataset"):
+                    shared_db.delete(dataset_labels[dataset_label])
+                    st.success(f"Deleted {dataset_label}")
 
 # File upload section
 st.header("📤 Upload Sales Data")
@@ -88,13 +293,60 @@ uploaded_file = st.file_uploader(
     type=['csv', 'xlsx']
 )
 
+# Streaming mode keeps only per-(date, product) totals in memory
+streaming_mode = st.checkbox(
+    "Stream large file in chunks",
+    help="Reads only the mapped columns in chunks and keeps daily totals per product "
+         "instead of every row. Use this for files that don't fit in memory."
+)
+
+# Saved datasets can be opened from any session (see "Shared Database")
+share_dataset = False
+if not streaming_mode:
+    share_dataset = st.checkbox(
+        "Save to shared database",
+        help="Imports the processed rows into the local SQLite inventory database. Other "
+             "sessions can open the dataset, and per-product views read only that product's rows."
+    )
+
+# Delta mode merges a file of new sales rows into the data on the dashboard
+append_delta = False
+if st.session_state.daily is not None:
+    append_delta = st.checkbox(
+        "Append as delta to the current data",
+        help="Merges only the new rows into the daily totals, updates the latest stock by "
+             "date and recomputes predictions for the products in the file."
+    )
+
 if uploaded_file is not None:
     try:
-        # Read the file based on its extension
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
+        # Read the file based on its extension. Only the header is needed for
+        # the column mapping; the full file is read when it is processed.
+        file_hash = content_hash(uploaded_file)
+        
+        is_csv = uploaded_file.name.endswith('.csv')
+        
+        # Workbooks: pick the sheet, then read just its header row
+        sheet_name = None
+        if not is_csv:
+            sheets = memo.get_or_compute(('sheets', file_hash), lambda: excel.sheet_names(uploaded_file))
+            if len(sheets) > 1:
+                sheet_name = st.selectbox("Sheet", options=sheets)
+        
+        # Only the mapped columns are read when the file is processed
+        def read_upload(columns):
+            uploaded_file.seek(0)
+            if is_csv:
+                return pd.read_csv(uploaded_file, usecols=columns)
+            return excel.read_columns(uploaded_file, columns, sheet_name)
+        
+        def read_header():
+            uploaded_file.seek(0)
+            if is_csv:
+                return pd.read_csv(uploaded_file, nrows=0)
+            return excel.read_header(uploaded_file, sheet_name)
+        
+        df = memo.get_or_compute(('upload', file_hash, sheet_name), read_header)
         
         # Display basic info about the uploaded data
         st.success(f"Successfully uploaded the file!!")
@@ -124,248 +376,432 @@ if uploaded_file is not None:
             if receipts_col != "None (Assume 0 units)":
                 st.session_state.receipts_col = receipts_col
         
+        # Optional hierarchy for multi-location data: predictions per product
+        # x location, rolled up to products, locations and categories
+        hierarchy_options = ["None"] + list(df.columns)
+        col6, col7, _ = st.columns([1, 1, 3])
+        with col6:
+            location_col = st.selectbox("Location Column (optional)", options=hierarchy_options)
+        with col7:
+            category_col = st.selectbox("Category Column (optional)", options=hierarchy_options,
+                                        help="Used together with a location column")
+        
         # Check if we need to process the data
         if st.button("Process Data"):
-            # Basic data processing
-            df_processed = df.copy()
-            
-            # Parse date column with flexible format handling
-            df_processed['date'] = parse_date_column(df_processed[date_col])
-            
-            # Check if date parsing was successful
-            if df_processed['date'].isna().any():
-                invalid_dates = df_processed[df_processed['date'].isna()][date_col].unique()
-                st.warning(f"Could not parse some date values: {', '.join(map(str, invalid_dates[:5]))}...")
-                # Remove rows with invalid dates
-                df_processed = df_processed.dropna(subset=['date'])
-            
-            df_processed['product'] = df_processed[product_col].astype(str)
-            df_processed['quantity'] = pd.to_numeric(df_processed[quantity_col], errors='coerce')
+            mapping = dict(
+                date_col=date_col,
+                product_col=product_col,
+                quantity_col=quantity_col,
+                stock_col=None if stock_col == "None (Assume 100 units)" else stock_col,
+                receipts_col=None if receipts_col == "None (Assume 0 units)" else receipts_col
+            )
+            # Only added when mapped, so keys of single-location uploads don't change
+            if location_col != "None":
+                mapping['location_col'] = location_col
+                if category_col != "None":
+                    mapping['category_col'] = category_col
             
-            # Handle stock data
-            if stock_col != "None (Assume 100 units)":
-                df_processed['current_stock'] = pd.to_numeric(df_processed[stock_col], errors='coerce')
+            if append_delta:
+                # Process only the new rows and merge them into the current data
+                def append_upload():
+                    with perf.stage('read_file') as record:
+                        raw = read_upload(ingest.mapped_columns(**mapping))
+                        record['rows'] = len(raw)
+                    delta_processed, invalid_dates = engine.process_frame(raw, **mapping)
+                    delta_processed = engine.compact_frame(
+                        delta_processed,
+                        stock_mapped=mapping['stock_col'] is not None,
+                        receipts_mapped=mapping['receipts_col'] is not None
+                    )
+                    if delta_processed.empty:
+                        return None, invalid_dates
+                    
+                    base_key = st.session_state.data_key
+                    base_daily = st.session_state.daily
+                    totals = memo.get_or_compute((base_key, 'totals'), lambda: engine.product_totals(base_daily))
+                    previous = memo.get((base_key, 'predictions', 'All Products', 'simple', None))
+                    start = time.perf_counter()
+                    result = delta.apply_delta(
+                        base_daily, st.session_state.stock, totals,
+                        None if previous is None else previous[0], delta_processed
+                    )
+                    
+                    # Location totals can only be extended by days after the
+                    # ones they hold; overlapping deltas need a full upload
+                    locations = st.session_state.locations
+                    if locations is not None:
+                        appends = 'location' in delta_processed.columns and \
+                            delta_processed['date'].min() > locations.last_date
+                        locations = locations.append(delta_processed, result[1]) if appends else None
+                    return result + (locations, time.perf_counter() - start), invalid_dates
+                
+                delta_key = ('delta', st.session_state.data_key, file_hash, sheet_name) + tuple(mapping.values())
+                with perf.stage('process_upload'):
+                    result, invalid_dates = memo.get_or_compute(delta_key, append_upload)
+                
+                if len(invalid_dates):
+                    st.warning(f"Could not parse some date values: {', '.join(map(str, invalid_dates[:5]))}...")
+                if result is None:
+                    st.error("No valid rows found in the file.")
+                else:
+                    daily, stock, totals, predictions, touched, locations, seconds = result
+                    if locations is None and st.session_state.locations is not None:
+                        st.warning("Location rollups were dropped: the delta has no location column or "
+                                   "overlaps days already loaded. Upload the full file to rebuild them.")
+                    # Seed the dashboard's cache for the merged data; the
+                    # row-level frame is not kept in delta mode
+                    memo.put((delta_key, 'totals'), totals)
+                    memo.put((delta_key, 'predictions', 'All Products', 'simple', None), (predictions, seconds))
+                    st.session_state.df = None
+                    st.session_state.daily = daily
+                    st.session_state.velocity_index = build_velocity_index(daily)
+                    st.session_state.stock = stock
+                    st.session_state.locations = locations
+                    st.session_state.data_key = delta_key
+                    st.session_state.dataset_id = None
+                    st.session_state.memory_report = None
+                    st.success(f"Delta merged: {len(touched):,} products updated in {seconds * 1000:,.0f} ms.")
             else:
-                # If no stock column, assume 100 units for all products
-                df_processed['current_stock'] = 100
+                # The sheet is part of the key for workbooks (CSV keys stay as before)
+                stored_key = store_key(file_hash, mapping if is_csv else dict(mapping, sheet=sheet_name))
             
-            # Handle stock receipts data
-            if receipts_col != "None (Assume 0 units)":
-                df_processed['stock_receipts'] = pd.to_numeric(df_processed[receipts_col], errors='coerce')
-                # Fill NaN values with 0 (no receipts)
-                df_processed['stock_receipts'] = df_processed['stock_receipts'].fillna(0)
-            else:
-                # If no receipts column, assume 0 units for all products
-                df_processed['stock_receipts'] = 0
+                def process_upload():
+                    # Memory-map a previously stored result for the same file and mapping
+                    stored = processed_store.load(stored_key) if use_store else None
+                    if stored is not None and (streaming_mode or stored[3]['has_processed']):
+                        stored_df, stored_daily, stored_stock, meta = stored
+                        st.info("Loaded previously processed data from the local store.")
+                        return (None if streaming_mode else stored_df), stored_daily, stored_stock, \
+                            meta.get('invalid_dates', []), meta.get('memory')
+                
+                    if streaming_mode:
+                        # Fold the file chunk by chunk into daily totals
+                        uploaded_file.seek(0)
+                        progress_text = st.empty()
+                        accumulator = ingest.stream_daily_aggregates(
+                            uploaded_file,
+                            uploaded_file.name,
+                            progress=lambda rows: progress_text.caption(f"Read {rows:,} rows..."),
+                            sheet_name=sheet_name,
+                            **mapping
+                        )
+                        df_processed = None
+                        daily, stock = accumulator.result()
+                        invalid_dates = accumulator.invalid_dates
+                        memory = None
+                    else:
+                        # Parse dates, coerce numbers and fill in assumed stock / receipts
+                        with perf.stage('read_file') as record:
+                            raw = read_upload(ingest.mapped_columns(**mapping))
+                            record['rows'] = len(raw)
+                        df_processed, invalid_dates = engine.process_frame(raw, **mapping)
+                        del raw
+                    
+                        # Compact the frame kept in the session: mapped columns only,
+                        # categorical products, downcast numbers, scalar defaults
+                        bytes_before = int(df_processed.memory_usage(deep=True).sum())
+                        df_processed = engine.compact_frame(
+                            df_processed,
+                            stock_mapped=mapping['stock_col'] is not None,
+                            receipts_mapped=mapping['receipts_col'] is not None
+                        )
+                        bytes_after = int(df_processed.memory_usage(deep=True).sum())
+                        memory = {'before': bytes_before, 'after': bytes_after}
+                    
+                        daily = engine.aggregate_daily(df_processed)
+                        stock = engine.latest_stock(df_processed)
+                
+                    if use_store and daily is not None and not daily.empty:
+                        processed_store.save(stored_key, df_processed, daily, stock, {
+                            'file_name': uploaded_file.name,
+                            'mapping': mapping,
+                            'invalid_dates': [str(value) for value in invalid_dates[:20]],
+                            'memory': memory
+                        })
+                    return df_processed, daily, stock, invalid_dates, memory
             
-            # Remove rows with invalid quantities
-            df_processed = df_processed.dropna(subset=['quantity'])
+                # Same file and mapping as before: reuse the processed result
+                processed_key = ('processed', file_hash, sheet_name, streaming_mode) + tuple(mapping.values())
+                with perf.stage('process_upload'):
+                    df_processed, daily, stock, invalid_dates, memory = memo.get_or_compute(processed_key, process_upload)
+                
+                # Per-location predictions and rollups need the processed rows
+                locations = None
+                if 'location_col' in mapping:
+                    if df_processed is None:
+                        st.info("Location rollups are not available in streaming mode; "
+                                "stock is still summed over locations.")
+                    else:
+                        locations = memo.get_or_compute(
+                            processed_key + ('locations',),
+                            lambda: LocationRollup.from_frame(df_processed)
+                        )
+            
+                # Report values that could not be parsed as dates (those rows are dropped)
+                if len(invalid_dates):
+                    st.warning(f"Could not parse some date values: {', '.join(map(str, invalid_dates[:5]))}...")
             
-            # Store in session state
-            st.session_state.df = df_processed
-            st.success("Data processed successfully!")
+                # Store in session state; the dashboard works on the daily aggregates
+                if daily is None or daily.empty:
+                    st.error("No valid rows found in the file.")
+                else:
+                    st.session_state.df = df_processed
+                    st.session_state.daily = daily
+                    st.session_state.velocity_index = build_velocity_index(daily)
+                    st.session_state.stock = stock
+                    st.session_state.locations = locations
+                    st.session_state.data_key = processed_key
+                    st.session_state.dataset_id = None
+                    st.session_state.memory_report = memory
+                    
+                    # Shared dataset: the session keeps the database's frames
+                    # and drops its own copy of the rows
+                    if share_dataset and df_processed is not None:
+                        dataset_id = shared_db.import_frame(stored_key, uploaded_file.name, df_processed)
+                        memo.invalidate(processed_key)
+                        st.session_state.df = None
+                        st.session_state.daily = shared_db.daily(dataset_id)
+                        st.session_state.stock = shared_db.latest_stock(dataset_id)
+                        st.session_state.data_key = ('db', dataset_id)
+                        st.session_state.dataset_id = dataset_id
+                    st.success("Data processed successfully!")
     
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
 
 # If we have processed data, show the dashboard
-if st.session_state.df is not None:
-    df = st.session_state.df
+if st.session_state.daily is not None:
+    daily = st.session_state.daily
+    data_key = st.session_state.data_key
+    dataset_id = st.session_state.dataset_id
     
     # Calculate sales velocity and predictions
     st.header("📊 Stock Prediction Dashboard")
     
     # Get unique products
-    products = df['product'].unique()
+    products = daily['product'].unique()
     
     # Let user select a product to focus on or show all
     selected_product = st.selectbox("Select Product", options=["All Products"] + list(products))
     
+    # Daily sales and receipts (already aggregated at processing time)
     if selected_product == "All Products":
-        product_df = df
+        daily_data = daily
     else:
-        product_df = df[df['product'] == selected_product]
-    
-    # Calculate daily sales and receipts
-    daily_data = product_df.groupby(['date', 'product']).agg({
-        'quantity': 'sum',
-        'stock_receipts': 'sum'
-    }).reset_index()
-    
-    # Calculate sales velocity (average daily sales)
-    sales_velocity = daily_data.groupby('product').agg({
-        'quantity': 'mean',
-        'stock_receipts': 'sum'
-    }).reset_index()
-    sales_velocity.columns = ['product', 'avg_daily_sales', 'total_receipts']
-    
-    # Get current stock for each product (use the latest available stock data)
-    current_stock = df.groupby('product')['current_stock'].last().reset_index()
-    sales_velocity = sales_velocity.merge(current_stock, on='product')
-    
-    # Adjust current stock with receipts (if any)
-    sales_velocity['adjusted_stock'] = sales_velocity['current_stock'] + sales_velocity['total_receipts']
-    
-    # Calculate days until stockout
-    sales_velocity['days_until_stockout'] = sales_velocity['adjusted_stock'] / sales_velocity['avg_daily_sales']
-    sales_velocity['stockout_date'] = datetime.now() + pd.to_timedelta(
-        sales_velocity['days_until_stockout'], unit='D'
+        # Shared datasets read the product's rows through the (product, date) index
+        daily_data = memo.get_or_compute(
+            (data_key, 'daily', selected_product),
+            lambda: daily[daily['product'] == selected_product] if dataset_id is None
+            else shared_db.product_daily(dataset_id, selected_product)
+        )
+    
+    # Daily aggregates are ordered by date
+    first_date, last_date = daily['date'].iloc[0], daily['date'].iloc[-1]
+    num_days = (last_date - first_date).days + 1
+    
+    window_options = {"All history": None, "Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "Custom": 0}
+    window_col1, window_col2 = st.columns(2)
+    with window_col1:
+        velocity_window = st.selectbox("Velocity window", options=list(window_options))
+    window_days = window_options[velocity_window]
+    if window_days == 0:
+        with window_col2:
+            window_days = st.number_input(
+                "Custom window (days)",
+                min_value=1,
+                max_value=max(num_days, 1),
+                value=min(14, max(num_days, 1))
+            )
+    window_end = last_date
+    window_start = first_date if window_days is None else max(first_date, last_date - pd.Timedelta(days=window_days - 1))
+    
+    velocity_idx = st.session_state.velocity_index
+    if window_days is not None and velocity_idx is None:
+        st.caption("The catalog is too large for the velocity index; windows are computed from the daily rows.")
+    
+    # All products over the full history only need the per-product totals
+    # (kept up to date by delta appends); other windows use the index built
+    # at processing time. A single product's few rows are windowed directly
+    # (this also gives its sales volatility).
+    def velocity_stats():
+        if selected_product != "All Products":
+            return window_stats(daily_data, window_start, window_end)
+        if window_days is None:
+            totals = memo.get_or_compute(
+                (data_key, 'totals'),
+                lambda: engine.product_totals(daily) if dataset_id is None else shared_db.product_totals(dataset_id)
+            )
+            return engine.velocity_from_totals(totals)
+        with perf.stage('velocity_window', rows=len(daily) if velocity_idx is None else len(velocity_idx.products)):
+            if velocity_idx is None:
+                return window_stats(daily, window_start, window_end)
+            return velocity_idx.window(*velocity_idx.last_days(window_days))
+    
+    # Stockout days from the average daily sales, or from a per-product
+    # demand forecast (Holt-Winters for regular sellers, TSB for intermittent ones)
+    prediction_method = st.radio(
+        "Prediction method",
+        options=["Simple velocity", "Exponential smoothing (Holt-Winters / TSB)"],
+        horizontal=True
     )
     
-    # Determine status with traffic light system
-    def get_status(days):
-        if days > 14:
-            return "🟢 Safe"
-        elif days > 7:
-            return "🟡 Low"
-        else:
-            return "🔴 Critical"
+    # Velocity, stock (latest available per product), stockout days and status.
+    # Only depends on the data and the selected product, not on the threshold.
+    def timed(compute):
+        start = time.perf_counter()
+        result = compute()
+        return result, time.perf_counter() - start
+    
+    simple_key = (data_key, 'predictions', selected_product, 'simple', window_days)
+    forecast_key = (data_key, 'predictions', selected_product, 'forecast')
+    sales_velocity, simple_seconds = memo.get_or_compute(
+        simple_key,
+        lambda: timed(lambda: engine.predict_from_velocity(velocity_stats(), st.session_state.stock))
+    )
+    if prediction_method == "Simple velocity":
+        forecast_result = memo.get(forecast_key)
+    else:
+        forecast_result = memo.get_or_compute(
+            forecast_key,
+            lambda: timed(lambda: forecast.predict(daily_data, st.session_state.stock))
+        )
+        sales_velocity = forecast_result[0]
+    # Tables derived from the predictions below are memoized under this key
+    predictions_key = simple_key if prediction_method == "Simple velocity" else forecast_key
     
-    sales_velocity['status'] = sales_velocity['days_until_stockout'].apply(get_status)
+    forecast_timing = f"{forecast_result[1] * 1000:,.0f} ms" if forecast_result else "not run yet"
+    st.caption(
+        f"Velocity window: {window_start:%Y-%m-%d} to {window_end:%Y-%m-%d} "
+        f"(the forecast always uses the full history). "
+        f"Computation time: simple velocity {simple_seconds * 1000:,.0f} ms, "
+        f"exponential smoothing {forecast_timing}"
+    )
     
     # Display the predictions
     st.subheader("Stockout Predictions")
     st.dataframe(sales_velocity)
     
+    # Multi-location data: every rollup level was computed at processing
+    # time, so switching levels or drilling down only slices the tables
+    locations = st.session_state.locations
+    if locations is not None:
+        st.subheader("🏬 Location Rollups")
+        levels = {"Product": 'product', "Location": 'location'}
+        if locations.has_categories:
+            levels["Category"] = 'category'
+        level_col1, level_col2 = st.columns([1, 2])
+        with level_col1:
+            level_label = st.radio("Roll up by", options=list(levels), horizontal=True)
+        level = levels[level_label]
+        level_table = locations.level(level)
+        with level_col2:
+            member = st.selectbox(f"Drill down into {level_label.lower()}", options=level_table['name'])
+        st.dataframe(level_table, hide_index=True)
+        st.caption(
+            f"{len(locations.series):,} product x location series. Velocity and stock are summed "
+            f"over each {level_label.lower()}'s series; 'critical' and 'low' count its series by status."
+        )
+        if member is not None:
+            st.dataframe(locations.drill(level, member), hide_index=True)
+    
     # Visualizations
     st.subheader("Sales Trends & Predictions")
     
-    # Create tabs for different visualizations
-    tab1, tab2, tab3 = st.tabs(["Stockout Timeline", "Sales Trends", "Inventory Health"])
+    # Only the selected view is rendered on a rerun (tabs would draw all three)
+    view_col1, view_col2 = st.columns([3, 1])
+    with view_col1:
+        chart_view = st.radio(
+            "View",
+            options=["Stockout Timeline", "Sales Trends", "Inventory Health"],
+            horizontal=True,
+            label_visibility="collapsed"
+        )
     
-    with tab1:
-        # Stockout timeline visualization using matplotlib
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Sort by days until stockout for better visualization
-        sorted_data = sales_velocity.sort_values('days_until_stockout', ascending=True)
-        
-        # Create color mapping
-        colors = []
-        for days in sorted_data['days_until_stockout']:
-            if days > 14:
-                colors.append('green')
-            elif days > 7:
-                colors.append('orange')
-            else:
-                colors.append('red')
-        
-        # Create the bar chart
-        bars = ax.bar(range(len(sorted_data)), sorted_data['days_until_stockout'], color=colors)
-        
-        # Add value labels on bars
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{height:.1f}',
-                    ha='center', va='bottom', fontweight='bold')
-        
-        # Add threshold lines
-        ax.axhline(y=7, color='orange', linestyle='--', alpha=0.7, label='Low Stock Threshold')
-        ax.axhline(y=14, color='green', linestyle='--', alpha=0.7, label='Safe Stock Threshold')
-        
-        # Customize the chart
-        ax.set_title('Days Until Stockout by Product', fontsize=16, fontweight='bold')
-        ax.set_xlabel('Product')
-        ax.set_ylabel('Days Until Stockout')
-        ax.set_xticks(range(len(sorted_data)))
-        ax.set_xticklabels(sorted_data['product'], rotation=45, ha='right')
-        ax.legend()
-        ax.grid(axis='y', alpha=0.3)
-        
-        plt.tight_layout()
-        st.pyplot(fig)
+    # Figures are cached under a hash of the data they plot, so they are
+    # redrawn when the prediction method, window or data change and reused
+    # otherwise
+    def timed_png(name, draw):
+        with perf.stage(f'chart_{name}'):
+            return charts.figure_png(draw())
+    
+    def cached_png(name, data, draw, *params):
+        return memo.get_or_compute(
+            ('figure', name, charts.frame_hash(data)) + params,
+            lambda: timed_png(name, draw)
+        )
     
-    with tab2:
+    if chart_view == "Stockout Timeline":
+        # Large catalogs: bars for the most urgent products, histogram for the rest
+        with view_col2:
+            top_n = st.number_input("At-risk products shown", min_value=5, max_value=100,
+                                    value=charts.DEFAULT_TOP_N, step=5)
+        timeline_data = sales_velocity[['product', 'days_until_stockout']]
+        chart_png = cached_png(
+            'timeline', timeline_data,
+            lambda: charts.stockout_timeline_figure(timeline_data, top_n=top_n),
+            top_n
+        )
+        st.image(chart_png, use_column_width=True)
+    
+    elif chart_view == "Sales Trends":
         # Sales trends visualization
         if selected_product == "All Products":
-            # Create a line chart for all products using Streamlit's native line_chart
-            pivot_sales = daily_data.pivot(index='date', columns='product', values='quantity').fillna(0)
+            # Streamlit's native line_chart with the top sellers plus the rest
+            # of the catalog as one line, downsampled to a bounded point count
+            pivot_sales = memo.get_or_compute(
+                (data_key, 'trend_lines', 'quantity'),
+                lambda: charts.trend_lines(daily_data, 'quantity')
+            )
             st.line_chart(pivot_sales)
-            st.caption("Sales Trends for All Products")
+            st.caption(f"Sales Trends for the Top {charts.TOP_TREND_PRODUCTS} Products")
             
             # Also show receipts if available
             if (daily_data['stock_receipts'] > 0).any():
-                pivot_receipts = daily_data.pivot(index='date', columns='product', values='stock_receipts').fillna(0)
+                pivot_receipts = memo.get_or_compute(
+                    (data_key, 'trend_lines', 'stock_receipts'),
+                    lambda: charts.trend_lines(daily_data, 'stock_receipts')
+                )
                 st.line_chart(pivot_receipts)
-                st.caption("Stock Receipts for All Products")
+                st.caption(f"Stock Receipts for the Top {charts.TOP_TREND_PRODUCTS} Products")
         else:
             # For a single product, show more detailed analysis
-            product_data = daily_data[daily_data['product'] == selected_product]
-            
-            # Create a line chart with area
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            # Plot the sales data
-            ax.plot(product_data['date'], product_data['quantity'], 
-                   marker='o', linewidth=2, markersize=4, label='Daily Sales')
-            
-            # Plot stock receipts if available
-            if (product_data['stock_receipts'] > 0).any():
-                ax.bar(product_data['date'], product_data['stock_receipts'], 
-                      alpha=0.5, label='Stock Receipts', color='green')
-            
-            # Add a 7-day moving average
-            moving_avg = product_data['quantity'].rolling(window=7, min_periods=1).mean()
-            ax.plot(product_data['date'], moving_avg, 
-                   color='red', linewidth=2, label='7-Day Moving Average')
+            product_data = daily_data[['date', 'quantity', 'stock_receipts']]
             
-            # Fill area under the curve
-            ax.fill_between(product_data['date'], product_data['quantity'], alpha=0.3)
-            
-            # Customize the chart
-            ax.set_title(f'Sales Trend for {selected_product}', fontsize=16, fontweight='bold')
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Quantity')
-            ax.legend()
-            ax.grid(True, alpha=0.3)
-            plt.xticks(rotation=45)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
+            chart_png = cached_png(
+                'trend', product_data,
+                lambda: charts.product_trend_figure(product_data, selected_product),
+                selected_product
+            )
+            st.image(chart_png, use_column_width=True)
             
-            # Show sales statistics
+            # Show sales statistics (average, receipts and volatility over the
+            # selected velocity window)
+            product_stats = memo.get_or_compute(
+                (data_key, 'product_stats', selected_product, window_days),
+                lambda: velocity_stats().iloc[0]
+            )
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                st.metric("Average Daily Sales", f"{product_data['quantity'].mean():.2f}")
+                st.metric("Average Daily Sales", f"{product_stats['avg_daily_sales']:.2f}")
             with col2:
                 st.metric("Max Daily Sales", f"{product_data['quantity'].max():.2f}")
             with col3:
-                st.metric("Total Receipts", f"{product_data['stock_receipts'].sum():.0f}")
+                st.metric("Total Receipts", f"{product_stats['total_receipts']:.0f}")
             with col4:
-                st.metric("Sales Volatility", f"{product_data['quantity'].std():.2f}")
+                st.metric("Sales Volatility", f"{product_stats['sales_volatility']:.2f}")
     
-    with tab3:
+    else:
         # Inventory health dashboard
         st.subheader("Inventory Health Status")
         
         # Create a summary of inventory status
         status_counts = sales_velocity['status'].value_counts()
         
-        # Create a pie chart for inventory status
-        fig, ax = plt.subplots(figsize=(8, 8))
-        
-        # Define colors for each status
-        colors = {'🟢 Safe': 'green', '🟡 Low': 'orange', '🔴 Critical': 'red'}
-        pie_colors = [colors[status] for status in status_counts.index]
-        
-        # Create the pie chart
-        wedges, texts, autotexts = ax.pie(
-            status_counts.values, 
-            labels=status_counts.index, 
-            autopct='%1.1f%%',
-            colors=pie_colors,
-            startangle=90
+        chart_png = cached_png(
+            'health', status_counts,
+            lambda: charts.inventory_health_figure(status_counts)
         )
-        
-        # Style the text
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-        
-        ax.set_title('Inventory Health Distribution', fontsize=16, fontweight='bold')
-        
-        st.pyplot(fig)
+        st.image(chart_png, use_column_width=True)
         
         # Show inventory metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -381,65 +817,136 @@ if st.session_state.df is not None:
             total_receipts = sales_velocity['total_receipts'].sum()
             st.metric("Total Stock Receipts", f"{total_receipts:.0f}")
     
-    # Restock suggestions
+    # Restock suggestions (computed for every product at once and shown as
+    # one paginated table, so the page size doesn't grow with the catalog)
     st.subheader("🔄 Restock Suggestions")
     
-    # Check for products that need restocking
-    products_needing_restock = sales_velocity[sales_velocity['days_until_stockout'] < 14]
+    restock = memo.get_or_compute(predictions_key + ('restock',), lambda: engine.restock_suggestions(sales_velocity))
     
-    if products_needing_restock.empty:
+    if restock.empty:
         st.success("🎉 All products have sufficient stock! No immediate restocking needed.")
     else:
-        for _, row in products_needing_restock.iterrows():
-            # Calculate suggested restock quantity (30 days of inventory)
-            suggested_restock = max(50, row['avg_daily_sales'] * 30)
-            
-            # Adjust for any recent receipts
-            if row['total_receipts'] > 0:
-                st.warning(
-                    f"**{row['product']}**: Restock suggested. "
-                    f"Current stock (including {row['total_receipts']:.0f} units received) "
-                    f"will last {row['days_until_stockout']:.1f} days. "
-                    f"Suggested quantity: {suggested_restock:.0f} units."
-                )
-            else:
-                st.warning(
-                    f"**{row['product']}**: Restock suggested. "
-                    f"Current stock will last {row['days_until_stockout']:.1f} days. "
-                    f"Suggested quantity: {suggested_restock:.0f} units."
-                )
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Products to Restock", f"{len(restock):,}")
+        with col2:
+            st.metric("Critical", f"{(restock['status'] == engine.STATUS_CRITICAL).sum():,}")
+        with col3:
+            st.metric("Suggested Units", f"{restock['suggested_restock'].sum():,.0f}")
+        with col4:
+            st.metric("With Recent Receipts", f"{(restock['total_receipts'] > 0).sum():,}")
+        show_table_page(restock, 'restock', {
+            "Days until stockout": ('days_until_stockout', True),
+            "Suggested quantity": ('suggested_restock', False),
+            "Average daily sales": ('avg_daily_sales', False),
+            "Product": ('product', True),
+        })
+        st.caption(
+            f"Suggested quantity: {engine.RESTOCK_COVER_DAYS} days of average sales, at least "
+            f"{engine.MIN_RESTOCK_UNITS} units. Days until stockout include received stock."
+        )
+    
+    # Monte Carlo risk: demand paths bootstrapped from each product's daily
+    # sales give the chance of a stockout within the alert threshold and a
+    # service-level reorder quantity. Runs on request; results are memoized.
+    st.subheader("🎲 Stockout Risk Simulation")
+    sim_col1, sim_col2, sim_col3 = st.columns(3)
+    with sim_col1:
+        simulation_paths = st.selectbox(
+            "Demand paths per product", options=[1_000, 10_000, 50_000], index=1, format_func="{:,}".format
+        )
+    with sim_col2:
+        service_level = st.slider("Service level", min_value=0.80, max_value=0.995,
+                                  value=simulation.SERVICE_LEVEL, step=0.005, format="%.3f")
+    with sim_col3:
+        simulation_seed = st.number_input("Random seed", min_value=0, value=0, step=1)
+    
+    simulation_key = (data_key, 'simulation', selected_product, prediction_method, window_days,
+                      alert_threshold, simulation_paths, service_level, simulation_seed)
+    simulated = memo.get(simulation_key)
+    if simulated is None and st.button("Run Simulation"):
+        with st.spinner(f"Simulating {simulation_paths:,} demand paths for {len(sales_velocity):,} products..."):
+            simulated = memo.get_or_compute(simulation_key, lambda: timed(lambda: simulation.simulate(
+                daily_data, sales_velocity, alert_threshold, paths=simulation_paths,
+                service_level=service_level, seed=int(simulation_seed)
+            )))
+    
+    if simulated is None:
+        st.caption(
+            f"Samples {simulation_paths:,} demand paths per product from its daily sales history to "
+            f"estimate the chance of running out within {alert_threshold} days and how much to "
+            f"reorder to cover {engine.RESTOCK_COVER_DAYS} days at the chosen service level."
+        )
+    else:
+        risk_table, simulation_seconds = simulated
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(f"Likely Stockouts (≤{alert_threshold} days)",
+                      f"{(risk_table['stockout_probability'] >= 0.5).sum():,}")
+        with col2:
+            st.metric("Mean Stockout Probability", f"{risk_table['stockout_probability'].mean():.1%}")
+        with col3:
+            st.metric("Reorder Units", f"{risk_table['reorder_quantity'].sum():,}")
+        with col4:
+            st.metric("Simulation Time", f"{simulation_seconds:,.1f} s")
+        show_table_page(risk_table[[
+            'product', 'status', 'days_until_stockout', 'adjusted_stock'
+        ] + simulation.SIMULATION_COLUMNS], 'simulation', {
+            "Stockout probability": ('stockout_probability', False),
+            "Reorder quantity": ('reorder_quantity', False),
+            "Safety stock": ('safety_stock', False),
+            "Product": ('product', True),
+        })
+        st.caption(
+            f"Stockout probability: share of paths whose demand over the next {alert_threshold} days "
+            f"reaches the adjusted stock. Reorder quantity: units needed on top of the adjusted stock "
+            f"to meet {engine.RESTOCK_COVER_DAYS} days of demand with {service_level:.1%} probability "
+            f"(expected demand plus safety stock). Paths use the full sales history."
+        )
     
     # Notification system
     st.header("🔔 Restock Alerts")
     
-    # Check for critical products that need immediate attention
-    critical_products = sales_velocity[sales_velocity['days_until_stockout'] <= alert_threshold]
+    # Products running out within the alert threshold, with their alert day
+    # (keyed by today's date: alert days are never earlier than today)
+    today = date.today()
+    critical_products = memo.get_or_compute(
+        predictions_key + ('alert_schedule', alert_threshold, today),
+        lambda: engine.alert_schedule(sales_velocity, alert_threshold, today)
+    )
     
     if not critical_products.empty:
-        st.error("🚨 **IMMEDIATE ATTENTION NEEDED**")
-        
-        for _, row in critical_products.iterrows():
-            st.error(
-                f"**{row['product']}** is critical! "
-                f"Only {row['days_until_stockout']:.1f} days of stock remaining. "
-                f"Urgent restocking required!"
-            )
+        status_counts = critical_products['status'].value_counts()
+        st.error(
+            f"🚨 **IMMEDIATE ATTENTION NEEDED**: {len(critical_products):,} product(s) run out within "
+            f"{alert_threshold} days ("
+            + ", ".join(f"{count:,} {status}" for status, count in status_counts.items())
+            + "). Urgent restocking required!"
+        )
         
         # Show notification option
         if st.session_state.user_email:
             if st.button("Send Me These Alerts"):
-                # Create a simple message
-                alert_message = f"Stock Alerts for {st.session_state.user_email}:\n\n"
-                for _, row in critical_products.iterrows():
-                    alert_message += f"- {row['product']}: {row['days_until_stockout']:.1f} days until stockout\n"
-                
-                # In a real app, you would send this via email
-                # For this demo, we'll just show a success message
-                st.success(f"Alerts would be sent to {st.session_state.user_email}")
+                # Subscribe and persist the alert dates; critical products are
+                # due today and go out with the scheduler's next batch
+                alert_store.subscribe(st.session_state.user_email, alert_threshold)
+                alert_store.schedule(
+                    st.session_state.user_email, sales_velocity, alert_threshold,
+                    cancel_missing=selected_product == "All Products"
+                )
+                if alert_scheduler is not None:
+                    alert_scheduler.wake()
+                    st.success(f"Alerts scheduled and being sent to {st.session_state.user_email}")
+                else:
+                    st.success(f"Alerts scheduled for {st.session_state.user_email}")
+                    st.info("💡 Set RESTOCK_SMTP_HOST (and RESTOCK_SMTP_PORT, RESTOCK_SMTP_FROM) to deliver them by email")
                 
-                # Record the notification
+                # Record the notification (the first few products by name)
                 notification_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                products_notified = ", ".join(critical_products['product'].tolist())
+                names = critical_products['product'].astype(str)
+                products_notified = ", ".join(names.iloc[:MAX_LISTED_PRODUCTS])
+                if len(names) > MAX_LISTED_PRODUCTS:
+                    products_notified += f" and {len(names) - MAX_LISTED_PRODUCTS:,} more"
                 st.session_state.notifications_sent.append({
                     'time': notification_time,
                     'products': products_notified,
@@ -452,23 +959,22 @@ if st.session_state.df is not None:
     st.subheader("📅 Simulated Future Alerts")
 
     if not critical_products.empty:
-        simulated_alerts = []
-        today = datetime.now()
-        for _, row in critical_products.iterrows():
-            # Calculate the alert date (days before stockout)
-            alert_date = row['stockout_date'] - timedelta(days=alert_threshold)
-            if alert_date < today:
-                alert_date = today  # If alert date already passed, show today
-            simulated_alerts.append({
-                'Product': row['product'],
-                'Current Stock': int(row['adjusted_stock']),
-                'Avg Daily Sales': round(row['avg_daily_sales'], 2),
-                'Stockout Date': row['stockout_date'].strftime("%Y-%m-%d"),
-                f"Alert {alert_threshold} Days Before": alert_date.strftime("%Y-%m-%d")
-            })
-    
-        sim_alert_df = pd.DataFrame(simulated_alerts)
-        st.dataframe(sim_alert_df)
+        alert_column = f"Alert {alert_threshold} Days Before"
+        sim_alert_df = memo.get_or_compute(predictions_key + ('alert_table', alert_threshold, today), lambda: pd.DataFrame({
+            'Product': critical_products['product'],
+            'Status': critical_products['status'],
+            'Current Stock': critical_products['adjusted_stock'].to_numpy(dtype=float).astype(np.int64),
+            'Avg Daily Sales': critical_products['avg_daily_sales'].round(2),
+            'Days Until Stockout': critical_products['days_until_stockout'].round(1),
+            'Stockout Date': critical_products['stockout_date'].dt.strftime("%Y-%m-%d"),
+            alert_column: critical_products['alert_date'].dt.strftime("%Y-%m-%d"),
+        }))
+        show_table_page(sim_alert_df, 'alerts', {
+            "Days until stockout": ('Days Until Stockout', True),
+            "Alert date": (alert_column, True),
+            "Average daily sales": ('Avg Daily Sales', False),
+            "Product": ('Product', True),
+        }, product_column='Product', status_column='Status')
         st.info("💡 This table shows when alerts would be sent based on the stockout prediction. In a production system, emails would be automatically scheduled for these dates.")
     else:
         st.success("No products require alerts within the selected threshold.")
@@ -479,21 +985,78 @@ if st.session_state.df is not None:
         for notification in st.session_state.notifications_sent:
             st.write(f"⏰ {notification['time']}: Alert sent for {notification['products']}")
     
+    # Persisted alert schedule of a subscribed email. New predictions
+    # re-evaluate it incrementally (only moved stockout dates are rewritten).
+    subscribed_threshold = (
+        alert_store.subscription(st.session_state.user_email) if st.session_state.user_email else None
+    )
+    if subscribed_threshold is not None:
+        st.subheader("📬 Scheduled Alerts")
+        memo.get_or_compute(
+            ('alerts', st.session_state.user_email, subscribed_threshold,
+             charts.frame_hash(sales_velocity[['product', 'stockout_date']])),
+            lambda: alert_store.schedule(
+                st.session_state.user_email, sales_velocity, subscribed_threshold,
+                cancel_missing=selected_product == "All Products"
+            )
+        )
+        scheduled_alerts = alert_store.alerts(st.session_state.user_email)
+        status_summary = scheduled_alerts['status'].value_counts()
+        st.caption(
+            f"Alerting {subscribed_threshold} days before stockout: "
+            + ", ".join(f"{count} {status}" for status, count in status_summary.items())
+        )
+        st.dataframe(scheduled_alerts, hide_index=True)
+        if st.button("Unsubscribe"):
+            alert_store.unsubscribe(st.session_state.user_email)
+            st.success("Pending alerts cancelled")
+    
     # Data export
     st.header("💾 Export Data")
     
-    # Convert predictions to CSV
-    csv = sales_velocity.to_csv(index=False)
-    st.download_button(
-        label="Download Predictions as CSV",
-        data=csv,
-        file_name="stock_predictions.csv",
-        mime="text/csv"
-    )
+    # The CSV is only built when asked for (then kept for these predictions),
+    # so reruns don't serialize the whole table
+    def export_csv():
+        with perf.stage('export_csv', rows=len(sales_velocity)):
+            return sales_velocity.to_csv(index=False)
+    
+    export_key = predictions_key + ('csv',)
+    csv = memo.get(export_key)
+    if csv is None and st.button("Prepare CSV Export"):
+        csv = memo.get_or_compute(export_key, export_csv)
+    if csv is not None:
+        st.download_button(
+            label="Download Predictions as CSV",
+            data=csv,
+            file_name="stock_predictions.csv",
+            mime="text/csv"
+        )
     
 else:
     st.info("Please upload a sales data file to get started.")
 
+# Performance panel: stages of this run, totals per stage and a JSON lines export
+if st.session_state.perf is not None:
+    recorder = st.session_state.perf
+    with st.sidebar.expander("Performance", expanded=True):
+        run_stages = recorder.frame(run=recorder.run)
+        if run_stages.empty:
+            st.caption("Nothing was recomputed in this run (all results came from the cache).")
+        else:
+            st.caption(f"Run {recorder.run}: {run_stages.loc[run_stages['depth'] == 0, 'seconds'].sum():.3f}s in top-level stages")
+            st.dataframe(run_stages[['stage', 'seconds', 'peak_mb', 'rows']], hide_index=True)
+        st.caption("All runs")
+        st.dataframe(recorder.summary(), hide_index=True)
+        st.download_button(
+            label="Download as JSON lines",
+            data=recorder.to_jsonl(),
+            file_name="performance.jsonl",
+            mime="application/x-ndjson"
+        )
+        if st.button("Clear Measurements"):
+            recorder.clear()
+    perf.deactivate()
+
 # Add footer
 st.markdown("---")
 st.markdown(
@@ -0,0 +1,159 @@
+# perf.py
+# Lightweight instrumentation of named pipeline stages.
+#
+# Code marks its hot paths with `with perf.stage('parse_dates', rows=n):` or
+# the @perf.timed('aggregate_daily') decorator. When no recorder is active
+# for the current thread (the default, and the case for the batch CLI and
+# benchmarks) stage() returns a no-op context manager around a throwaway
+# record, so the cost is one thread-local lookup per stage.
+#
+# An active PerfRecorder stores wall time, peak traced memory (tracemalloc,
+# peak above the memory in use when the stage started) and row count for
+# every stage. Streamlit runs each session's script in its own thread, so
+# sessions don't see each other's stages.
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+# Stage records kept per recorder
+MAX_RECORDS = 2_000
+
+_local = threading.local()
+# Recorders tracing memory. tracemalloc is process-wide, so it runs until the
+# last of them (in any session) is released.
+_tracers = weakref.WeakSet()
+_tracers_lock = threading.Lock()
+
+
+class PerfRecorder:
+    def __init__(self, trace_memory=True, max_records=MAX_RECORDS):
+        self.trace_memory = trace_memory
+        self.records = deque(maxlen=max_records)
+        self.run = 0
+        self._stack = []
+
+    # Start a new run (one Streamlit rerun); stages are grouped by run
+    def next_run(self):
+        self.run += 1
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # Keep the enclosing stage's peak before resetting it for this one
+            if self._stack:
+                parent = self._stack[-1]
+                parent['peak'] = max(parent['peak'], peak - parent['base'])
+            tracemalloc.reset_peak()
+            frame = {'base': current, 'peak': 0}
+        else:
+            frame = {'base': 0, 'peak': 0}
+        self._stack.append(frame)
+
+        record = {'run': self.run, 'stage': name, 'rows': rows}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            peak_mb = None
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                frame['peak'] = max(frame['peak'], peak - frame['base'])
+                peak_mb = round(frame['peak'] / 1e6, 3)
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent['peak'] = max(parent['peak'], peak - parent['base'])
+
+            record.update({
+                'seconds': round(seconds, 6),
+                'peak_mb': peak_mb,
+                'depth': len(self._stack),
+                'time': time.time(),
+            })
+            self.records.append(record)
+
+    def clear(self):
+        self.records.clear()
+
+    # Records as a DataFrame (optionally only one run)
+    def frame(self, run=None):
+        records = [r for r in self.records if run is None or r['run'] == run]
+        return pd.DataFrame(records, columns=['run', 'stage', 'seconds', 'peak_mb', 'rows', 'depth', 'time'])
+
+    # Per-stage totals over every recorded run
+    def summary(self):
+        frame = self.frame()
+        if frame.empty:
+            return frame
+        return frame.groupby('stage', sort=False).agg(
+            calls=('seconds', 'size'),
+            total_seconds=('seconds', 'sum'),
+            max_seconds=('seconds', 'max'),
+            max_peak_mb=('peak_mb', 'max'),
+            max_rows=('rows', 'max'),
+        ).sort_values('total_seconds', ascending=False).reset_index()
+
+    # Records as JSON lines, one stage per line
+    def to_jsonl(self):
+        return "".join(json.dumps(record, default=str) + "\n" for record in self.records)
+
+
+# Make `recorder` (or None) the active recorder for the current thread and
+# start tracemalloc if it traces memory
+def activate(recorder):
+    _local.recorder = recorder
+    if recorder is not None and recorder.trace_memory:
+        with _tracers_lock:
+            _tracers.add(recorder)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+
+# Stop recording on the current thread
+def deactivate():
+    _local.recorder = None
+
+
+# A recorder that won't be used again stops holding tracemalloc; tracing
+# stops when no other recorder needs it
+def release(recorder):
+    with _tracers_lock:
+        _tracers.discard(recorder)
+        if not _tracers and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+# Context manager timing a named stage on the active recorder, or a no-op.
+# Yields a dict the caller may update (e.g. record['rows'] = len(result)).
+def stage(name, rows=None):
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        # A fresh record per call: callers write into it (record['rows'] = ...)
+        return nullcontext({})
+    return recorder.stage(name, rows)
+
+
+# Decorator recording every call of a function as a stage; rows is the
+# length of the first argument
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = getattr(_local, 'recorder', None)
+            if recorder is None:
+                return func(*args, **kwargs)
+            rows = len(args[0]) if args and hasattr(args[0], '__len__') else None
+            with recorder.stage(name, rows):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,228 @@
+# rollup.py
+# Per-location predictions and product / location / category rollups.
+#
+# With a Location column mapped, velocity, stock and stockout days are
+# computed per product x location ("series") on integer codes. Every series
+# belongs to one member of each level (its product, its location and its
+# product's category), so the rollups of all three levels come from a single
+# np.bincount over the stacked level codes instead of one groupby (or one
+# filter) per level or member.
+#
+# Rolled-up velocity and stock are sums over the member's series, so a
+# product's days until stockout is its network-wide stock over its
+# network-wide daily sales. Series are kept in per-level order indexes, so a
+# drill-down is an array slice and nothing is recomputed.
+import numpy as np
+import pandas as pd
+
+import engine
+import perf
+
+LEVELS = ('product', 'location', 'category')
+
+SERIES_COLUMNS = [
+    'product', 'location', 'category', 'avg_daily_sales', 'total_receipts', 'current_stock',
+    'adjusted_stock', 'days_until_stockout', 'stockout_date', 'status'
+]
+
+ROLLUP_COLUMNS = [
+    'name', 'series', 'critical', 'low', 'avg_daily_sales', 'total_receipts', 'current_stock',
+    'adjusted_stock', 'days_until_stockout', 'stockout_date', 'status'
+]
+
+# Totals kept per series; series_totals output, combined by append()
+TOTAL_COLUMNS = ['total_sales', 'days_with_sales', 'total_receipts']
+
+
+# Integer series keys (product code x location code) for product and
+# location columns; returns (keys, product codes, products, locations)
+def _series_keys(products, locations):
+    product_codes, product_names = engine.factorize_products(products)
+    location_codes, location_names = engine.factorize_products(locations)
+    keys = product_codes.astype(np.int64) * len(location_names) + location_codes
+    return keys, product_codes, product_names, location_names
+
+
+# Last position of every run of equal values in a sorted array
+def _run_ends(sorted_values):
+    return np.flatnonzero(np.append(sorted_values[1:] != sorted_values[:-1], True))
+
+
+# Category per product code as a categorical; a product is expected to have
+# one category, and any of its rows may provide it. Every product is
+# "Uncategorized" without a category column.
+def _product_categories(df, codes, num_products):
+    if 'category' not in df.columns:
+        return pd.Categorical.from_codes(np.zeros(num_products, dtype=np.int32), [engine.UNCATEGORIZED])
+    category_codes, categories = engine.factorize_products(df['category'])
+    per_product = np.zeros(num_products, dtype=np.int64)
+    per_product[codes] = category_codes
+    return pd.Categorical.from_codes(per_product, categories=categories)
+
+
+# Sales totals per product x location series of a processed frame: total
+# sales, days with sales rows, total receipts, the product's category and the
+# last date with sales
+@perf.timed('series_totals')
+def series_totals(df):
+    keys, row_products, products, locations = _series_keys(df['product'], df['location'])
+    series_keys, series = np.unique(keys, return_inverse=True)
+    date_codes, dates = pd.factorize(df['date'], sort=True)
+
+    # One entry per (series, date) with sales rows, ordered by series then date
+    series_days = np.unique(series.astype(np.int64) * len(dates) + date_codes)
+    day_series = series_days // len(dates)
+    last_days = series_days[_run_ends(day_series)] % len(dates)
+
+    product_codes = series_keys // len(locations)
+    categories = _product_categories(df, row_products, len(products))
+    return pd.DataFrame({
+        'product': pd.Categorical.from_codes(product_codes, categories=products),
+        'location': pd.Categorical.from_codes(series_keys % len(locations), categories=locations),
+        'category': categories.take(product_codes),
+        'total_sales': np.bincount(series, weights=df['quantity'].to_numpy(dtype=float),
+                                   minlength=len(series_keys)),
+        'days_with_sales': np.bincount(day_series, minlength=len(series_keys)),
+        'total_receipts': np.bincount(series, weights=engine.column_values(df, 'stock_receipts'),
+                                      minlength=len(series_keys)),
+        'last_date': dates.take(last_days),
+    })
+
+
+# Sum series totals from several frames (e.g. the stored totals and an
+# appended delta whose dates come after them)
+def combine_series_totals(*tables):
+    frame = pd.concat(tables, ignore_index=True)
+    keys, _, products, locations = _series_keys(frame['product'], frame['location'])
+    series_keys, series = np.unique(keys, return_inverse=True)
+
+    # Category and last date come from the latest table holding the series
+    latest = np.lexsort((np.arange(len(keys)), series))
+    latest = latest[_run_ends(series[latest])]
+
+    product_codes = series_keys // len(locations)
+    category_codes, categories = engine.factorize_products(frame['category'])
+    combined = {
+        'product': pd.Categorical.from_codes(product_codes, categories=products),
+        'location': pd.Categorical.from_codes(series_keys % len(locations), categories=locations),
+        'category': pd.Categorical.from_codes(category_codes[latest], categories=categories),
+    }
+    for column in TOTAL_COLUMNS:
+        values = np.bincount(series, weights=frame[column].to_numpy(dtype=float), minlength=len(series_keys))
+        combined[column] = values.astype(np.int64) if column == 'days_with_sales' else values
+    combined['last_date'] = frame['last_date'].to_numpy()[latest]
+    return pd.DataFrame(combined)
+
+
+class LocationRollup:
+    def __init__(self, totals, stock, now=None):
+        self.totals = totals
+        self.last_date = totals['last_date'].max() if len(totals) else None
+        self.series = self._series_predictions(totals, stock, now)
+        self.rollups, self._level_bounds, self._level_names = self._rollup(self.series, now)
+        self._drill_index = {level: self._order(level) for level in LEVELS}
+
+    @classmethod
+    def from_frame(cls, df, now=None):
+        return cls(series_totals(df), engine.latest_stock(df), now=now)
+
+    # Rollup after appending a processed delta frame whose dates all come
+    # after last_date (`stock` is the already updated per-location stock)
+    def append(self, delta, stock, now=None):
+        return LocationRollup(combine_series_totals(self.totals, series_totals(delta)), stock, now=now)
+
+    @property
+    def has_categories(self):
+        return len(self.series['category'].cat.categories) > 1
+
+    @property
+    def nbytes(self):
+        frames = (self.totals, self.series, self.rollups)
+        indexes = sum(order.nbytes + bounds.nbytes for order, bounds in self._drill_index.values())
+        return int(sum(frame.memory_usage(deep=False).sum() for frame in frames)) + indexes
+
+    # Series table (velocity, stock and stockout days per product x location).
+    # Series without a stock level are dropped, like predict_from_velocity.
+    @staticmethod
+    @perf.timed('series_predictions')
+    def _series_predictions(totals, stock, now):
+        products = totals['product'].cat.categories
+        locations = totals['location'].cat.categories
+        series_keys = (totals['product'].cat.codes.to_numpy().astype(np.int64) * len(locations)
+                       + totals['location'].cat.codes.to_numpy())
+
+        # Look up each stock row's series by key (series keys are sorted)
+        stock_products = products.get_indexer(stock['product'])
+        stock_locations = locations.get_indexer(stock['location'])
+        known = (stock_products >= 0) & (stock_locations >= 0)
+        stock_keys = stock_products[known].astype(np.int64) * len(locations) + stock_locations[known]
+        positions = np.searchsorted(series_keys, stock_keys).clip(max=max(len(series_keys) - 1, 0))
+        found = series_keys[positions] == stock_keys if len(series_keys) else np.zeros(0, dtype=bool)
+
+        current_stock = np.full(len(totals), np.nan)
+        current_stock[positions[found]] = stock['current_stock'].to_numpy(dtype=float)[known][found]
+        has_stock = ~np.isnan(current_stock)
+
+        table = totals.loc[has_stock, ['product', 'location', 'category']].reset_index(drop=True)
+        table['avg_daily_sales'] = (totals['total_sales'].to_numpy()[has_stock]
+                                    / totals['days_with_sales'].to_numpy()[has_stock])
+        table['total_receipts'] = totals['total_receipts'].to_numpy()[has_stock]
+        table['current_stock'] = current_stock[has_stock]
+        table['adjusted_stock'] = table['current_stock'] + table['total_receipts']
+        return engine.add_stockout_predictions(table, now=now)[SERIES_COLUMNS]
+
+    # Rollups of every level in one pass: the series' product, location and
+    # category codes are stacked (offset per level) and summed with bincount
+    @staticmethod
+    @perf.timed('rollup_levels')
+    def _rollup(series, now):
+        codes = [series[level].cat.codes.to_numpy().astype(np.int64) for level in LEVELS]
+        names = [series[level].cat.categories.to_numpy(dtype=object) for level in LEVELS]
+        offsets = np.cumsum([0] + [len(level_names) for level_names in names])
+        stacked = np.concatenate([level_codes + offset for level_codes, offset in zip(codes, offsets)])
+
+        def total(values):
+            return np.bincount(stacked, weights=np.tile(np.asarray(values, dtype=float), len(LEVELS)),
+                               minlength=offsets[-1])
+
+        status = series['status'].to_numpy()
+        table = pd.DataFrame({
+            'level': np.repeat(np.arange(len(LEVELS)), np.diff(offsets)),
+            'name': np.concatenate(names),
+            'series': np.bincount(stacked, minlength=offsets[-1]),
+            'critical': total(status == engine.STATUS_CRITICAL).astype(np.int64),
+            'low': total(status == engine.STATUS_LOW).astype(np.int64),
+            'avg_daily_sales': total(series['avg_daily_sales']),
+            'total_receipts': total(series['total_receipts']),
+            'current_stock': total(series['current_stock']),
+            'adjusted_stock': total(series['adjusted_stock']),
+        })
+        # Members without any series (e.g. no stock level anywhere) are dropped
+        table = engine.add_stockout_predictions(table[table['series'] > 0].reset_index(drop=True), now=now)
+
+        level_bounds = np.searchsorted(table['level'].to_numpy(), np.arange(len(LEVELS) + 1))
+        return table[['level'] + ROLLUP_COLUMNS], level_bounds, names
+
+    # Series positions grouped by one level's codes, plus the start of each
+    # member's run (argsort once; drill-downs are slices)
+    def _order(self, level):
+        codes = self.series[level].cat.codes.to_numpy()
+        if len(codes) and (np.diff(codes) >= 0).all():
+            order = np.arange(len(codes), dtype=np.int32)
+        else:
+            order = np.argsort(codes, kind='stable').astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(len(self._level_names[LEVELS.index(level)]) + 1))
+        return order, bounds
+
+    # Rollup table of one level ('product', 'location' or 'category')
+    def level(self, level):
+        index = LEVELS.index(level)
+        start, end = self._level_bounds[index], self._level_bounds[index + 1]
+        return self.rollups.iloc[start:end][ROLLUP_COLUMNS].reset_index(drop=True)
+
+    # Series of one member of a level (e.g. every location of a product)
+    def drill(self, level, member):
+        names = self._level_names[LEVELS.index(level)]
+        code = pd.Index(names).get_loc(member)
+        order, bounds = self._drill_index[level]
+        return self.series.iloc[order[bounds[code]:bounds[code + 1]]].reset_index(drop=True)
@@ -0,0 +1,117 @@
+# simulation.py
+# Monte Carlo stockout risk and service-level reorder quantities.
+#
+# The velocity prediction is a point estimate (adjusted stock / average daily
+# sales). Here every product gets many simulated demand paths, bootstrapped
+# from its own historical daily sales (the days with sales rows, the same
+# days avg_daily_sales averages over), so volatile products show their risk:
+# - stockout_probability: share of paths whose demand over the alert
+#   threshold reaches the adjusted stock
+# - expected_demand / safety_stock: mean demand over the cover period and
+#   the extra units needed to meet it at the service level
+# - reorder_quantity: units on top of the adjusted stock so demand over the
+#   cover period is met with probability `service_level`
+#
+# Paths are never stored: per chunk of products only the running demand
+# total of each path is kept, and every simulated day is one vectorized
+# draw for the whole chunk, so memory is bounded by CHUNK_SAMPLES no matter
+# how many products or paths. Chunks run in a thread pool (NumPy releases the
+# GIL in the sampling kernels), each with its own generator spawned from one
+# SeedSequence, so results only depend on the seed.
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import engine
+import perf
+
+# Demand paths per product
+SIMULATION_PATHS = 10_000
+# Probability of meeting demand over the cover period
+SERVICE_LEVEL = 0.95
+# Products x paths drawn at once per chunk (about 30 bytes each in flight)
+CHUNK_SAMPLES = 1_000_000
+
+SIMULATION_COLUMNS = ['stockout_probability', 'expected_demand', 'safety_stock', 'reorder_quantity']
+
+
+# Historical daily sales of each product in `products`, grouped by product:
+# (values, offsets, counts). Products without history sample a single zero.
+def product_histories(daily_data, products):
+    product_codes, names = engine.factorize_products(daily_data['product'])
+    order = np.argsort(product_codes, kind='stable')
+    values = np.append(daily_data['quantity'].to_numpy(dtype=np.float32)[order], np.float32(0))
+
+    name_counts = np.bincount(product_codes, minlength=len(names))
+    name_offsets = np.cumsum(name_counts) - name_counts
+    rows = pd.Index(names).get_indexer(np.asarray(products, dtype=object))
+    known = rows >= 0
+    offsets = np.where(known, name_offsets[rows], len(values) - 1)
+    counts = np.where(known, name_counts[rows], 1)
+    return values, offsets.astype(np.int64), counts.astype(np.int64)
+
+
+# Simulate one chunk of products. Returns per product the stockout
+# probability within `threshold_days`, and the mean and `service_level`
+# quantile of demand over `cover_days`.
+def simulate_chunk(values, offsets, counts, stock, threshold_days, cover_days, paths, service_level, seed):
+    rng = np.random.default_rng(seed)
+    num_products = len(counts)
+    scale = counts[:, None].astype(np.float64)
+    starts = offsets[:, None]
+
+    totals = np.zeros((num_products, paths), dtype=np.float32)
+    uniform = np.empty((num_products, paths))
+    index = np.empty((num_products, paths), dtype=np.int64)
+    stockout = np.zeros(num_products)
+    for day in range(1, max(threshold_days, cover_days) + 1):
+        # Bootstrap: a uniformly drawn historical day for every path
+        rng.random(out=uniform)
+        uniform *= scale
+        np.copyto(index, uniform, casting='unsafe')
+        index += starts
+        totals += np.take(values, index)
+        if day == threshold_days:
+            stockout = (totals >= stock[:, None]).mean(axis=1)
+
+    return stockout, totals.mean(axis=1), np.quantile(totals, service_level, axis=1)
+
+
+# Stockout probability and reorder quantities for every row of a predictions
+# table (from engine.predict_from_velocity or forecast.predict), sampled
+# from `daily_data`. Returns a copy of the table with SIMULATION_COLUMNS.
+@perf.timed('simulation')
+def simulate(daily_data, predictions, threshold_days, paths=SIMULATION_PATHS, service_level=SERVICE_LEVEL,
+             cover_days=engine.RESTOCK_COVER_DAYS, seed=None, n_jobs=None):
+    table = predictions.copy()
+    # Unknown stock (no stock readings) counts as none left
+    stock = np.nan_to_num(table['adjusted_stock'].to_numpy(dtype=float), nan=0.0)
+    values, offsets, counts = product_histories(daily_data, table['product'].to_numpy())
+
+    chunk = max(1, CHUNK_SAMPLES // paths)
+    starts = range(0, len(table), chunk)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    chunks = [
+        (values, offsets[start:start + chunk], counts[start:start + chunk], stock[start:start + chunk],
+         threshold_days, cover_days, paths, service_level, chunk_seed)
+        for start, chunk_seed in zip(starts, seeds)
+    ]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(len(chunks), 1))
+    if n_jobs > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(lambda args: simulate_chunk(*args), chunks))
+    else:
+        results = [simulate_chunk(*args) for args in chunks]
+
+    if results:
+        stockout, expected, quantile = (np.concatenate(parts) for parts in zip(*results))
+    else:
+        stockout = expected = quantile = np.zeros(0)
+    table['stockout_probability'] = stockout
+    table['expected_demand'] = expected
+    table['safety_stock'] = np.maximum(quantile - expected, 0)
+    table['reorder_quantity'] = np.maximum(np.ceil(quantile - stock), 0).astype(np.int64)
+    return table
@@ -0,0 +1,209 @@
+# store.py
+# Content-addressed local store for processed uploads.
+#
+# Each entry is keyed by the hash of the uploaded file plus the column
+# mapping and holds the processed frame, the daily aggregates and the stock
+# table as uncompressed Arrow IPC files. Uncompressed Arrow can be
+# memory-mapped, so a repeat load skips the file parse, date parsing and
+# numeric coercion and only touches the pages that are actually used.
+#
+# pyarrow is optional: without it the store reports itself as unavailable
+# and the app simply reprocesses uploads.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    ipc = None
+
+STORE_DIR = os.environ.get(
+    'RESTOCK_STORE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'restock_predictor', 'store')
+)
+
+META_FILE = 'meta.json'
+TABLES = ('processed', 'daily', 'stock')
+
+# Columns of the processed frame that are persisted
+PROCESSED_COLUMNS = ['date', 'product', 'quantity', 'current_stock', 'stock_receipts', 'location', 'category']
+
+
+def store_available():
+    return pa is not None
+
+
+# Entry key from the file's content hash and the column mapping
+def store_key(file_hash, mapping):
+    payload = json.dumps({'file': file_hash, 'mapping': mapping}, sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# Convert a frame to an Arrow table without turning NaN into nulls, so
+# numeric columns round-trip zero-copy. Categoricals become dictionaries.
+def _to_arrow(df):
+    arrays, names = [], []
+    for name in df.columns:
+        column = df[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            array = pa.DictionaryArray.from_arrays(
+                pa.array(column.cat.codes.to_numpy()),
+                pa.array(column.cat.categories.to_numpy(dtype=object))
+            )
+        elif column.dtype == object:
+            array = pa.array(column.to_numpy(), type=pa.string())
+        else:
+            array = pa.array(column.to_numpy())
+        arrays.append(array)
+        names.append(str(name))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+# Write `path` through a uniquely named temporary file next to it and an
+# atomic os.replace, so sessions saving the same entry at once never replace
+# it with each other's half-written file
+def _write_atomically(path, write):
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp'
+    )
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_table(path, df):
+    table = _to_arrow(df)
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _write_atomically(path, write)
+
+
+def _write_json(path, data):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, default=str)
+
+    _write_atomically(path, write)
+
+
+def _read_table(path):
+    source = pa.memory_map(path, 'r')
+    table = ipc.open_file(source).read_all()
+    # split_blocks avoids consolidating columns, keeping numeric data zero-copy
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+# Directory-per-entry store of processed uploads
+class ProcessedStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self._entry_dir(key), META_FILE))
+
+    # Save the processed frame (may be None in streaming mode), daily
+    # aggregates and stock table, plus JSON metadata describing the entry
+    def save(self, key, processed, daily, stock, metadata=None):
+        entry_dir = self._entry_dir(key)
+        os.makedirs(entry_dir, exist_ok=True)
+
+        if processed is not None:
+            processed = processed[[col for col in PROCESSED_COLUMNS if col in processed.columns]]
+
+        frames = {'processed': processed, 'daily': daily, 'stock': stock}
+        for name, frame in frames.items():
+            if frame is not None:
+                _write_table(os.path.join(entry_dir, f'{name}.arrow'), frame)
+
+        meta = dict(metadata or {})
+        meta.update({
+            'key': key,
+            'created': time.time(),
+            'rows': None if processed is None else int(len(processed)),
+            'products': int(len(stock)),
+            'has_processed': processed is not None,
+        })
+        # The metadata file is written last, so an entry only counts once complete
+        _write_json(os.path.join(entry_dir, META_FILE), meta)
+        return meta
+
+    # Memory-map an entry. Returns (processed, daily, stock, meta) or None when
+    # the entry doesn't exist; processed is None for streaming-mode entries.
+    def load(self, key):
+        if key not in self:
+            return None
+        entry_dir = self._entry_dir(key)
+        with open(os.path.join(entry_dir, META_FILE), encoding='utf-8') as fh:
+            meta = json.load(fh)
+
+        frames = {}
+        for name in TABLES:
+            path = os.path.join(entry_dir, f'{name}.arrow')
+            frames[name] = _read_table(path) if os.path.exists(path) else None
+
+        # Touch the metadata so expiry is based on last use, not creation
+        os.utime(os.path.join(entry_dir, META_FILE))
+        return frames['processed'], frames['daily'], frames['stock'], meta
+
+    # Metadata of every entry, most recently used first
+    def entries(self):
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=['key', 'file_name', 'rows', 'products', 'size_mb', 'last_used'])
+
+        rows = []
+        for key in os.listdir(self.root):
+            meta_path = os.path.join(self._entry_dir(key), META_FILE)
+            if not os.path.exists(meta_path):
+                continue
+            with open(meta_path, encoding='utf-8') as fh:
+                meta = json.load(fh)
+            entry_dir = self._entry_dir(key)
+            size = sum(
+                os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir)
+            )
+            rows.append({
+                'key': key,
+                'file_name': meta.get('file_name'),
+                'rows': meta.get('rows'),
+                'products': meta.get('products'),
+                'size_mb': round(size / 1e6, 2),
+                'last_used': pd.Timestamp(os.path.getmtime(meta_path), unit='s'),
+            })
+
+        entries = pd.DataFrame(rows, columns=['key', 'file_name', 'rows', 'products', 'size_mb', 'last_used'])
+        return entries.sort_values('last_used', ascending=False).reset_index(drop=True)
+
+    def delete(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    # Delete entries not used for `max_age_days`; returns the number removed
+    def expire(self, max_age_days):
+        entries = self.entries()
+        cutoff = pd.Timestamp(time.time() - max_age_days * 86_400, unit='s')
+        stale = entries.loc[entries['last_used'] < cutoff, 'key']
+        for key in stale:
+            self.delete(key)
+        return int(len(stale))
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,160 @@
+# test_alerts.py
+# Alert delivery against a local SMTP sink (aiosmtpd): due alerts are sent
+# once and marked as sent, dropped connections are reopened, failed sends
+# stay pending, and the process-wide scheduler sends on its own.
+import os
+import socket
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+controller_module = pytest.importorskip('aiosmtpd.controller')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import alerts
+import engine
+
+EMAIL = 'buyer@example.com'
+SENDER = 'alerts@example.com'
+
+
+# Collects the messages received by the sink
+class SinkHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.content.decode())
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def sink():
+    handler = SinkHandler()
+    controller = controller_module.Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return alerts.AlertStore(str(tmp_path / 'alerts.sqlite3'))
+
+
+# One product running out in 2 days (alert due today with a 7 day threshold)
+# and one that lasts 60 days
+def schedule_alerts(store, threshold_days=7):
+    table = pd.DataFrame({'product': ['SKU-LOW', 'SKU-SAFE'], 'avg_daily_sales': [5.0, 1.0]})
+    table['adjusted_stock'] = [10.0, 60.0]
+    predictions = engine.add_stockout_predictions(table, days=np.array([2.0, 60.0]))
+    store.subscribe(EMAIL, threshold_days)
+    store.schedule(EMAIL, predictions, threshold_days)
+
+
+def statuses(store):
+    return store.alerts(EMAIL).set_index('product')['status'].to_dict()
+
+
+def make_scheduler(store, port):
+    return alerts.AlertScheduler(store, alerts.SMTPPool('127.0.0.1', port), SENDER, rate_per_second=0)
+
+
+def test_due_alert_is_sent_once_and_marked_sent(sink, store):
+    handler, port = sink
+    schedule_alerts(store)
+    scheduler = make_scheduler(store, port)
+
+    assert scheduler.run_once() == (1, 1)
+    assert scheduler.run_once() == (0, 0)
+    scheduler.pool.close()
+
+    assert len(handler.messages) == 1
+    assert 'SKU-LOW' in handler.messages[0] and 'SKU-SAFE' not in handler.messages[0]
+    assert statuses(store) == {'SKU-LOW': alerts.STATUS_SENT, 'SKU-SAFE': alerts.STATUS_PENDING}
+    assert len(store.deliveries(EMAIL)) == 1
+
+
+def test_dropped_connection_is_reopened(sink, store):
+    handler, port = sink
+    pool = alerts.SMTPPool('127.0.0.1', port)
+    message = alerts.build_message(SENDER, EMAIL, pd.DataFrame({
+        'product': ['SKU-LOW'], 'days_until_stockout': [2.0], 'stockout_date': ['2024-01-03'],
+    }))
+
+    pool.send(message)
+    # Connection closed under the pool, as after an idle timeout
+    pool._smtp.close()
+    pool.send(message)
+    pool.close()
+
+    assert len(handler.messages) == 2
+    assert pool.connections_opened == 2
+
+
+def test_failed_send_stays_pending_and_is_retried(sink, store):
+    handler, port = sink
+    schedule_alerts(store)
+
+    unreachable = make_scheduler(store, free_port())
+    assert unreachable.run_once() == (0, 0)
+    assert statuses(store)['SKU-LOW'] == alerts.STATUS_PENDING
+
+    scheduler = make_scheduler(store, port)
+    assert scheduler.run_once() == (1, 1)
+    scheduler.pool.close()
+    assert statuses(store)['SKU-LOW'] == alerts.STATUS_SENT
+    assert len(handler.messages) == 1
+
+
+def test_rate_limiter_spaces_messages():
+    now = [0.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    limiter = alerts.RateLimiter(2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+
+    # A burst of 2, then one message every half second
+    assert now[0] == pytest.approx(2.0)
+    assert len(slept) == 4
+
+
+def test_scheduler_sends_saved_alerts_without_subscribing(sink, store, monkeypatch):
+    handler, port = sink
+    schedule_alerts(store)
+    monkeypatch.setenv('RESTOCK_SMTP_HOST', '127.0.0.1')
+    monkeypatch.setenv('RESTOCK_SMTP_PORT', str(port))
+    monkeypatch.setenv('RESTOCK_SMTP_RATE', '0')
+    monkeypatch.setattr(alerts, '_scheduler', None)
+
+    scheduler = alerts.get_scheduler(store)
+    try:
+        deadline = time.monotonic() + 10
+        while statuses(store)['SKU-LOW'] != alerts.STATUS_SENT and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        scheduler.stop(timeout=5)
+
+    assert statuses(store)['SKU-LOW'] == alerts.STATUS_SENT
+    assert len(handler.messages) == 1
+
+
+def test_no_scheduler_without_smtp_host(store, monkeypatch):
+    monkeypatch.delenv('RESTOCK_SMTP_HOST', raising=False)
+    monkeypatch.setattr(alerts, '_scheduler', None)
+    assert alerts.get_scheduler(store) is None
@@ -0,0 +1,78 @@
+# test_date_parsing.py
+# The vectorized date parser against pd.to_datetime: day-first, ambiguous,
+# timezone-suffixed and invalid values, on both the vectorized path and the
+# dateutil fallback.
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_parsing import infer_date_format, is_ambiguous_format, parse_dates, parse_unique_dates
+
+# A format no test value matches, so everything goes through dateutil
+FALLBACK_FORMAT = '%Y%m%d'
+
+
+def expected(values, **kwargs):
+    return pd.to_datetime(pd.Series(values), **kwargs).to_numpy(dtype='datetime64[ns]')
+
+
+def test_day_first_values_are_detected():
+    values = ['13/01/2024', '01/02/2024', '28/02/2024', '05/03/2024']
+    parsed, invalid = parse_dates(pd.Series(values))
+    assert infer_date_format(values) == '%d/%m/%Y'
+    np.testing.assert_array_equal(parsed.to_numpy(), expected(values, format='%d/%m/%Y'))
+    assert len(invalid) == 0
+
+
+def test_ambiguous_values_are_month_first():
+    values = ['01/02/2024', '03/04/2024', '12/11/2024']
+    parsed, _ = parse_dates(pd.Series(values))
+    assert is_ambiguous_format(values, infer_date_format(values))
+    np.testing.assert_array_equal(parsed.to_numpy(), expected(values, format='%m/%d/%Y'))
+    assert not is_ambiguous_format(values + ['13/01/2024'], '%d/%m/%Y')
+
+
+@pytest.mark.parametrize('date_format', [None, FALLBACK_FORMAT])
+def test_uniform_offset_keeps_wall_time(date_format):
+    values = np.array(['2024-01-01T23:30:00+05:00', '2024-01-02T01:00:00+05:00'], dtype=object)
+    parsed = parse_unique_dates(values, date_format)
+    # pd.to_datetime keeps the offset; dropping it gives the wall time
+    np.testing.assert_array_equal(parsed, pd.to_datetime(pd.Series(values)).dt.tz_localize(None).to_numpy())
+
+
+@pytest.mark.parametrize('date_format', [None, FALLBACK_FORMAT])
+def test_mixed_offsets_keep_wall_time_without_warnings(date_format):
+    values = np.array(['2024-01-01T23:30:00+05:00', '2024-01-02T01:00:00-03:00',
+                       '2024-01-03T10:00:00Z', '2024-01-04 08:15'], dtype=object)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        parsed = parse_unique_dates(values, date_format)
+    wall_times = [pd.Timestamp(value).tz_localize(None) for value in values]
+    np.testing.assert_array_equal(parsed, expected(wall_times))
+
+
+def test_sales_near_midnight_stay_on_their_day():
+    series = pd.Series(['2024-01-01T23:30:00+05:00', '2024-01-01T00:15:00-08:00'] * 3)
+    parsed, _ = parse_dates(series)
+    assert (parsed.dt.normalize() == pd.Timestamp('2024-01-01')).all()
+
+
+def test_timezone_aware_column_keeps_wall_time():
+    series = pd.Series(pd.to_datetime(['2024-01-01 23:30'])).dt.tz_localize('Asia/Karachi')
+    parsed, _ = parse_dates(series)
+    assert parsed.iloc[0] == pd.Timestamp('2024-01-01 23:30')
+
+
+def test_invalid_values_are_reported():
+    series = pd.Series(['2024-01-05', 'not a date', '2024-01-06', 'not a date', ''])
+    parsed, invalid = parse_dates(series)
+    reference = pd.to_datetime(series, format='ISO8601', errors='coerce')
+    np.testing.assert_array_equal(parsed.isna().to_numpy(), reference.isna().to_numpy())
+    np.testing.assert_array_equal(parsed.dropna().to_numpy(), reference.dropna().to_numpy())
+    assert set(invalid) == {'not a date', ''}
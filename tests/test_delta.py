@@ -0,0 +1,79 @@
+# test_delta.py
+# Appending a delta gives the same daily aggregates, stock, totals and
+# predictions as reprocessing the whole history.
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import delta
+import engine
+
+MAPPING = {
+    'date_col': 'date', 'product_col': 'product', 'quantity_col': 'quantity',
+    'stock_col': 'stock', 'receipts_col': 'receipts'
+}
+NOW = pd.Timestamp('2024-03-01')
+
+
+def sales(days, products, start, stock_base):
+    rows = []
+    for offset in range(days):
+        date = pd.Timestamp(start) + pd.Timedelta(days=offset)
+        for index, product in enumerate(products):
+            rows.append((date.strftime('%Y-%m-%d'), product, index + offset % 3, stock_base - offset,
+                         5 if offset % 7 == 0 else 0))
+    return pd.DataFrame(rows, columns=['date', 'product', 'quantity', 'stock', 'receipts'])
+
+
+def process(raw):
+    processed, _ = engine.process_frame(raw, **MAPPING)
+    return engine.compact_frame(processed)
+
+
+def normalized(frame, by):
+    frame = frame.sort_values(by, kind='stable').reset_index(drop=True)
+    if isinstance(frame['product'].dtype, pd.CategoricalDtype):
+        frame['product'] = frame['product'].astype(str)
+    return frame
+
+
+@pytest.mark.parametrize('with_predictions', [True, False])
+@pytest.mark.parametrize('delta_start', ['2024-01-30', '2024-01-31'])
+def test_delta_matches_full_recompute(with_predictions, delta_start):
+    history = sales(30, ['A', 'B', 'C'], '2024-01-01', 200)
+    # Overlaps the last history day (or starts right after it), adds a new
+    # product and leaves C out
+    new_rows = pd.concat([
+        sales(4, ['A', 'B'], delta_start, 150),
+        sales(2, ['D'], '2024-01-31', 40),
+    ], ignore_index=True)
+
+    old = process(history)
+    daily = engine.aggregate_daily(old)
+    stock = engine.latest_stock(old)
+    totals = engine.product_totals(daily)
+    predictions = engine.predict(daily, stock, now=NOW) if with_predictions else None
+
+    daily, stock, totals, predictions, touched = delta.apply_delta(
+        daily, stock, totals, predictions, process(new_rows), now=NOW
+    )
+
+    full = process(pd.concat([history, new_rows], ignore_index=True))
+    full_daily = engine.aggregate_daily(full)
+    full_stock = engine.latest_stock(full)
+
+    # With the overlap, C has rows in the re-aggregated tail
+    assert sorted(map(str, touched)) == (['A', 'B', 'C', 'D'] if delta_start == '2024-01-30' else ['A', 'B', 'D'])
+    pd.testing.assert_frame_equal(normalized(daily, ['date', 'product']),
+                                  normalized(full_daily, ['date', 'product']), check_dtype=False)
+    pd.testing.assert_frame_equal(normalized(stock, 'product'), normalized(full_stock, 'product'),
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(normalized(totals, 'product'),
+                                  normalized(engine.product_totals(full_daily), 'product'), check_dtype=False)
+    pd.testing.assert_frame_equal(normalized(predictions, 'product'),
+                                  normalized(engine.predict(full_daily, full_stock, now=NOW), 'product'),
+                                  check_dtype=False)
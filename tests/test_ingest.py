@@ -0,0 +1,92 @@
+# test_ingest.py
+# Streaming ingestion: one date format for every chunk (settled by a later
+# chunk when the first ones are ambiguous), and the same daily aggregates as
+# processing the whole file at once.
+import io
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import ingest
+
+MAPPING = {'date_col': 'date', 'product_col': 'product', 'quantity_col': 'quantity', 'stock_col': 'stock'}
+
+
+def chunk(dates):
+    return pd.DataFrame({'date': dates, 'product': 'A', 'quantity': 1, 'stock': 10})
+
+
+# Chunks handed out one by one, recording how many were read
+class CountingChunks:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    def __iter__(self):
+        for item in self.chunks:
+            self.read += 1
+            yield item
+
+
+def test_format_settled_by_a_later_chunk():
+    chunks = CountingChunks([
+        chunk(['01/01/2024', '02/01/2024']),
+        chunk(['03/01/2024', '12/01/2024']),
+        chunk(['13/01/2024', '14/01/2024']),
+        chunk(['15/01/2024']),
+    ])
+    paired = ingest.with_date_format(chunks, 'date')
+
+    first, date_format = next(paired)
+    # Held back until the third chunk showed a day above 12
+    assert chunks.read == 3
+    assert date_format == '%d/%m/%Y'
+    assert list(first['date']) == ['01/01/2024', '02/01/2024']
+
+    rest = list(paired)
+    assert [fmt for _, fmt in rest] == ['%d/%m/%Y'] * 3
+    assert [list(frame['date']) for frame, _ in rest] == [
+        ['03/01/2024', '12/01/2024'], ['13/01/2024', '14/01/2024'], ['15/01/2024']
+    ]
+
+
+def test_unambiguous_first_chunk_is_not_held_back():
+    chunks = CountingChunks([chunk(['2024-01-01', '2024-01-02']), chunk(['2024-01-03'])])
+    paired = ingest.with_date_format(chunks, 'date')
+    _, date_format = next(paired)
+    assert chunks.read == 1
+    assert date_format == 'ISO8601'
+
+
+def test_pending_rows_are_bounded():
+    chunks = [chunk(['01/02/2024', '03/04/2024'])] * 3 + [chunk(['13/01/2024'])]
+    paired = list(ingest.with_date_format(iter(chunks), 'date', max_pending_rows=4))
+    # Settled (month-first) after 4 held rows; later chunks keep that format
+    assert [fmt for _, fmt in paired] == ['%m/%d/%Y'] * 4
+
+
+def test_datetime_chunks_need_no_format():
+    chunks = [chunk(pd.to_datetime(['2024-01-01', '2024-01-02']))]
+    assert [fmt for _, fmt in ingest.with_date_format(iter(chunks), 'date')] == [None]
+
+
+def test_streaming_matches_whole_file_for_sorted_day_first_dates():
+    dates = pd.date_range('2024-01-01', '2024-02-29')
+    raw = pd.DataFrame([
+        (day.strftime('%d/%m/%Y'), f'P{product}', product + 1, 100 - day.day)
+        for day in dates for product in range(5)
+    ], columns=['date', 'product', 'quantity', 'stock'])
+    data = raw.to_csv(index=False).encode()
+
+    accumulator = ingest.stream_daily_aggregates(io.BytesIO(data), 'sales.csv', chunk_rows=40, **MAPPING)
+    daily, stock = accumulator.result()
+
+    processed, _ = engine.process_frame(pd.read_csv(io.BytesIO(data)), **MAPPING)
+    expected_daily = engine.aggregate_daily(processed)
+    assert daily['date'].nunique() == len(dates)
+    pd.testing.assert_frame_equal(daily.reset_index(drop=True), expected_daily, check_categorical=False)
+    pd.testing.assert_frame_equal(stock, engine.latest_stock(processed), check_categorical=False)
@@ -0,0 +1,146 @@
+# velocity_index.py
+# Prefix-sum index for sales velocity over arbitrary date windows.
+#
+# Built once per dataset, when the data is processed, from the daily
+# aggregates: for every product a date-dense cumulative sum of sales and of
+# observed days (products x days + 1). The velocity of every product over any
+# window is then two array lookups per statistic instead of a pandas groupby
+# on each rerun.
+#
+# The cumulative sums use the smallest exact dtype: int32 sales for whole
+# quantities (float64 otherwise) and int16 day counts, about 6 bytes per
+# product-day. Catalogs whose index would exceed MAX_INDEX_BYTES aren't
+# indexed; window_stats() computes the same table with a groupby over the
+# window's rows (it is also used for single products, whose rows are few,
+# and gives their sales volatility).
+#
+# Like engine.sales_velocity, averages are taken over the days that have
+# sales rows, so the "All history" window gives exactly the same numbers as
+# the simple-velocity prediction. Only sales are windowed: total receipts
+# (added to the stock) always cover the full history.
+import numpy as np
+import pandas as pd
+
+import engine
+
+# Largest index built (bytes)
+MAX_INDEX_BYTES = 512 * 1024 * 1024
+
+
+# Smallest dtype holding every cumulative sum of `values` exactly
+def _cumulative_dtype(values):
+    if len(values) and np.array_equal(values, np.round(values)):
+        if np.abs(values).sum() <= np.iinfo(np.int32).max:
+            return np.int32
+        return np.int64
+    return np.float64
+
+
+def _day_count_dtype(num_days):
+    return np.int16 if num_days <= np.iinfo(np.int16).max else np.int32
+
+
+class VelocityIndex:
+    def __init__(self, products, start_date, sales, observed_days, receipts):
+        self.products = products
+        self.start_date = start_date
+        self.num_days = sales.shape[1] - 1
+        self._sales = sales
+        self._observed_days = observed_days
+        self._receipts = receipts
+
+    # Index of the daily aggregates, or None when it would take more than
+    # `max_bytes`
+    @classmethod
+    def from_daily(cls, daily_data, max_bytes=MAX_INDEX_BYTES):
+        product_codes, products = engine.factorize_products(daily_data['product'])
+        days, start_date = engine.day_offsets(daily_data['date'])
+        num_days = int(days.max()) + 1 if len(days) else 0
+
+        quantity = daily_data['quantity'].to_numpy(dtype=float)
+        sales_dtype = _cumulative_dtype(quantity)
+        days_dtype = _day_count_dtype(num_days)
+        cell_bytes = np.dtype(sales_dtype).itemsize + np.dtype(days_dtype).itemsize
+        if max_bytes is not None and len(products) * (num_days + 1) * cell_bytes > max_bytes:
+            return None
+
+        # Daily aggregates have one row per (date, product), so plain
+        # assignment fills the dense matrices
+        def cumulative(values, dtype):
+            dense = np.zeros((len(products), num_days + 1), dtype=dtype)
+            dense[product_codes, days + 1] = values
+            return np.cumsum(dense, axis=1, out=dense)
+
+        receipts = np.bincount(product_codes, weights=engine.column_values(daily_data, 'stock_receipts'),
+                               minlength=len(products))
+        return cls(
+            products,
+            start_date,
+            cumulative(quantity, sales_dtype),
+            cumulative(1, days_dtype),
+            receipts
+        )
+
+    @property
+    def end_date(self):
+        return self.start_date + pd.Timedelta(days=self.num_days - 1)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self._sales, self._observed_days, self._receipts))
+
+    # Inclusive day offsets for the last `days` days of data (None = all history)
+    def last_days(self, days=None):
+        if days is None or days >= self.num_days:
+            return 0, self.num_days - 1
+        return self.num_days - days, self.num_days - 1
+
+    # Per-product velocity between two inclusive day offsets. Products with
+    # no sales rows in the window get zero velocity (they never run out).
+    def window(self, first_day=0, last_day=None):
+        if last_day is None:
+            last_day = self.num_days - 1
+        lo, hi = max(first_day, 0), min(last_day, self.num_days - 1) + 1
+
+        sales = (self._sales[:, hi] - self._sales[:, lo]).astype(float)
+        observed = (self._observed_days[:, hi] - self._observed_days[:, lo]).astype(np.int64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average = np.where(observed > 0, sales / observed, 0.0)
+
+        return pd.DataFrame({
+            'product': self.products,
+            'avg_daily_sales': average,
+            'total_receipts': self._receipts,
+            'days_with_sales': observed
+        })
+
+
+# The table of VelocityIndex.window, plus the sample standard deviation of
+# daily sales (like pandas' std()), for the rows between two inclusive dates
+# with a groupby. Products are those with rows in `daily_data`; receipts
+# cover all of its rows.
+def window_stats(daily_data, start_date=None, end_date=None):
+    totals = engine.product_totals(daily_data)
+    dates = daily_data['date']
+    in_window = np.ones(len(daily_data), dtype=bool)
+    if start_date is not None:
+        in_window &= (dates >= start_date).to_numpy()
+    if end_date is not None:
+        in_window &= (dates <= end_date).to_numpy()
+
+    rows = daily_data[in_window]
+    window = rows.groupby(rows['product'].astype(str), sort=False)['quantity'].agg(['sum', 'count', 'std'])
+    window = window.reindex(totals['product'].astype(str))
+    observed = window['count'].fillna(0).to_numpy(dtype=np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average = np.where(observed > 0, window['sum'].to_numpy(dtype=float) / observed, 0.0)
+
+    return pd.DataFrame({
+        'product': totals['product'].to_numpy(),
+        'avg_daily_sales': average,
+        'total_receipts': totals['total_receipts'].to_numpy(dtype=float),
+        'sales_volatility': window['std'].to_numpy(dtype=float),
+        'days_with_sales': observed
+    })